@@ -0,0 +1,40 @@
+"""dcs server sample time-series
+
+Revision ID: 7c2e9a41d5b3
+Revises: 1d905becb4ec
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a41d5b3'
+down_revision: Union[str, None] = '1d905becb4ec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dcs_server_sample',
+    sa.Column('server_name', sa.String(length=64), nullable=False),
+    sa.Column('resolution', sa.Integer(), nullable=False),
+    sa.Column('bucket_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('players_avg', sa.Float(), nullable=False),
+    sa.Column('players_max', sa.Integer(), nullable=False),
+    sa.Column('unique_players_24h', sa.Integer(), nullable=True),
+    sa.Column('unique_players_7d', sa.Integer(), nullable=True),
+    sa.Column('unique_players_30d', sa.Integer(), nullable=True),
+    sa.Column('total_sorties', sa.Integer(), nullable=True),
+    sa.Column('total_kills', sa.Integer(), nullable=True),
+    sa.Column('total_deaths', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('server_name', 'resolution', 'bucket_at')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dcs_server_sample')
@@ -0,0 +1,44 @@
+"""calendar indexes
+
+Revision ID: 4b8d0f6e2a17
+Revises: 7c2e9a41d5b3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8d0f6e2a17'
+down_revision: Union[str, None] = '7c2e9a41d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_DELETED = {'postgresql_where': sa.text('deleted = false'), 'sqlite_where': sa.text('deleted = 0')}
+
+
+def upgrade() -> None:
+    op.create_index('calendar_event_start_idx', 'calendar_event', ['start_date'], unique=False, **NOT_DELETED)
+    op.create_index('calendar_event_range_idx', 'calendar_event', ['end_date', 'start_date'], unique=False, **NOT_DELETED)
+    # Foreign keys followed when loading an event (Postgres does not index them)
+    op.create_index(op.f('ix_flight_event_id'), 'flight', ['event_id'], unique=False)
+    op.create_index(op.f('ix_slot_flight_id'), 'slot', ['flight_id'], unique=False)
+    op.create_index(op.f('ix_event_choice_event_id'), 'event_choice', ['event_id'], unique=False)
+    # Concurrent vote upserts may have left duplicates: keep the latest vote of each user
+    op.execute(
+        'DELETE FROM event_vote WHERE id NOT IN '
+        '(SELECT MAX(id) FROM event_vote GROUP BY event_id, user_id)'
+    )
+    op.create_unique_constraint('event_vote_idx', 'event_vote', ['event_id', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('event_vote_idx', 'event_vote', type_='unique')
+    op.drop_index(op.f('ix_event_choice_event_id'), table_name='event_choice')
+    op.drop_index(op.f('ix_slot_flight_id'), table_name='slot')
+    op.drop_index(op.f('ix_flight_event_id'), table_name='flight')
+    op.drop_index('calendar_event_range_idx', table_name='calendar_event')
+    op.drop_index('calendar_event_start_idx', table_name='calendar_event')
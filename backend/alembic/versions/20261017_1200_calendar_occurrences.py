@@ -0,0 +1,36 @@
+"""calendar occurrences
+
+Revision ID: 9e3a5c7d1f40
+Revises: 4b8d0f6e2a17
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3a5c7d1f40'
+down_revision: Union[str, None] = '4b8d0f6e2a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('calendar_event', sa.Column('series_id', sa.Integer(), nullable=True))
+    op.add_column('calendar_event', sa.Column('occurrence_start', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'calendar_event_series_id_fkey', 'calendar_event', 'calendar_event', ['series_id'], ['id']
+    )
+    op.create_unique_constraint(
+        'calendar_event_occurrence_idx', 'calendar_event', ['series_id', 'occurrence_start']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('calendar_event_occurrence_idx', 'calendar_event', type_='unique')
+    op.drop_constraint('calendar_event_series_id_fkey', 'calendar_event', type_='foreignkey')
+    op.drop_column('calendar_event', 'occurrence_start')
+    op.drop_column('calendar_event', 'series_id')
@@ -18,6 +18,7 @@ from app.schemas.calendar import (
     SlotOut,
     VoteOut,
 )
+from app.services.calendar_view import invalidate_event
 
 router = APIRouter(prefix="/admin/events", tags=["admin-events"])
 
@@ -238,5 +239,6 @@ async def restore_event(
     event.updated_at = datetime.now(UTC)
     await db.commit()
     await db.refresh(event)
+    invalidate_event(event)
 
     return _build_admin_event_out(event)
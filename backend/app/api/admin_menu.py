@@ -16,9 +16,12 @@ from app.schemas.content import (
     MenuItemUpdate,
     MenuTypeOut,
 )
+from app.services.menu import creates_cycle, invalidate_menu, load_menu_tree
 
 router = APIRouter(prefix="/admin/menu", tags=["admin-menu"])
 
+CYCLE_ERROR = "Un élément ne peut pas être placé dans un de ses sous-menus"
+
 
 @router.get("/types", response_model=list[MenuTypeOut])
 async def get_menu_types(user: User = Depends(require_admin)):
@@ -112,6 +115,10 @@ async def _validate_menu_item(data: MenuItemCreate | MenuItemUpdate, db: AsyncSe
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le menu parent n'existe pas")
         if parent.type != MenuItem.TYPE_MENU:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le parent doit être de type 'Menu'")
+        if exclude_id is not None:
+            parents = dict((await db.execute(select(MenuItem.id, MenuItem.menu_id))).all())
+            if creates_cycle(parents, exclude_id, data.menu_id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=CYCLE_ERROR)
 
 
 async def _get_item_with_relations(item_id: int, db: AsyncSession) -> MenuItem:
@@ -168,20 +175,7 @@ async def get_menu_tree(
     user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(MenuItem)
-        .where(MenuItem.menu_id.is_(None))
-        .options(
-            selectinload(MenuItem.items).selectinload(MenuItem.items),
-            selectinload(MenuItem.url),
-            selectinload(MenuItem.page),
-            selectinload(MenuItem.items).selectinload(MenuItem.url),
-            selectinload(MenuItem.items).selectinload(MenuItem.page),
-        )
-        .order_by(MenuItem.position)
-    )
-    root_items = result.scalars().all()
-    return [_build_tree_out(item) for item in root_items]
+    return [_build_tree_out(item) for item in await load_menu_tree(db)]
 
 
 @router.post("", response_model=AdminMenuItemOut, status_code=status.HTTP_201_CREATED)
@@ -209,6 +203,7 @@ async def create_menu_item(
 
     db.add(item)
     await db.commit()
+    invalidate_menu()
 
     item = await _get_item_with_relations(item.id, db)
     return _build_admin_item_out(item)
@@ -234,6 +229,11 @@ async def reorder_menu_items(
     result = await db.execute(select(MenuItem))
     all_items = {item.id: item for item in result.scalars().all()}
 
+    parents = {item.id: item.menu_id for item in all_items.values()}
+    parents.update({entry.id: entry.menu_id for entry in data.items})
+    if any(creates_cycle(parents, item_id, menu_id) for item_id, menu_id in parents.items()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=CYCLE_ERROR)
+
     for entry in data.items:
         item = all_items.get(entry.id)
         if item is None:
@@ -250,22 +250,10 @@ async def reorder_menu_items(
         item.position = entry.position
 
     await db.commit()
+    invalidate_menu()
 
     # Return refreshed tree
-    result = await db.execute(
-        select(MenuItem)
-        .where(MenuItem.menu_id.is_(None))
-        .options(
-            selectinload(MenuItem.items).selectinload(MenuItem.items),
-            selectinload(MenuItem.url),
-            selectinload(MenuItem.page),
-            selectinload(MenuItem.items).selectinload(MenuItem.url),
-            selectinload(MenuItem.items).selectinload(MenuItem.page),
-        )
-        .order_by(MenuItem.position)
-    )
-    root_items = result.scalars().all()
-    return [_build_tree_out(item) for item in root_items]
+    return [_build_tree_out(item) for item in await load_menu_tree(db)]
 
 
 @router.put("/{item_id}", response_model=AdminMenuItemOut)
@@ -295,6 +283,7 @@ async def update_menu_item(
     _clean_fields_by_type(item)
 
     await db.commit()
+    invalidate_menu()
 
     item = await _get_item_with_relations(item_id, db)
     return _build_admin_item_out(item)
@@ -320,4 +309,5 @@ async def delete_menu_item(
 
     await db.delete(item)
     await db.commit()
+    invalidate_menu()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -19,6 +19,8 @@ from app.schemas.content import (
     PageCreate,
     PageUpdate,
 )
+from app.services.menu import invalidate_menu
+from app.services.pages import invalidate_pages
 
 router = APIRouter(prefix="/admin/pages", tags=["admin-pages"])
 
@@ -166,6 +168,8 @@ async def update_page(
             status_code=status.HTTP_409_CONFLICT,
             detail="Une page avec cette route ou ce chemin existe déjà",
         )
+    invalidate_pages()
+    invalidate_menu()  # Menu items link to the page path
 
     result = await db.execute(select(Page).where(Page.id == page.id).options(selectinload(Page.blocks)))
     page = result.scalar_one()
@@ -185,6 +189,8 @@ async def delete_page(
 
     await db.delete(page)
     await db.commit()
+    invalidate_pages()
+    invalidate_menu()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -222,6 +228,7 @@ async def create_block(
     page.updated_at = datetime.now(UTC)
 
     await db.commit()
+    invalidate_pages()
 
     page = await _get_page_with_blocks(page_id, db)
     return _build_admin_page_out(page)
@@ -248,6 +255,7 @@ async def update_block(
     page.updated_at = datetime.now(UTC)
 
     await db.commit()
+    invalidate_pages()
 
     page = await _get_page_with_blocks(page_id, db)
     return _build_admin_page_out(page)
@@ -272,6 +280,7 @@ async def delete_block(
     page.updated_at = datetime.now(UTC)
 
     await db.commit()
+    invalidate_pages()
 
     page = await _get_page_with_blocks(page_id, db)
     return _build_admin_page_out(page)
@@ -10,6 +10,7 @@ from app.database import get_db
 from app.models.content import Url
 from app.models.user import User
 from app.schemas.content import AdminUrlListOut, UrlCreate, UrlOut, UrlUpdate
+from app.services.menu import invalidate_menu
 
 router = APIRouter(prefix="/admin/urls", tags=["admin-urls"])
 
@@ -113,6 +114,7 @@ async def update_url(
             status_code=status.HTTP_409_CONFLICT,
             detail="Une URL avec ce slug existe déjà",
         )
+    invalidate_menu()  # Menu items link to the URL slug
 
     return UrlOut.model_validate(url)
 
@@ -129,4 +131,5 @@ async def delete_url(
 
     await db.delete(url)
     await db.commit()
+    invalidate_menu()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -11,6 +11,7 @@ from app.database import get_db
 from app.models.recruitment import RecruitmentEvent
 from app.models.user import User
 from app.schemas.user import AdminUserListOut, AdminUserOut, AdminUserUpdate
+from app.services.calendar_view import invalidate_calendar
 
 router = APIRouter(prefix="/admin/users", tags=["admin-users"])
 
@@ -97,6 +98,7 @@ async def update_user(
     if data.status not in User.STATUSES:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Statut invalide")
 
+    nickname_changed = target.nickname != data.nickname
     target.email = data.email
     target.nickname = data.nickname
     target.roles = ",".join(data.roles) if data.roles else ""
@@ -118,6 +120,8 @@ async def update_user(
             status_code=status.HTTP_409_CONFLICT,
             detail="Un utilisateur avec cet email ou ce pseudo existe déjà",
         )
+    if nickname_changed:
+        invalidate_calendar()  # Calendar entries show their owner's nickname
 
     return _build_admin_user_out(target)
 
@@ -191,9 +191,9 @@ async def discord_authorize():
 @router.post("/discord/callback", response_model=TokenResponse)
 async def discord_callback(data: DiscordCallbackRequest, response: Response, db: AsyncSession = Depends(get_db)):
     # Validate state (CSRF protection) — check first to reject forged requests early
-    if data.state not in discord_oauth_states:
+    # (atomic pop: a state can only be consumed once, even across workers)
+    if discord_oauth_states.pop(data.state, None) is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired state parameter")
-    del discord_oauth_states[data.state]
 
     # Validate Discord OAuth configuration before attempting token exchange
     if (
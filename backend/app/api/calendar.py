@@ -1,33 +1,46 @@
-from datetime import UTC, date, datetime, time
+from datetime import UTC, date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.auth.dependencies import get_current_user
+from app.auth.jwt import create_calendar_feed_token, decode_token
 from app.auth.permissions import can_add_event, can_choose_event, can_delete_event, can_edit_event, can_vote_event
+from app.config import settings
 from app.database import get_db
 from app.models.calendar import CalendarEvent, Choice, Flight, Notification, Slot, Vote
 from app.models.module import Module
 from app.models.user import User
 from app.schemas.calendar import (
+    CalendarFeedOut,
     ChoiceCreate,
     ChoiceOut,
     ChoiceUpdate,
+    EventCalendarOut,
     EventCreate,
     EventDetailOut,
     EventListOut,
     EventUpdate,
     FlightOut,
+    OccurrenceCreate,
     SlotOut,
     TaskOut,
     VoteCreate,
     VoteOut,
 )
+from app.services.calendar import find_occurrence, is_occurrence, materialize_occurrence, move_occurrences
+from app.services.calendar_feed import feed_version, stream_feed
+from app.services.calendar_view import invalidate_calendar, invalidate_event, list_calendar_events
+from app.utils.etag import etag_response
+from app.utils.metrics import query_budget
 
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
+OCCURRENCE_ERROR = "Cette date ne correspond à aucune occurrence de l'événement"
+
 
 @router.get("/tasks", response_model=list[TaskOut])
 async def list_tasks():
@@ -35,42 +48,47 @@ async def list_tasks():
 
 
 
-@router.get("/events", response_model=list[EventListOut])
+@router.get("/events", response_model=list[EventCalendarOut])
+@query_budget(4)
 async def list_events(
     from_date: date | None = Query(None),
     to_date: date | None = Query(None),
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(CalendarEvent).where(CalendarEvent.deleted == False)  # noqa: E712
+    # Read model cached per month (app.services.calendar_view)
+    return await list_calendar_events(db, from_date, to_date)
+
+
+@router.get("/feed.ics")
+@query_budget(4)
+async def calendar_feed(request: Request, token: str | None = Query(None), db: AsyncSession = Depends(get_db)):
+    # iCalendar subscription (app.services.calendar_feed): every event, or the user's with a token
+    user_id = None
+    if token is not None:
+        payload = decode_token(token)
+        if payload is None or payload.get("type") != "calendar_feed":
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        user = await db.get(User, int(payload["sub"]))
+        if user is None or user.disabled:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        user_id = user.id
+
+    version = await feed_version(db, user_id)
+    return etag_response(
+        request,
+        stream_feed(db, user_id),
+        version.etag,
+        last_modified=version.last_modified,
+        media_type="text/calendar; charset=utf-8",
+        cache_control="public, no-cache" if user_id is None else "private, no-cache",
+        vary=None,
+    )
 
-    if from_date:
-        dt_from = datetime.combine(from_date, time.min, tzinfo=UTC)
-        query = query.where(CalendarEvent.end_date >= dt_from)
 
-    if to_date:
-        dt_to = datetime.combine(to_date, time.max, tzinfo=UTC)
-        query = query.where(CalendarEvent.start_date <= dt_to)
-
-    query = query.options(selectinload(CalendarEvent.owner)).order_by(CalendarEvent.start_date)
-    result = await db.execute(query)
-    events = result.scalars().all()
-
-    return [
-        EventListOut(
-            id=e.id,
-            title=e.title,
-            start_date=e.start_date,
-            end_date=e.end_date,
-            type=e.type,
-            type_as_string=e.type_as_string,
-            type_color=e.type_color,
-            sim_dcs=e.sim_dcs,
-            sim_bms=e.sim_bms,
-            registration=e.registration,
-            owner_nickname=e.owner.nickname if e.owner else None,
-        )
-        for e in events
-    ]
+@router.get("/feed-token", response_model=CalendarFeedOut)
+async def calendar_feed_token(user: User = Depends(get_current_user)):
+    token = create_calendar_feed_token(user.id)
+    return CalendarFeedOut(url=f"{settings.APP_URL.rstrip('/')}/api/calendar/feed.ics?token={token}")
 
 
 @router.get("/my-events", response_model=list[EventListOut])
@@ -111,6 +129,7 @@ async def my_events(user: User = Depends(get_current_user), db: AsyncSession = D
 
 
 @router.get("/events/{event_id}", response_model=EventDetailOut)
+@query_budget(16)
 async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(CalendarEvent)
@@ -149,6 +168,8 @@ async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
         ato=event.ato,
         debrief=event.debrief,
         repeat_event=event.repeat_event,
+        series_id=event.series_id,
+        occurrence_start=event.occurrence_start,
         deleted=event.deleted,
         map_id=event.map_id,
         map_name=event.map.name if event.map else None,
@@ -190,6 +211,56 @@ async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.get("/events/{event_id}/occurrences/{start_date}", response_model=EventDetailOut)
+@query_budget(18)
+async def get_occurrence(event_id: int, start_date: datetime, db: AsyncSession = Depends(get_db)):
+    # Occurrence of a repeating event (app.services.calendar): the stored one, else computed
+    series = await db.get(CalendarEvent, event_id)
+    if series is None or series.deleted or not is_occurrence(series, start_date):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    stored = await find_occurrence(db, event_id, start_date)
+    if stored is not None:
+        return await get_event(stored.id, db)
+
+    detail = await get_event(event_id, db)
+    occurrence_start = start_date if start_date.tzinfo else start_date.replace(tzinfo=UTC)
+    return detail.model_copy(
+        update={
+            "start_date": occurrence_start,
+            "end_date": occurrence_start + (detail.end_date - detail.start_date),
+            "series_id": event_id,
+            "occurrence_start": occurrence_start,
+            "virtual": True,
+            "repeat_event": CalendarEvent.REPEAT_NONE,
+            "debrief": None,
+            "votes": [],
+            "choices": [],
+            "flights": [],
+        }
+    )
+
+
+@router.post("/events/{event_id}/occurrences", response_model=EventDetailOut)
+async def store_occurrence(
+    event_id: int, data: OccurrenceCreate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    # Called before voting, choosing or editing a computed occurrence; idempotent
+    result = await db.execute(
+        select(CalendarEvent).where(CalendarEvent.id == event_id).options(selectinload(CalendarEvent.modules))
+    )
+    series = result.scalar_one_or_none()
+    if series is None or series.deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not is_occurrence(series, data.start_date):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=OCCURRENCE_ERROR)
+
+    occurrence = await materialize_occurrence(db, series, data.start_date)
+    await db.commit()
+    invalidate_calendar(occurrence.start_date, occurrence.end_date)
+    return await get_event(occurrence.id, db)
+
+
 @router.post("/events", response_model=EventDetailOut, status_code=status.HTTP_201_CREATED)
 async def create_event(data: EventCreate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     if not can_add_event(user):
@@ -224,6 +295,7 @@ async def create_event(data: EventCreate, user: User = Depends(get_current_user)
 
     await db.commit()
     await db.refresh(event)
+    invalidate_event(event)
 
     return await get_event(event.id, db)
 
@@ -239,6 +311,9 @@ async def update_event(event_id: int, data: EventUpdate, user: User = Depends(ge
     if not can_edit_event(user, event):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
+    old_dates = (event.start_date, event.end_date)
+    old_repeat = event.repeat_event
+    was_repeating = old_repeat != CalendarEvent.REPEAT_NONE
     event.title = data.title
     event.start_date = data.start_date
     event.end_date = data.end_date
@@ -262,7 +337,16 @@ async def update_event(event_id: int, data: EventUpdate, user: User = Depends(ge
     else:
         event.modules = []
 
+    if was_repeating:
+        # Keep the stored occurrences matching the series' computed dates
+        await move_occurrences(db, event, old_dates[0], old_repeat)
+
     await db.commit()
+    if was_repeating:
+        invalidate_calendar()
+    else:
+        invalidate_calendar(*old_dates)
+    invalidate_event(event)
     return await get_event(event_id, db)
 
 
@@ -278,6 +362,7 @@ async def delete_event(event_id: int, user: User = Depends(get_current_user), db
     event.deleted_at = datetime.now(UTC)
     event.updated_at = datetime.now(UTC)
     await db.commit()
+    invalidate_event(event)
 
 
 @router.post("/events/{event_id}/copy", response_model=EventDetailOut, status_code=status.HTTP_201_CREATED)
@@ -317,6 +402,7 @@ async def copy_event(event_id: int, user: User = Depends(get_current_user), db:
     db.add(new_event)
     await db.commit()
     await db.refresh(new_event)
+    invalidate_calendar(new_event.start_date, new_event.end_date)
 
     return await get_event(new_event.id, db)
 
@@ -330,20 +416,25 @@ async def vote_event(event_id: int, data: VoteCreate, user: User = Depends(get_c
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
     # Upsert vote
-    result = await db.execute(select(Vote).where(Vote.event_id == event_id, Vote.user_id == user.id))
-    vote = result.scalar_one_or_none()
+    query = select(Vote).where(Vote.event_id == event_id, Vote.user_id == user.id)
+    vote = (await db.execute(query)).scalar_one_or_none()
 
     now = datetime.now(UTC)
-    if vote:
-        vote.vote = data.vote
-        vote.comment = data.comment
-        vote.updated_at = now
-    else:
+    if vote is None:
         vote = Vote(event_id=event_id, user_id=user.id, vote=data.vote, comment=data.comment, created_at=now, updated_at=now)
-        db.add(vote)
+        try:
+            async with db.begin_nested():
+                db.add(vote)
+        except IntegrityError:
+            # Concurrent vote of the same user (double click): it won, update it instead
+            vote = (await db.execute(query)).scalar_one()
+    vote.vote = data.vote
+    vote.comment = data.comment
+    vote.updated_at = now
 
     await db.commit()
     await db.refresh(vote)
+    invalidate_calendar(event.start_date, event.end_date)
 
     return VoteOut(id=vote.id, user_id=vote.user_id, user_nickname=user.nickname, vote=vote.vote, comment=vote.comment, created_at=vote.created_at)
 
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import logging
+from collections.abc import Awaitable
+from datetime import UTC, datetime, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_optional_user
+from app.database import get_db
+from app.models.dcs import DcsServerSample
 from app.models.user import User
 from app.schemas.dcs import (
     DcsBotAttendanceOut,
+    DcsBotHistoryOut,
     DcsBotPageOut,
+    DcsBotSampleOut,
     DcsBotServerDetailOut,
     DcsBotServerDetailPageOut,
     DcsBotServerOut,
@@ -18,10 +29,47 @@ from app.schemas.dcs import (
     WeatherInfoOut,
 )
 from app.services import dcsbot as dcsbot_service
+from app.services import dcsbot_history
 from app.services.sun_position import _DEFAULT_SUN_STATE, get_sun_state, parse_mission_datetime
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/dcsbot", tags=["dcsbot"])
 
+_RESOLUTIONS = {
+    "minute": DcsServerSample.RESOLUTION_MINUTE,
+    "hour": DcsServerSample.RESOLUTION_HOUR,
+    "day": DcsServerSample.RESOLUTION_DAY,
+}
+
+# Overall deadline (seconds) for the concurrent upstream fetches of one request, well below
+# the client's per-call timeout: the page renders partially while slow loads go on filling the cache
+UPSTREAM_DEADLINE = 3.0
+
+
+async def _gather_with_deadline(*calls: Awaitable) -> list:
+    """Run upstream calls concurrently under a shared deadline.
+
+    Calls still pending at the deadline (or that raised) yield None, so callers can
+    return partial results. Cancelling a pending call does not abort the shared cached
+    load, which still fills the cache for the next request.
+    """
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    done, pending = await asyncio.wait(tasks, timeout=UPSTREAM_DEADLINE)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning("DCSServerBot: %d upstream call(s) exceeded the %.1fs deadline", len(pending), UPSTREAM_DEADLINE)
+    results = []
+    for task in tasks:
+        if task in done and task.exception() is None:
+            results.append(task.result())
+        else:
+            if task in done:
+                logger.error("DCSServerBot upstream call failed", exc_info=task.exception())
+            results.append(None)
+    return results
+
 
 def _enrich_mission(mission_raw: dict | None) -> MissionInfoOut | None:
     """Build MissionInfoOut with sun state and formatted time fields."""
@@ -41,12 +89,19 @@ def _enrich_mission(mission_raw: dict | None) -> MissionInfoOut | None:
 
 @router.get("/servers", response_model=DcsBotPageOut)
 async def get_dcsbot_servers(force_refresh: bool = False):
-    if force_refresh:
-        dcsbot_service.get_servers.invalidate_if_older(10)
-        dcsbot_service.get_server_stats.invalidate_if_older(10)
-
-    servers_data = await dcsbot_service.get_servers()
-    stats_data = await dcsbot_service.get_server_stats()
+    if dcsbot_service.polling_enabled():
+        # Snapshot is at most DCSBOT_POLL_INTERVAL old: force_refresh is not needed
+        snapshot = dcsbot_service.get_snapshot() or {}
+        servers_data, stats_data = snapshot.get("servers"), snapshot.get("stats")
+    else:
+        if force_refresh:
+            dcsbot_service.get_servers.invalidate_if_older(10)
+            dcsbot_service.get_server_stats.invalidate_if_older(10)
+
+        servers_data, stats_data = await _gather_with_deadline(
+            dcsbot_service.get_servers(),
+            dcsbot_service.get_server_stats(),
+        )
 
     if servers_data is None:
         return DcsBotPageOut(servers=[], stats=None)
@@ -99,7 +154,16 @@ async def get_dcsbot_server(
     server_name: str,
     user: User | None = Depends(get_optional_user),
 ):
-    servers_data = await dcsbot_service.get_server(server_name)
+    if dcsbot_service.polling_enabled():
+        entry = (dcsbot_service.get_snapshot() or {}).get("by_name", {}).get(server_name) or {}
+        servers_data = [entry["server"]] if entry else None
+        stats_data, attendance_data = entry.get("stats"), entry.get("attendance")
+    else:
+        servers_data, stats_data, attendance_data = await _gather_with_deadline(
+            dcsbot_service.get_server(server_name),
+            dcsbot_service.get_server_stats_by_name(server_name),
+            dcsbot_service.get_server_attendance(server_name),
+        )
     if not servers_data:
         raise HTTPException(status_code=404, detail="Serveur non trouvé")
 
@@ -125,11 +189,9 @@ async def get_dcsbot_server(
     )
 
     # Per-server stats (camelCase keys from DCSServerBot API)
-    stats_data = await dcsbot_service.get_server_stats_by_name(server_name)
     stats_out = _build_stats(stats_data) if stats_data else None
 
     # Attendance (snake_case keys, optional)
-    attendance_data = await dcsbot_service.get_server_attendance(server_name)
     attendance_out = None
     if attendance_data:
         attendance_out = DcsBotAttendanceOut(
@@ -154,3 +216,30 @@ async def get_dcsbot_server(
         )
 
     return DcsBotServerDetailPageOut(server=server_out, stats=stats_out, attendance=attendance_out)
+
+
+@router.get("/servers/{server_name}/history", response_model=DcsBotHistoryOut)
+async def get_dcsbot_server_history(
+    server_name: str,
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    resolution: Literal["minute", "hour", "day"] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Recorded player counts and stats of a server (default: last 24h, finest resolution available)."""
+    end = end or datetime.now(UTC)
+    start = start or end - timedelta(days=1)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=UTC)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=UTC)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start doit être antérieur à end")
+
+    bucket_size = _RESOLUTIONS[resolution] if resolution else dcsbot_history.pick_resolution(start)
+    samples = await dcsbot_history.get_history(db, server_name, start, end, bucket_size)
+    return DcsBotHistoryOut(
+        server_name=server_name,
+        resolution=bucket_size,
+        samples=[DcsBotSampleOut.model_validate(sample) for sample in samples],
+    )
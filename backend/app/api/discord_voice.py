@@ -1,14 +1,29 @@
-from fastapi import APIRouter
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
 from app.config import settings
-from app.schemas.discord_voice import DiscordVoiceChannelOut, DiscordVoiceStatusOut, DiscordVoiceUserOut
+from app.schemas.discord_voice import (
+    DiscordVoiceChannelOut,
+    DiscordVoiceDiffOut,
+    DiscordVoiceStatusOut,
+    DiscordVoiceUserOut,
+)
 from app.services import discord_voice as dv_service
+from app.utils.broadcast import RESYNC
 
 router = APIRouter(prefix="/discord-voice", tags=["discord-voice"])
 
+STREAM_KEEPALIVE = 15  # seconds; SSE comment sent when nothing happened (keeps proxies open)
+
 
 @router.get("/status", response_model=DiscordVoiceStatusOut)
 async def get_discord_voice_status():
+    return _build_status()
+
+
+def _build_status() -> DiscordVoiceStatusOut:
     if not settings.DISCORD_BOT_TOKEN or not settings.DISCORD_GUILD_ID:
         return DiscordVoiceStatusOut(configured=False)
 
@@ -32,3 +47,28 @@ async def get_discord_voice_status():
         guild_name=data.get("guild_name", ""),
         configured=True,
     )
+
+
+async def _voice_events(request: Request) -> AsyncIterator[str]:
+    # Subscribe before reading the snapshot so no diff is lost in between
+    # (diffs are idempotent: a join already in the snapshot is harmless)
+    async with dv_service.voice_events.subscribe() as subscription:
+        yield f"event: snapshot\ndata: {_build_status().model_dump_json()}\n\n"
+        while not await request.is_disconnected():
+            event = await subscription.get(timeout=STREAM_KEEPALIVE)
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event is RESYNC:
+                yield f"event: snapshot\ndata: {_build_status().model_dump_json()}\n\n"
+            else:
+                yield f"event: diff\ndata: {DiscordVoiceDiffOut(**event).model_dump_json()}\n\n"
+
+
+@router.get("/stream")
+async def stream_discord_voice(request: Request):
+    """Server-Sent Events: a `snapshot` event, then a `diff` event per join/leave/move."""
+    return StreamingResponse(
+        _voice_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
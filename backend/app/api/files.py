@@ -15,6 +15,7 @@ from app.database import get_db
 from app.models.content import File
 from app.models.user import User
 from app.schemas.content import FileOut
+from app.utils.metrics import query_budget
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -91,6 +92,7 @@ async def upload_file(file: UploadFile, user: User = Depends(get_current_user),
 
 
 @router.get("/{file_uuid}")
+@query_budget(2)
 async def download_file(file_uuid: str, db: AsyncSession = Depends(get_db)):
     # Strip optional extension (e.g. "uuid.webp" -> "uuid")
     file_uuid = file_uuid.rsplit(".", 1)[0] if "." in file_uuid else file_uuid
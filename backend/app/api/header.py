@@ -1,33 +1,46 @@
+from collections.abc import AsyncIterator
 from datetime import UTC, datetime, timedelta
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models.calendar import CalendarEvent
 from app.schemas.header import HeaderDataOut, NextEventOut
 from app.services import dcsbot as dcsbot_service
 from app.services import discord_voice as dv_service
 from app.services import teamspeak as ts_service
+from app.services.calendar import AUTO_CREATE_EVENT_DAYS, virtual_occurrences
+from app.utils.broadcast import Broadcaster
+from app.utils.metrics import query_budget
 
 router = APIRouter(prefix="/header", tags=["header"])
 
 NEXT_EVENTS_DAYS = 7
+STREAM_INTERVAL = 5  # seconds between recomputations while someone is streaming
+STREAM_KEEPALIVE = 15  # seconds; SSE comment sent when nothing changed (keeps proxies open)
 
 
-@router.get("", response_model=HeaderDataOut)
-async def get_header_data(db: AsyncSession = Depends(get_db)):
+async def build_header_data(db: AsyncSession) -> HeaderDataOut:
     now = datetime.now(UTC)
 
-    # Connected DCS players (from cached DCSServerBot API)
+    # Connected DCS players (from DCSServerBot snapshot or cached API)
     connected_players = 0
-    servers_data = await dcsbot_service.get_servers()
+    servers_data = await dcsbot_service.current_servers()
     if servers_data:
         for s in servers_data:
             if s.get("status") == "Running":
                 connected_players += len(s.get("players") or [])
 
+    # Occurrences of repeating events not stored yet (computed, see app.services.calendar)
+    occurrences = [
+        o
+        for o in await virtual_occurrences(db, now, now + timedelta(days=AUTO_CREATE_EVENT_DAYS))
+        if o.start_date > now
+    ]
+
     # Count of upcoming events in the next N days
     end = now + timedelta(days=NEXT_EVENTS_DAYS)
     count_result = await db.execute(
@@ -35,7 +48,7 @@ async def get_header_data(db: AsyncSession = Depends(get_db)):
         .select_from(CalendarEvent)
         .where(CalendarEvent.start_date > now, CalendarEvent.start_date <= end, CalendarEvent.deleted == False)  # noqa: E712
     )
-    next_events_count = count_result.scalar() or 0
+    next_events_count = (count_result.scalar() or 0) + sum(1 for o in occurrences if o.start_date <= end)
 
     # Next 3 upcoming events (detail)
     result = await db.execute(
@@ -44,21 +57,62 @@ async def get_header_data(db: AsyncSession = Depends(get_db)):
         .order_by(CalendarEvent.start_date)
         .limit(3)
     )
-    next_events = result.scalars().all()
+    next_events = [
+        NextEventOut(id=e.id, title=e.title, start_date=e.start_date, type=e.type, type_color=e.type_color)
+        for e in result.scalars().all()
+    ]
+    next_events += [
+        NextEventOut(
+            id=o.series.id,
+            title=o.series.title,
+            start_date=o.start_date,
+            type=o.series.type,
+            type_color=o.series.type_color,
+            occurrence_start=o.start_date,
+        )
+        for o in occurrences[:3]
+    ]
+    next_events.sort(key=lambda e: e.start_date if e.start_date.tzinfo else e.start_date.replace(tzinfo=UTC))
 
     return HeaderDataOut(
         connected_players=connected_players,
         next_events_count=next_events_count,
         ts_client_count=ts_service.get_client_count(),
         discord_voice_count=dv_service.get_user_count(),
-        next_events=[
-            NextEventOut(
-                id=e.id,
-                title=e.title,
-                start_date=e.start_date,
-                type=e.type,
-                type_color=e.type_color,
-            )
-            for e in next_events
-        ],
+        next_events=next_events[:3],
+    )
+
+
+@router.get("", response_model=HeaderDataOut)
+@query_budget(5)
+async def get_header_data(db: AsyncSession = Depends(get_db)):
+    return await build_header_data(db)
+
+
+async def _compute_header_data() -> HeaderDataOut:
+    async with AsyncSessionLocal() as db:
+        return await build_header_data(db)
+
+
+# One computation per STREAM_INTERVAL for all connected /header/stream clients
+header_broadcaster = Broadcaster(_compute_header_data, interval=STREAM_INTERVAL)
+
+
+async def _header_events(request: Request) -> AsyncIterator[str]:
+    async with header_broadcaster.subscribe() as subscription:
+        while not await request.is_disconnected():
+            data = await subscription.get(timeout=STREAM_KEEPALIVE)
+            if data is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {data.model_dump_json()}\n\n"
+
+
+@router.get("/stream")
+async def stream_header_data(request: Request):
+    """Server-Sent Events: a HeaderDataOut is pushed each time the header data changes."""
+    return StreamingResponse(
+        _header_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -1,12 +1,12 @@
-from fastapi import APIRouter
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
-from app.version import APP_VERSION
+import app.utils.metrics  # noqa: F401 — registers the application metrics
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
 
-@router.get("", response_class=PlainTextResponse)
+@router.get("")
 async def get_metrics():
-    # TODO: Implement Prometheus metrics
-    return f'# HELP veaf_app_info Application info\n# TYPE veaf_app_info gauge\nveaf_app_info{{version="{APP_VERSION}"}} 1\n'
+    """Prometheus exposition of this worker's metrics (see app.utils.metrics)."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -26,6 +26,15 @@ def create_refresh_token(user_id: int) -> str:
     return jwt.encode(payload, settings.JWT_SECRET.get_secret_value(), algorithm=settings.JWT_ALGORITHM)
 
 
+def create_calendar_feed_token(user_id: int) -> str:
+    # No expiry: calendar subscriptions keep the URL forever (rotating JWT_SECRET revokes them)
+    payload = {
+        "sub": str(user_id),
+        "type": "calendar_feed",
+    }
+    return jwt.encode(payload, settings.JWT_SECRET.get_secret_value(), algorithm=settings.JWT_ALGORITHM)
+
+
 def decode_token(token: str) -> dict | None:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET.get_secret_value(), algorithms=[settings.JWT_ALGORITHM])
@@ -58,21 +58,24 @@ def can_add_activity(user: User) -> bool:
     return user.is_member or user.is_admin
 
 
-def is_granted_to_level(user: User | None, level: int) -> bool:
-    """Check if user meets the access restriction level."""
-    LEVEL_ALL = 0
-    LEVEL_GUEST = 1
-    LEVEL_CADET = 2
-    LEVEL_MEMBER = 3
+# Access restriction levels of pages and menu items (Page/MenuItem.LEVEL_*)
+LEVEL_ALL = 0
+LEVEL_GUEST = 1
+LEVEL_CADET = 2
+LEVEL_MEMBER = 3
 
-    if level == LEVEL_ALL:
-        return True
+
+def access_level(user: User | None) -> int:
+    """Highest access restriction level the user meets."""
     if user is None:
-        return False
-    if level == LEVEL_GUEST:
-        return True  # Any logged-in user
-    if level == LEVEL_CADET:
-        return user.is_cadet or user.is_member or user.is_admin
-    if level == LEVEL_MEMBER:
-        return user.is_member or user.is_admin
-    return False
+        return LEVEL_ALL
+    if user.is_member or user.is_admin:
+        return LEVEL_MEMBER
+    if user.is_cadet:
+        return LEVEL_CADET
+    return LEVEL_GUEST  # Any logged-in user
+
+
+def is_granted_to_level(user: User | None, level: int) -> bool:
+    """Check if user meets the access restriction level."""
+    return LEVEL_ALL <= level <= access_level(user)
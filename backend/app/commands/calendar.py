@@ -9,9 +9,12 @@ calendar_app = typer.Typer(help="Calendar commands", no_args_is_help=True)
 async def _process_recurring_events() -> None:
     from app.database import AsyncSessionLocal, engine
     from app.services.calendar import check_recurring_events
+    from app.services.calendar_view import invalidate_calendar
 
     async with AsyncSessionLocal() as db:
         count = await check_recurring_events(db)
+    if count > 0:
+        invalidate_calendar()  # Shared with the workers by the sqlite cache backend
 
     await engine.dispose()
 
@@ -23,5 +26,5 @@ async def _process_recurring_events() -> None:
 
 @calendar_app.command("auto")
 def auto() -> None:
-    """Créer les prochaines occurrences des événements périodiques."""
+    """Enregistrer à l'avance les prochaines occurrences des événements périodiques."""
     asyncio.run(_process_recurring_events())
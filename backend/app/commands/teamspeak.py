@@ -7,10 +7,10 @@ teamspeak_app = typer.Typer(help="TeamSpeak commands", no_args_is_help=True)
 
 
 async def _check() -> None:
-    from app.services.teamspeak import _fetch_ts_data_sync
+    from app.services.teamspeak import close_client, fetch_ts_data
 
     try:
-        data = await asyncio.to_thread(_fetch_ts_data_sync)
+        data = await fetch_ts_data()
         rprint(f"[bold green]OK[/bold green] — {data['client_count']} client(s), {len(data['channels'])} channel(s)")
         for ch in data["channels"]:
             if ch["clients"]:
@@ -19,6 +19,8 @@ async def _check() -> None:
                     rprint(f"    - {cl['nickname']}")
     except Exception as e:
         rprint(f"[bold red]Error[/bold red] — {e}")
+    finally:
+        await close_client()
     rprint("\n[dim]Note: this is a diagnostic command. It does not update the website cache.[/dim]")
 
 
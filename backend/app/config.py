@@ -24,6 +24,20 @@ class Settings(BaseSettings):
     # External APIs
     API_DCSSERVERBOT_URL: str = "http://dcs.veaf.org:9876"
     API_TEAMSPEAK_URL: str = "serverquery://ts.veaf.org:10011/?server_port=9987"
+    # Seconds between TeamSpeak scans (the ServerQuery session stays open between scans)
+    TEAMSPEAK_SCAN_INTERVAL: int = 15
+    # Push mode: presence follows ServerQuery notifications (needs b_virtualserver_notify_register);
+    # full scans then only run every TEAMSPEAK_RECONCILE_INTERVAL seconds. A single worker holds the
+    # session and copies the presence to the shared cache every TEAMSPEAK_SCAN_INTERVAL seconds
+    TEAMSPEAK_PUSH: bool = False
+    TEAMSPEAK_RECONCILE_INTERVAL: int = 300
+
+    # DCSServerBot HTTP client pool (HTTP/2 is used only if the `h2` package is installed)
+    DCSBOT_POOL_MAX_CONNECTIONS: int = 20
+    DCSBOT_POOL_MAX_KEEPALIVE: int = 10
+    DCSBOT_HTTP2: bool = True
+    # Background polling of DCSServerBot (seconds); 0 = fetch on demand during requests
+    DCSBOT_POLL_INTERVAL: int = 30
 
     # Discord OAuth2
     DISCORD_CLIENT_ID: str = ""
@@ -38,6 +52,19 @@ class Settings(BaseSettings):
     # reCAPTCHA
     RECAPTCHA_SECRET_KEY: SecretStr = ""
 
+    # Cache backend: "memory" (single worker) or "sqlite" (shared file, several workers)
+    CACHE_BACKEND: str = "memory"
+    CACHE_SQLITE_PATH: str = "./var/cache.sqlite3"
+    # Max age (seconds) of DCSServerBot/TeamSpeak data served while the upstream is slow or down
+    CACHE_MAX_STALE: int = 1200
+
+    # Request profiling: SQL statements per request above which a warning is logged
+    # (endpoints may declare their own with `query_budget`; 0 = no default budget)
+    DB_QUERY_BUDGET: int = 30
+    # Send statement count and DB time in a Server-Timing header (browser dev tools);
+    # visible to every client, so for development and benchmarks only
+    SERVER_TIMING: bool = False
+
     # App
     APP_URL: str = "http://localhost"
     UPLOAD_DIR: str = "./uploads"
@@ -4,8 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
+from app.utils.metrics import instrument_engine
 
 engine = create_async_engine(settings.DATABASE_URL.get_secret_value(), echo=False)
+instrument_engine(engine)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import api_router
 from app.config import settings
+from app.utils.metrics import MetricsMiddleware
 from app.utils.startup import log_startup_banner
 from app.version import APP_VERSION
 
@@ -26,23 +27,22 @@ async def lifespan(app: FastAPI):
             raise RuntimeError(f"Alembic migration failed: {result.stderr}")
         logger.info("Migrations completed successfully")
 
+    # Shared keep-alive HTTP client for DCSServerBot
+    from app.services import dcsbot as dcsbot_service
+
+    await dcsbot_service.start_client()
+
     # Startup: initialize APScheduler
     from app.tasks.scheduler import start_scheduler
 
     start_scheduler()
 
-    # Run initial TeamSpeak scan so cache is populated immediately
-    if settings.API_TEAMSPEAK_URL:
-        from app.services.teamspeak import scan_and_cache
-
-        await scan_and_cache()
-
-    # Start Discord voice Gateway bot (populates cache in real time)
+    # Start the Discord voice Gateway bot, in the first worker to claim it (see the job)
     if settings.DISCORD_BOT_TOKEN and settings.DISCORD_GUILD_ID:
-        from app.services.discord_voice import start_monitor
+        from app.services.discord_voice import sync_discord_voice
 
-        start_monitor()
-        print("🤖 Discord voice bot starting...")
+        await sync_discord_voice()
+        print("🤖 Discord voice enabled (bot started by a single worker)")
     else:
         print("🤖 Discord voice bot disabled (DISCORD_BOT_TOKEN or DISCORD_GUILD_ID not set)")
 
@@ -54,6 +54,13 @@ async def lifespan(app: FastAPI):
 
         await stop_monitor()
 
+    await dcsbot_service.close_client()
+
+    if settings.API_TEAMSPEAK_URL:
+        from app.services.teamspeak import close_client as close_ts_client
+
+        await close_ts_client()
+
 
 app = FastAPI(
     title="VEAF Website API",
@@ -71,6 +78,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router)
 
@@ -2,7 +2,7 @@ from app.models.user import User, UserModule
 from app.models.module import Module, ModuleRole, ModuleSystem, module_role_table, module_system_table
 from app.models.calendar import CalendarEvent, Flight, Slot, Choice, Vote, Notification, event_module_table
 from app.models.content import Page, PageBlock, MenuItem, Url, File
-from app.models.dcs import Server, Player, DcsBotSyncState
+from app.models.dcs import Server, Player, DcsBotSyncState, DcsServerSample
 from app.models.recruitment import RecruitmentEvent
 
 __all__ = [
@@ -28,5 +28,6 @@ __all__ = [
     "Server",
     "Player",
     "DcsBotSyncState",
+    "DcsServerSample",
     "RecruitmentEvent",
 ]
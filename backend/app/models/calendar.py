@@ -1,6 +1,6 @@
 from datetime import UTC, datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table, Text
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Table, Text, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -14,8 +14,20 @@ event_module_table = Table(
 )
 
 
+# Only live events are ever listed: the calendar indexes leave deleted ones out
+_NOT_DELETED = {"postgresql_where": text("deleted = false"), "sqlite_where": text("deleted = 0")}
+
+
 class CalendarEvent(Base):
     __tablename__ = "calendar_event"
+    __table_args__ = (
+        # Upcoming events (header, my events): start_date > now
+        Index("calendar_event_start_idx", "start_date", **_NOT_DELETED),
+        # Calendar views: events overlapping a range (end_date >= from, start_date <= to)
+        Index("calendar_event_range_idx", "end_date", "start_date", **_NOT_DELETED),
+        # An occurrence of a series is stored at most once
+        UniqueConstraint("series_id", "occurrence_start", name="calendar_event_occurrence_idx"),
+    )
 
     # Event types
     EVENT_TYPE_TRAINING = 1
@@ -89,6 +101,11 @@ class CalendarEvent(Base):
     image_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("file.id"), nullable=True)
     server_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("server.id"), nullable=True)
 
+    # Stored occurrence of a repeating event (app.services.calendar): the series and the
+    # computed start date it replaces (kept when the occurrence is moved or deleted)
+    series_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("calendar_event.id"), nullable=True)
+    occurrence_start: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
     # Relationships
     owner: Mapped["User"] = relationship("User", foreign_keys=[owner_id])
     map: Mapped["Module | None"] = relationship("Module", foreign_keys=[map_id])
@@ -131,7 +148,7 @@ class Flight(Base):
     mission: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nb_slots: Mapped[int] = mapped_column(Integer, nullable=False)
 
-    event_id: Mapped[int] = mapped_column(Integer, ForeignKey("calendar_event.id"), nullable=False)
+    event_id: Mapped[int] = mapped_column(Integer, ForeignKey("calendar_event.id"), nullable=False, index=True)
     aircraft_id: Mapped[int] = mapped_column(Integer, ForeignKey("module.id"), nullable=False)
 
     event: Mapped["CalendarEvent"] = relationship("CalendarEvent", back_populates="flights")
@@ -145,7 +162,7 @@ class Slot(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
-    flight_id: Mapped[int] = mapped_column(Integer, ForeignKey("flight.id"), nullable=False)
+    flight_id: Mapped[int] = mapped_column(Integer, ForeignKey("flight.id"), nullable=False, index=True)
     user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("user.id"), nullable=True)
 
     flight: Mapped["Flight"] = relationship("Flight", back_populates="slots")
@@ -187,7 +204,7 @@ class Choice(Base):
     created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
-    event_id: Mapped[int] = mapped_column(Integer, ForeignKey("calendar_event.id"), nullable=False)
+    event_id: Mapped[int] = mapped_column(Integer, ForeignKey("calendar_event.id"), nullable=False, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
     module_id: Mapped[int] = mapped_column(Integer, ForeignKey("module.id"), nullable=False)
 
@@ -202,6 +219,9 @@ class Choice(Base):
 
 class Vote(Base):
     __tablename__ = "event_vote"
+    __table_args__ = (
+        UniqueConstraint("event_id", "user_id", name="event_vote_idx"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
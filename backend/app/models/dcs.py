@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -34,4 +34,31 @@ class DcsBotSyncState(Base):
     records_imported: Mapped[int] = mapped_column(Integer, default=0)
 
 
+class DcsServerSample(Base):
+    """Aggregated DCSServerBot sample for one server over one time bucket.
+
+    Samples are recorded per minute by the poller, then rolled up to hour and day
+    buckets as they age (see services/dcsbot_history.py).
+    """
+
+    __tablename__ = "dcs_server_sample"
+
+    RESOLUTION_MINUTE = 60
+    RESOLUTION_HOUR = 3600
+    RESOLUTION_DAY = 86400
+
+    server_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    resolution: Mapped[int] = mapped_column(Integer, primary_key=True)  # bucket size in seconds
+    bucket_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    samples: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    players_avg: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    players_max: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    unique_players_24h: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    unique_players_7d: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    unique_players_30d: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total_sorties: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total_kills: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    total_deaths: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
 from app.models.user import User  # noqa: E402, F811
@@ -68,10 +68,28 @@ class EventListOut(BaseModel):
     sim_bms: bool
     registration: bool
     owner_nickname: str | None = None
+    # Occurrence of a repeating event (app.services.calendar): stored, or computed
+    # (`virtual`, `id` is then the series' and nothing is stored yet)
+    series_id: int | None = None
+    occurrence_start: datetime | None = None
+    virtual: bool = False
 
     model_config = {"from_attributes": True}
 
 
+class EventCalendarOut(EventListOut):
+    votes_yes: int = 0
+    votes_no: int = 0
+    votes_maybe: int = 0
+    slots_total: int = 0
+    slots_filled: int = 0
+    slots_fill_ratio: float | None = None  # None without flights
+
+
+class CalendarFeedOut(BaseModel):
+    url: str  # iCalendar subscription URL of the user's events
+
+
 class EventDetailOut(EventListOut):
     description: str | None = None
     restrictions: list[int] = Field(default_factory=list)
@@ -128,6 +146,17 @@ class VoteCreate(BaseModel):
     comment: str | None = None  # Deprecated: no longer used in the UI
 
 
+class OccurrenceCreate(BaseModel):
+    start_date: datetime  # Computed start date of the occurrence to store
+
+    @field_validator("start_date", mode="before")
+    @classmethod
+    def ensure_timezone_aware(cls, v: datetime) -> datetime:
+        if isinstance(v, datetime) and v.tzinfo is None:
+            raise ValueError("Les dates doivent inclure un fuseau horaire (ex: 2026-03-15T21:00:00Z)")
+        return v
+
+
 class ChoiceCreate(BaseModel):
     module_id: int
     task: int | None = None
@@ -165,3 +165,24 @@ class PlayerOut(BaseModel):
     user_nickname: str | None = None
 
     model_config = {"from_attributes": True}
+
+
+class DcsBotSampleOut(BaseModel):
+    bucket_at: datetime
+    samples: int
+    players_avg: float
+    players_max: int
+    unique_players_24h: int | None = None
+    unique_players_7d: int | None = None
+    unique_players_30d: int | None = None
+    total_sorties: int | None = None
+    total_kills: int | None = None
+    total_deaths: int | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class DcsBotHistoryOut(BaseModel):
+    server_name: str
+    resolution: int  # bucket size in seconds
+    samples: list[DcsBotSampleOut]
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -18,3 +20,11 @@ class DiscordVoiceStatusOut(BaseModel):
     user_count: int = 0
     guild_name: str = ""
     configured: bool = False
+
+
+class DiscordVoiceDiffOut(BaseModel):
+    action: Literal["join", "leave", "move", "update"]
+    user: DiscordVoiceUserOut
+    channel_id: str | None = None  # None on leave
+    from_channel_id: str | None = None  # None on join
+    user_count: int = 0
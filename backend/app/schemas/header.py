@@ -9,6 +9,8 @@ class NextEventOut(BaseModel):
     start_date: datetime
     type: int
     type_color: str
+    # Computed occurrence of a repeating event: `id` is the series'
+    occurrence_start: datetime | None = None
 
 
 class HeaderDataOut(BaseModel):
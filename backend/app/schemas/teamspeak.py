@@ -7,16 +7,18 @@ class TSClientOut(BaseModel):
     nickname: str
 
 
-class TSChannelOut(BaseModel):
+class TSChannelNodeOut(BaseModel):
     cid: int
-    pid: int
     name: str
     clients: list[TSClientOut] = Field(default_factory=list)
+    children: list["TSChannelNodeOut"] = Field(default_factory=list)
+    total_clients: int = 0  # Clients in this channel and all its sub-channels
 
 
 class TSStatusOut(BaseModel):
     clients: list[TSClientOut]
-    channels: list[TSChannelOut]
+    # Channels nested by pid, the only place channel client lists are sent
+    tree: list[TSChannelNodeOut] = Field(default_factory=list)
     client_count: int
     server_host: str
     configured: bool
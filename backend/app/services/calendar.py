@@ -1,19 +1,35 @@
-"""Service for recurring calendar event management."""
+"""Recurring calendar events.
+
+A repeating event (`repeat_event` set) heads a series: its following occurrences are
+computed for the dates being read (`virtual_occurrences`) with the
+`get_next_event_datetime` rules, and only stored once someone votes, picks a slot or
+edits one (`materialize_occurrence`). A stored occurrence points to its series
+(`series_id`) and to the computed date it stands for (`occurrence_start`): it keeps
+replacing that occurrence when moved, and cancels it when deleted.
+"""
 
 import calendar as cal
 import logging
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from itertools import islice, takewhile
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.models.calendar import CalendarEvent
+from app.models.calendar import CalendarEvent, event_module_table
 
 logger = logging.getLogger(__name__)
 
 AUTO_CREATE_EVENT_DAYS = 32
 
+# INSERT ... ON CONFLICT DO NOTHING, per database (PostgreSQL in production, SQLite in tests)
+_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
 
 def get_next_event_datetime(event: CalendarEvent) -> datetime | None:
     """Calculate the next occurrence datetime based on the event's repeat type."""
@@ -55,76 +71,185 @@ def get_next_event_datetime(event: CalendarEvent) -> datetime | None:
     return None
 
 
-def is_needed_to_create_next_event(event: CalendarEvent) -> bool:
-    """Check if the next occurrence should be created (within 32 days from now)."""
-    next_date = get_next_event_datetime(event)
-    if next_date is None:
-        return False
-    now = datetime.now(UTC)
-    # Handle timezone-naive datetimes (e.g. from SQLite in tests)
-    if next_date.tzinfo is None:
-        now = now.replace(tzinfo=None)
-    delta = next_date - now
-    return delta.days <= AUTO_CREATE_EVENT_DAYS
+def _utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for DateTime(timezone=True) columns
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
 
 
-async def create_next_event(db: AsyncSession, original: CalendarEvent) -> CalendarEvent:
-    """Create the next recurring event from the original.
+def iter_occurrences(series: CalendarEvent) -> Iterator[datetime]:
+    """Start dates (UTC) of the occurrences following `series`, endlessly.
 
-    Clones all event properties except debrief, votes, choices, flights, notifications.
-    The new event inherits repeat_event; the original is set to REPEAT_NONE.
-    Expects original.modules to be eagerly loaded (via selectinload).
+    Each date is computed from the previous one, as successive copies of the event would be.
     """
-    next_start = get_next_event_datetime(original)
-    if next_start is None:
-        raise ValueError("Cannot calculate next event date")
+    occurrence = CalendarEvent(start_date=_utc(series.start_date), repeat_event=series.repeat_event)
+    while (start := get_next_event_datetime(occurrence)) is not None:
+        occurrence.start_date = start
+        yield start
+
+
+def occurrences_between(series: CalendarEvent, dt_from: datetime, dt_to: datetime) -> list[datetime]:
+    """Start dates of the occurrences of `series` overlapping [dt_from, dt_to]."""
+    duration = series.end_date - series.start_date
+    starts = takewhile(lambda start: start <= dt_to, iter_occurrences(series))
+    return [start for start in starts if start + duration >= dt_from]
+
 
-    duration = original.end_date - original.start_date
+def is_occurrence(series: CalendarEvent, start: datetime) -> bool:
+    """Whether `start` is the start date of an occurrence following `series`."""
+    start = _utc(start)
+    return start in takewhile(lambda occurrence: occurrence <= start, iter_occurrences(series))
+
+
+def next_occurrences(event: CalendarEvent) -> list[datetime]:
+    """Start dates of the occurrences of `event` from now to AUTO_CREATE_EVENT_DAYS days ahead.
+
+    Past occurrences are left out: they stay computed unless someone stored them.
+    """
     now = datetime.now(UTC)
+    return occurrences_between(event, now, now + timedelta(days=AUTO_CREATE_EVENT_DAYS))
 
-    new_event = CalendarEvent(
-        title=original.title,
-        start_date=next_start,
-        end_date=next_start + duration,
-        type=original.type,
-        sim_dcs=original.sim_dcs,
-        sim_bms=original.sim_bms,
-        description=original.description,
-        restrictions=original.restrictions,
-        registration=original.registration,
-        ato=original.ato,
-        repeat_event=original.repeat_event,
-        map_id=original.map_id,
-        server_id=original.server_id,
-        image_id=original.image_id,
-        owner_id=original.owner_id,
-        debrief=None,
-        created_at=now,
-        updated_at=now,
-    )
-    # Eagerly load modules via explicit query to avoid lazy-load issues
+
+@dataclass
+class Occurrence:
+    """Occurrence of a series computed for display, not stored."""
+
+    series: CalendarEvent
+    start_date: datetime
+    end_date: datetime
+
+
+async def virtual_occurrences(db: AsyncSession, dt_from: datetime, dt_to: datetime) -> list[Occurrence]:
+    """Occurrences overlapping [dt_from, dt_to] that are not stored, by start date.
+
+    Their series come with their owner loaded.
+    """
     result = await db.execute(
-        select(CalendarEvent).where(CalendarEvent.id == original.id).options(selectinload(CalendarEvent.modules))
+        select(CalendarEvent)
+        .where(
+            CalendarEvent.deleted == False,  # noqa: E712
+            CalendarEvent.repeat_event != CalendarEvent.REPEAT_NONE,
+            CalendarEvent.start_date <= dt_to,
+        )
+        .options(joinedload(CalendarEvent.owner))
     )
-    loaded = result.scalar_one()
-    for m in loaded.modules:
-        new_event.modules.append(m)
+    candidates = [
+        (series, start) for series in result.scalars().all() for start in occurrences_between(series, dt_from, dt_to)
+    ]
+    if not candidates:
+        return []
 
-    db.add(new_event)
-    await db.flush()
+    # Stored occurrences replace the computed ones, even deleted (cancelled) or moved
+    stored = await db.execute(
+        select(CalendarEvent.series_id, CalendarEvent.occurrence_start).where(
+            CalendarEvent.series_id.in_({series.id for series, _ in candidates}),
+            CalendarEvent.occurrence_start >= min(start for _, start in candidates),
+            CalendarEvent.occurrence_start <= dt_to,
+        )
+    )
+    taken = {(series_id, _utc(start)) for series_id, start in stored.all()}
+    occurrences = [
+        Occurrence(series, start, start + (series.end_date - series.start_date))
+        for series, start in candidates
+        if (series.id, start) not in taken
+    ]
+    return sorted(occurrences, key=lambda o: (o.start_date, o.series.id))
+
+
+def _occurrence_values(series: CalendarEvent, start: datetime, now: datetime) -> dict:
+    """Columns of a stored occurrence: the series', except dates, debrief and repeat type."""
+    return {
+        "title": series.title,
+        "start_date": start,
+        "end_date": start + (series.end_date - series.start_date),
+        "type": series.type,
+        "sim_dcs": series.sim_dcs,
+        "sim_bms": series.sim_bms,
+        "description": series.description,
+        "restrictions": series.restrictions,
+        "registration": series.registration,
+        "ato": series.ato,
+        "repeat_event": CalendarEvent.REPEAT_NONE,
+        "map_id": series.map_id,
+        "server_id": series.server_id,
+        "image_id": series.image_id,
+        "owner_id": series.owner_id,
+        "debrief": None,
+        "series_id": series.id,
+        "occurrence_start": start,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def find_occurrence(db: AsyncSession, series_id: int, start: datetime) -> CalendarEvent | None:
+    """The stored occurrence of a series computed to start at `start` (even deleted)."""
+    return await db.scalar(
+        select(CalendarEvent).where(CalendarEvent.series_id == series_id, CalendarEvent.occurrence_start == _utc(start))
+    )
 
-    original.repeat_event = CalendarEvent.REPEAT_NONE
-    original.updated_at = now
 
-    return new_event
+async def materialize_occurrence(db: AsyncSession, series: CalendarEvent, start: datetime) -> CalendarEvent:
+    """The stored occurrence of `series` starting at `start`, created if needed (not committed).
+
+    `start` must be an occurrence of the series (`is_occurrence`), and `series.modules`
+    loaded. Concurrent calls store a single row.
+    """
+    start = _utc(start)
+    existing = await find_occurrence(db, series.id, start)
+    if existing is not None:
+        return existing
+
+    occurrence = CalendarEvent(**_occurrence_values(series, start, datetime.now(UTC)), modules=list(series.modules))
+    try:
+        async with db.begin_nested():
+            db.add(occurrence)
+    except IntegrityError:
+        return await find_occurrence(db, series.id, start)  # Stored meanwhile by another request
+    logger.info("Stored occurrence %s of id=%d '%s': id=%d", start.isoformat(), series.id, series.title, occurrence.id)
+    return occurrence
+
+
+async def move_occurrences(db: AsyncSession, series: CalendarEvent, old_start: datetime, old_repeat: int) -> None:
+    """Re-key the stored occurrences of `series` after its start date or repeat type changed (not committed).
+
+    Stored occurrences are matched by their computed start: the n-th occurrence of the
+    series before the change becomes its n-th occurrence after it. Their own dates are kept.
+    """
+    result = await db.execute(
+        select(CalendarEvent).where(CalendarEvent.series_id == series.id).order_by(CalendarEvent.occurrence_start)
+    )
+    stored = result.scalars().all()
+    if not stored or series.repeat_event == CalendarEvent.REPEAT_NONE:
+        return  # A series no longer repeating lists no computed occurrence to match
+
+    last = _utc(stored[-1].occurrence_start)
+    before = CalendarEvent(start_date=old_start, repeat_event=old_repeat)
+    rank = {start: n for n, start in enumerate(takewhile(lambda start: start <= last, iter_occurrences(before)))}
+    after = list(islice(iter_occurrences(series), len(rank)))
+    moved = [
+        (occurrence, after[rank[_utc(occurrence.occurrence_start)]])
+        for occurrence in stored
+        if _utc(occurrence.occurrence_start) in rank
+    ]
+    # Cleared first, so that no intermediate state breaks the unique (series, start) key
+    for occurrence, _ in moved:
+        occurrence.occurrence_start = None
+    await db.flush()
+    for occurrence, start in moved:
+        occurrence.occurrence_start = start
 
 
 async def check_recurring_events(db: AsyncSession) -> int:
-    """Find all repeatable events and create next occurrences as needed.
+    """Store the occurrences of every series from now to AUTO_CREATE_EVENT_DAYS days ahead.
+
+    Occurrences are listed without being stored; this only prepares them ahead (e.g. to
+    set up flights), from the `calendar auto` command. Events, then their modules, are
+    inserted in one statement each; occurrences already stored, or stored meanwhile by a
+    concurrent run or a vote, are skipped one by one (ON CONFLICT DO NOTHING).
 
     Returns the number of new events created.
     """
-    query = (
+    result = await db.execute(
         select(CalendarEvent)
         .where(
             CalendarEvent.deleted == False,  # noqa: E712
@@ -132,16 +257,36 @@ async def check_recurring_events(db: AsyncSession) -> int:
         )
         .options(selectinload(CalendarEvent.modules))
     )
-    result = await db.execute(query)
-    events = result.scalars().all()
+    candidates = [(series, start) for series in result.scalars().all() for start in next_occurrences(series)]
+    if not candidates:
+        return 0
 
-    count = 0
-    for event in events:
-        if is_needed_to_create_next_event(event):
-            logger.info("Creating next event from id=%d '%s' (repeat=%d)", event.id, event.title, event.repeat_event)
-            new_event = await create_next_event(db, event)
-            logger.info("New event created: id=%d '%s' (repeat=%d)", new_event.id, new_event.title, new_event.repeat_event)
-            count += 1
+    stored = await db.execute(
+        select(CalendarEvent.series_id, CalendarEvent.occurrence_start).where(
+            CalendarEvent.series_id.in_({series.id for series, _ in candidates}),
+            CalendarEvent.occurrence_start >= min(start for _, start in candidates),
+        )
+    )
+    taken = {(series_id, _utc(start)) for series_id, start in stored.all()}
+    missing = [(series, start) for series, start in candidates if (series.id, start) not in taken]
+    if not missing:
+        return 0
 
+    now = datetime.now(UTC)
+    conflict_insert = _CONFLICT_INSERTS[db.get_bind().dialect.name]
+    inserted = (
+        conflict_insert(CalendarEvent)
+        .on_conflict_do_nothing(index_elements=["series_id", "occurrence_start"])
+        .returning(CalendarEvent.id, CalendarEvent.series_id)
+    )
+    new_rows = (await db.execute(inserted, [_occurrence_values(series, start, now) for series, start in missing])).all()
+    modules = {series.id: series.modules for series, _ in missing}
+    module_rows = [
+        {"event_id": new_id, "module_id": module.id} for new_id, series_id in new_rows for module in modules[series_id]
+    ]
+    if module_rows:
+        await db.execute(insert(event_module_table), module_rows)
     await db.commit()
-    return count
+    if len(new_rows) < len(missing):
+        logger.info("Recurring events: %d occurrence(s) stored meanwhile, skipped", len(missing) - len(new_rows))
+    return len(new_rows)
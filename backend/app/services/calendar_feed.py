@@ -0,0 +1,206 @@
+"""iCalendar (RFC 5545) feeds of the calendar, for subscriptions from Google, Outlook, etc.
+
+- `GET /api/calendar/feed.ics`: every event.
+- `GET /api/calendar/feed.ics?token=...`: the events a user voted yes or maybe to,
+  the token being issued by `GET /api/calendar/feed-token`.
+
+Feeds are streamed: events are fetched `FEED_BATCH_SIZE` rows at a time and written as
+they come, so the whole history never sits in memory. Calendar clients poll every few
+minutes; `feed_version` answers their conditional requests from one aggregate query
+(last `updated_at` and event count), without loading any event.
+
+The public feed also lists the occurrences of repeating events not stored yet, from
+today to AUTO_CREATE_EVENT_DAYS days ahead: as that window moves every day, so does the
+version of a feed with repeating events.
+"""
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from urllib.parse import urlsplit
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.calendar import CalendarEvent, Vote
+from app.services.calendar import AUTO_CREATE_EVENT_DAYS, virtual_occurrences
+from app.utils.etag import make_etag
+from app.version import APP_VERSION
+
+FEED_BATCH_SIZE = 200
+# Suggested polling interval (clients mostly ignore it and use their own)
+REFRESH_INTERVAL = "PT15M"
+# RFC 5545 3.1: lines longer than this many octets are folded
+MAX_LINE_OCTETS = 75
+
+
+@dataclass
+class FeedVersion:
+    etag: str
+    last_modified: datetime | None
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _line(name: str, value: str) -> bytes:
+    """Content line, folded without splitting a UTF-8 sequence."""
+    data = f"{name}:{value}".encode()
+    parts, start, limit = [], 0, MAX_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:  # UTF-8 continuation byte
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, MAX_LINE_OCTETS - 1  # Continuation lines start with a space
+    parts.append(data[start:])
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _format_datetime(value: datetime) -> str:
+    # SQLite returns naive datetimes for DateTime(timezone=True) columns
+    value = value.astimezone(UTC) if value.tzinfo is not None else value
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value
+
+
+def _today() -> datetime:
+    return datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _votes_of(query: Select, user_id: int) -> Select:
+    return query.join(Vote, Vote.event_id == CalendarEvent.id).where(Vote.user_id == user_id)
+
+
+_ATTENDING = or_(Vote.vote == True, Vote.vote.is_(None))  # noqa: E712
+
+
+async def feed_version(db: AsyncSession, user_id: int | None = None) -> FeedVersion:
+    """Validators of the feed, changing whenever its content does.
+
+    Deleting an event bumps its `updated_at`, hence the max over deleted events too.
+    """
+    if user_id is None:
+        listed = CalendarEvent.deleted == False  # noqa: E712
+        query = select(
+            func.max(CalendarEvent.updated_at),
+            func.count(CalendarEvent.id).filter(listed),
+            func.count(CalendarEvent.id).filter(listed, CalendarEvent.repeat_event != CalendarEvent.REPEAT_NONE),
+        )
+        last_modified, count, series = (await db.execute(query)).one()
+        if series:
+            # The computed occurrences change at midnight
+            today = _today()
+            count = f"{count}|{today.date()}"
+            last_modified = today if last_modified is None else max(_utc(last_modified), today)
+    else:
+        query = _votes_of(
+            select(
+                func.max(CalendarEvent.updated_at),
+                func.max(Vote.updated_at),
+                func.count(CalendarEvent.id).filter(CalendarEvent.deleted == False, _ATTENDING),  # noqa: E712
+            ),
+            user_id,
+        )
+        event_modified, vote_modified, count = (await db.execute(query)).one()
+        last_modified = max(filter(None, (event_modified, vote_modified)), default=None)
+    scope = "all" if user_id is None else f"user:{user_id}"
+    etag = make_etag(f"{APP_VERSION}|{scope}|{last_modified}|{count}".encode())
+    return FeedVersion(etag=etag, last_modified=last_modified)
+
+
+def _vevent(
+    event_id, title, description, start_date, end_date, type, created_at, updated_at, vote=True, *, occurrence=False
+) -> bytes:
+    """VEVENT of an event, or of a computed occurrence of the series `event_id`."""
+    base_url = settings.APP_URL.rstrip("/")
+    stamp = _format_datetime(updated_at or created_at or start_date)
+    uid, url = f"event-{event_id}", f"{base_url}/calendar/{event_id}"
+    if occurrence:
+        uid += f"-{_format_datetime(start_date)}"
+        url += f"?occurrence={_utc(start_date).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+    lines = [
+        _line("BEGIN", "VEVENT"),
+        _line("UID", f"{uid}@{urlsplit(base_url).hostname or 'localhost'}"),
+        _line("DTSTAMP", stamp),
+        _line("LAST-MODIFIED", stamp),
+        _line("DTSTART", _format_datetime(start_date)),
+        _line("DTEND", _format_datetime(end_date)),
+        _line("SUMMARY", _escape(title)),
+        _line("CATEGORIES", _escape(CalendarEvent.EVENTS.get(type, "inconnu"))),
+        _line("STATUS", "TENTATIVE" if vote is None else "CONFIRMED"),
+        _line("URL", url),
+    ]
+    if description:
+        lines.append(_line("DESCRIPTION", _escape(description)))
+    lines.append(_line("END", "VEVENT"))
+    return b"".join(lines)
+
+
+async def stream_feed(db: AsyncSession, user_id: int | None = None) -> AsyncIterator[bytes]:
+    """The feed as a VCALENDAR, one chunk per batch of events (by start date)."""
+    columns = [
+        CalendarEvent.id,
+        CalendarEvent.title,
+        CalendarEvent.description,
+        CalendarEvent.start_date,
+        CalendarEvent.end_date,
+        CalendarEvent.type,
+        CalendarEvent.created_at,
+        CalendarEvent.updated_at,
+    ]
+    if user_id is None:
+        query, name = select(*columns), "VEAF"
+    else:
+        # The vote sets the event status: maybe = tentative
+        query, name = _votes_of(select(*columns, Vote.vote), user_id).where(_ATTENDING), "VEAF - Mes événements"
+    query = (
+        query.where(CalendarEvent.deleted == False)  # noqa: E712
+        .order_by(CalendarEvent.start_date, CalendarEvent.id)
+        .execution_options(yield_per=FEED_BATCH_SIZE)
+    )
+
+    yield b"".join(
+        [
+            _line("BEGIN", "VCALENDAR"),
+            _line("VERSION", "2.0"),
+            _line("PRODID", f"-//VEAF//Site {APP_VERSION}//FR"),
+            _line("CALSCALE", "GREGORIAN"),
+            _line("METHOD", "PUBLISH"),
+            _line("X-WR-CALNAME", _escape(name)),
+            _line("REFRESH-INTERVAL;VALUE=DURATION", REFRESH_INTERVAL),
+            _line("X-PUBLISHED-TTL", REFRESH_INTERVAL),
+        ]
+    )
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        yield b"".join(_vevent(*row) for row in rows)
+    if user_id is None:
+        today = _today()
+        occurrences = await virtual_occurrences(db, today, today + timedelta(days=AUTO_CREATE_EVENT_DAYS))
+        yield b"".join(
+            _vevent(
+                o.series.id,
+                o.series.title,
+                o.series.description,
+                o.start_date,
+                o.end_date,
+                o.series.type,
+                o.series.created_at,
+                o.series.updated_at,
+                occurrence=True,
+            )
+            for o in occurrences
+        )
+    yield _line("END", "VCALENDAR")
@@ -0,0 +1,225 @@
+"""Read model of the calendar views (month, week, planning).
+
+`list_calendar_events` answers `GET /api/calendar/events` from one aggregated query
+(listed columns, owner nickname, vote counts, slot fill) plus the computed occurrences
+of repeating events (app.services.calendar), and caches the entries per calendar month:
+navigating between months only queries the months not seen yet. Writes to events or
+votes call `invalidate_calendar` for the months they touch (every month for a series).
+"""
+
+from datetime import UTC, date, datetime, time
+
+from sqlalchemy import Select, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.calendar import CalendarEvent, Flight, Slot, Vote
+from app.models.user import User
+from app.schemas.calendar import EventCalendarOut
+from app.services.calendar import virtual_occurrences
+from app.utils.cache import calendar_cache
+
+# Wider requests (e.g. a whole-year list) bypass the month cache
+MAX_CACHED_MONTHS = 13
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for DateTime(timezone=True) columns
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _months(first: date, last: date) -> list[date]:
+    """First day of every month from `first` to `last` included."""
+    months, month = [], _month_start(first)
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _month_key(month: date) -> str:
+    return f"{month:%Y-%m}"
+
+
+def _in_range(query: Select, dt_from: datetime | None, dt_to: datetime | None) -> Select:
+    query = query.where(CalendarEvent.deleted == False)  # noqa: E712
+    if dt_from is not None:
+        query = query.where(CalendarEvent.end_date >= dt_from)
+    if dt_to is not None:
+        query = query.where(CalendarEvent.start_date <= dt_to)
+    return query
+
+
+async def _query_events(db: AsyncSession, dt_from: datetime | None, dt_to: datetime | None) -> list[EventCalendarOut]:
+    """Events overlapping [dt_from, dt_to] with their aggregates, in a single statement.
+
+    Occurrences of repeating events are computed for bounded ranges only.
+    """
+    # Aggregates are computed for the events of the range only, then outer-joined
+    votes = _in_range(
+        select(
+            Vote.event_id,
+            func.sum(case((Vote.vote == True, 1), else_=0)).label("yes"),  # noqa: E712
+            func.sum(case((Vote.vote == False, 1), else_=0)).label("no"),  # noqa: E712
+            func.sum(case((Vote.vote.is_(None), 1), else_=0)).label("maybe"),
+        ).join(CalendarEvent, CalendarEvent.id == Vote.event_id),
+        dt_from,
+        dt_to,
+    ).group_by(Vote.event_id).subquery()
+    slots_total = _in_range(
+        select(Flight.event_id, func.sum(Flight.nb_slots).label("total"))
+        .join(CalendarEvent, CalendarEvent.id == Flight.event_id),
+        dt_from,
+        dt_to,
+    ).group_by(Flight.event_id).subquery()
+    slots_filled = _in_range(
+        select(Flight.event_id, func.count(Slot.id).label("filled"))
+        .join(Slot, Slot.flight_id == Flight.id)
+        .join(CalendarEvent, CalendarEvent.id == Flight.event_id)
+        .where(or_(Slot.user_id.is_not(None), Slot.username.is_not(None))),
+        dt_from,
+        dt_to,
+    ).group_by(Flight.event_id).subquery()
+
+    query = _in_range(
+        select(
+            CalendarEvent.id,
+            CalendarEvent.title,
+            CalendarEvent.start_date,
+            CalendarEvent.end_date,
+            CalendarEvent.type,
+            CalendarEvent.sim_dcs,
+            CalendarEvent.sim_bms,
+            CalendarEvent.registration,
+            CalendarEvent.series_id,
+            CalendarEvent.occurrence_start,
+            User.nickname,
+            func.coalesce(votes.c.yes, 0),
+            func.coalesce(votes.c.no, 0),
+            func.coalesce(votes.c.maybe, 0),
+            func.coalesce(slots_total.c.total, 0),
+            func.coalesce(slots_filled.c.filled, 0),
+        )
+        .outerjoin(User, User.id == CalendarEvent.owner_id)
+        .outerjoin(votes, votes.c.event_id == CalendarEvent.id)
+        .outerjoin(slots_total, slots_total.c.event_id == CalendarEvent.id)
+        .outerjoin(slots_filled, slots_filled.c.event_id == CalendarEvent.id),
+        dt_from,
+        dt_to,
+    ).order_by(CalendarEvent.start_date, CalendarEvent.id)
+
+    result = await db.execute(query)
+    events = [
+        EventCalendarOut(
+            id=id,
+            title=title,
+            start_date=_utc(start_date),
+            end_date=_utc(end_date),
+            type=type,
+            type_as_string=CalendarEvent.EVENTS.get(type, "inconnu"),
+            type_color=CalendarEvent.EVENTS_COLORS.get(type, "#000000"),
+            sim_dcs=sim_dcs,
+            sim_bms=sim_bms,
+            registration=registration,
+            series_id=series_id,
+            occurrence_start=_utc(occurrence_start) if occurrence_start else None,
+            owner_nickname=nickname,
+            votes_yes=yes,
+            votes_no=no,
+            votes_maybe=maybe,
+            slots_total=total,
+            slots_filled=filled,
+            slots_fill_ratio=round(min(filled / total, 1.0), 3) if total else None,
+        )
+        for (
+            id, title, start_date, end_date, type, sim_dcs, sim_bms, registration, series_id, occurrence_start,
+            nickname, yes, no, maybe, total, filled,
+        ) in result.all()
+    ]
+    if dt_from is None or dt_to is None:
+        return events
+
+    for occurrence in await virtual_occurrences(db, dt_from, dt_to):
+        series = occurrence.series
+        events.append(
+            EventCalendarOut(
+                id=series.id,
+                title=series.title,
+                start_date=occurrence.start_date,
+                end_date=occurrence.end_date,
+                type=series.type,
+                type_as_string=series.type_as_string,
+                type_color=series.type_color,
+                sim_dcs=series.sim_dcs,
+                sim_bms=series.sim_bms,
+                registration=series.registration,
+                series_id=series.id,
+                occurrence_start=occurrence.start_date,
+                virtual=True,
+                owner_nickname=series.owner.nickname if series.owner else None,
+            )
+        )
+    return sorted(events, key=lambda e: (e.start_date, e.id))
+
+
+async def list_calendar_events(
+    db: AsyncSession, from_date: date | None = None, to_date: date | None = None
+) -> list[EventCalendarOut]:
+    """Events overlapping the days from `from_date` to `to_date` (both included), by start date."""
+    dt_from = datetime.combine(from_date, time.min, tzinfo=UTC) if from_date else None
+    dt_to = datetime.combine(to_date, time.max, tzinfo=UTC) if to_date else None
+    if from_date is None or to_date is None or from_date > to_date:
+        return await _query_events(db, dt_from, dt_to)
+    months = _months(from_date, to_date)
+    if len(months) > MAX_CACHED_MONTHS:
+        return await _query_events(db, dt_from, dt_to)
+
+    buckets = {month: calendar_cache.get(_month_key(month)) for month in months}
+    missing = [month for month, bucket in buckets.items() if bucket is None]
+    if missing:
+        # One query for the span of the missing months, split into month buckets
+        span_start = datetime.combine(missing[0], time.min, tzinfo=UTC)
+        span_end = datetime.combine(_next_month(missing[-1]), time.min, tzinfo=UTC)
+        loaded = await _query_events(db, span_start, span_end)
+        for month in missing:
+            start = datetime.combine(month, time.min, tzinfo=UTC)
+            end = datetime.combine(_next_month(month), time.min, tzinfo=UTC)
+            buckets[month] = [e for e in loaded if e.end_date >= start and e.start_date < end]
+            calendar_cache[_month_key(month)] = buckets[month]
+
+    # Events spanning several months are in several buckets (computed occurrences share their series id)
+    events = {
+        (e.id, e.start_date): e
+        for bucket in buckets.values()
+        for e in bucket
+        if e.end_date >= dt_from and e.start_date <= dt_to
+    }
+    return sorted(events.values(), key=lambda e: (e.start_date, e.id))
+
+
+def invalidate_calendar(start: datetime | None = None, end: datetime | None = None) -> None:
+    """Drop the cached months overlapping [start, end], or every month without dates.
+
+    Call after committing a change to an event (with its old and new dates) or its votes,
+    without dates for a repeating event (its occurrences are in every following month).
+    """
+    if start is None:
+        calendar_cache.clear()
+        return
+    for month in _months(start.date(), (end or start).date()):
+        calendar_cache.pop(_month_key(month), None)
+
+
+def invalidate_event(event: CalendarEvent) -> None:
+    """Drop the cached months showing `event`: all of them for a repeating event."""
+    if event.repeat_event != CalendarEvent.REPEAT_NONE:
+        invalidate_calendar()
+    else:
+        invalidate_calendar(event.start_date, event.end_date)
@@ -1,84 +1,195 @@
+import asyncio
+import importlib.util
 import logging
 
 import httpx
 
 from app.config import settings
 from app.utils.cache import cached, dcsbot_cache
+from app.utils.metrics import track_upstream
 
 logger = logging.getLogger(__name__)
 
 TIMEOUT = 10.0  # seconds
+FRESH_TTL = 120  # seconds; older entries are served stale while refreshed in background
 
+SNAPSHOT_KEY = "snapshot"
 
-@cached(dcsbot_cache)
+# Application-scoped client (keep-alive pool), opened/closed by main.lifespan
+_client: httpx.AsyncClient | None = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    # HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 keep-alive
+    http2 = settings.DCSBOT_HTTP2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        base_url=settings.API_DCSSERVERBOT_URL,
+        timeout=TIMEOUT,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.DCSBOT_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DCSBOT_POOL_MAX_KEEPALIVE,
+        ),
+    )
+
+
+async def start_client() -> None:
+    """Open the shared DCSServerBot HTTP client. Called at application startup."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+
+
+async def close_client() -> None:
+    """Close the shared DCSServerBot HTTP client. Called at application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily outside the app lifespan (CLI, tests)."""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def _get_json(path: str, params: dict | None = None):
+    """GET a DCSServerBot API path through the shared client and return the decoded JSON."""
+    with track_upstream("dcsbot", path):
+        resp = await _get_client().get(path, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+
+@cached(dcsbot_cache, fresh_ttl=FRESH_TTL)
 async def get_servers() -> list[dict] | None:
     """Fetch servers list from DCSServerBot API."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(f"{settings.API_DCSSERVERBOT_URL}/serverapi/servers")
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_json("/serverapi/servers")
     except Exception:
         logger.exception("Failed to fetch DCSServerBot servers")
         return None
 
 
-@cached(dcsbot_cache)
+@cached(dcsbot_cache, fresh_ttl=FRESH_TTL)
 async def get_server_stats() -> dict | None:
     """Fetch global server statistics from DCSServerBot API."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(f"{settings.API_DCSSERVERBOT_URL}/serverapi/serverstats")
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_json("/serverapi/serverstats")
     except Exception:
         logger.exception("Failed to fetch DCSServerBot server stats")
         return None
 
 
-@cached(dcsbot_cache)
+@cached(dcsbot_cache, fresh_ttl=FRESH_TTL)
 async def get_server(server_name: str) -> list[dict] | None:
     """Fetch a specific server from DCSServerBot API by server_name."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(
-                f"{settings.API_DCSSERVERBOT_URL}/serverapi/servers",
-                params={"server_name": server_name},
-            )
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_json("/serverapi/servers", params={"server_name": server_name})
     except Exception:
         logger.exception("Failed to fetch DCSServerBot server %s", server_name)
         return None
 
 
-@cached(dcsbot_cache)
+@cached(dcsbot_cache, fresh_ttl=FRESH_TTL)
 async def get_server_stats_by_name(server_name: str) -> dict | None:
     """Fetch server-specific statistics from DCSServerBot API."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(
-                f"{settings.API_DCSSERVERBOT_URL}/serverapi/serverstats",
-                params={"server_name": server_name},
-            )
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_json("/serverapi/serverstats", params={"server_name": server_name})
     except Exception:
         logger.exception("Failed to fetch DCSServerBot stats for %s", server_name)
         return None
 
 
-@cached(dcsbot_cache)
+@cached(dcsbot_cache, fresh_ttl=FRESH_TTL)
 async def get_server_attendance(server_name: str) -> dict | None:
     """Fetch server attendance from DCSServerBot API."""
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            resp = await client.get(
-                f"{settings.API_DCSSERVERBOT_URL}/serverapi/server_attendance",
-                params={"server_name": server_name},
-            )
-            resp.raise_for_status()
-            return resp.json()
+        return await _get_json("/serverapi/server_attendance", params={"server_name": server_name})
     except Exception:
         logger.exception("Failed to fetch DCSServerBot attendance for %s", server_name)
         return None
+
+
+# ---------------------------------------------------------------------------
+# Background snapshot (DCSBOT_POLL_INTERVAL > 0): request handlers read the
+# snapshot built by the `dcsbot_import` job and never call the upstream.
+# ---------------------------------------------------------------------------
+
+
+def polling_enabled() -> bool:
+    """True when a background poller feeds the snapshot instead of on-demand fetches."""
+    return bool(settings.API_DCSSERVERBOT_URL) and settings.DCSBOT_POLL_INTERVAL > 0
+
+
+def get_snapshot() -> dict | None:
+    """Read the last snapshot built by `poll_snapshot`. Returns None if not built yet."""
+    return dcsbot_cache.get(SNAPSHOT_KEY)
+
+
+async def _get_json_or_none(path: str, params: dict | None = None):
+    try:
+        return await _get_json(path, params=params)
+    except Exception:
+        logger.exception("Failed to fetch DCSServerBot %s %s", path, params or "")
+        return None
+
+
+async def poll_snapshot() -> dict | None:
+    """Fetch servers, global stats and per-server stats/attendance and store a snapshot.
+
+    Snapshot layout::
+
+        {"servers": [...], "stats": {...}, "by_name": {name: {"server", "stats", "attendance", "records"}}}
+
+    `records` counts the upstream records fetched for the server in this poll (server,
+    stats, attendance).
+
+    If the servers list cannot be fetched the previous snapshot is kept (and expires after
+    CACHE_MAX_STALE). Returns the new snapshot, or None on failure.
+    """
+    servers, stats = await asyncio.gather(
+        _get_json_or_none("/serverapi/servers"),
+        _get_json_or_none("/serverapi/serverstats"),
+    )
+    if servers is None:
+        return None
+
+    names = [s.get("name", "") for s in servers]
+    per_server = await asyncio.gather(*(
+        asyncio.gather(
+            _get_json_or_none("/serverapi/serverstats", params={"server_name": name}),
+            _get_json_or_none("/serverapi/server_attendance", params={"server_name": name}),
+        )
+        for name in names
+    ))
+
+    # Keep previous values for the parts that failed this round
+    previous = get_snapshot() or {}
+    previous_by_name = previous.get("by_name", {})
+    by_name = {}
+    for name, server, (server_stats, attendance) in zip(names, servers, per_server):
+        before = previous_by_name.get(name, {})
+        by_name[name] = {
+            "server": server,
+            "stats": server_stats if server_stats is not None else before.get("stats"),
+            "attendance": attendance if attendance is not None else before.get("attendance"),
+            "records": 1 + (server_stats is not None) + (attendance is not None),
+        }
+    snapshot = {
+        "servers": servers,
+        "stats": stats if stats is not None else previous.get("stats"),
+        "by_name": by_name,
+    }
+    dcsbot_cache[SNAPSHOT_KEY] = snapshot
+    return snapshot
+
+
+async def current_servers() -> list[dict] | None:
+    """Servers list for request handlers: snapshot when polling, cached upstream call otherwise."""
+    if polling_enabled():
+        return (get_snapshot() or {}).get("servers")
+    return await get_servers()
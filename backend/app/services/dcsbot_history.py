@@ -0,0 +1,181 @@
+"""DCSServerBot time-series: per-server samples with automatic downsampling.
+
+The poller records one row per server and minute (`record_samples`). As rows age,
+`rollup_samples` merges them into coarser buckets and deletes the originals:
+
+    minute rows older than MINUTE_RETENTION -> hour rows
+    hour rows older than HOUR_RETENTION     -> day rows
+    day rows older than DAY_RETENTION       -> deleted
+
+So storage stays bounded to ~2 days of minutes, ~90 days of hours and ~2 years of days
+per server.
+"""
+
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dcs import DcsServerSample
+
+logger = logging.getLogger(__name__)
+
+MINUTE_RETENTION = timedelta(days=2)
+HOUR_RETENTION = timedelta(days=90)
+DAY_RETENTION = timedelta(days=730)
+
+# (source resolution, target resolution, source retention)
+_ROLLUPS = [
+    (DcsServerSample.RESOLUTION_MINUTE, DcsServerSample.RESOLUTION_HOUR, MINUTE_RETENTION),
+    (DcsServerSample.RESOLUTION_HOUR, DcsServerSample.RESOLUTION_DAY, HOUR_RETENTION),
+]
+
+# Last-value columns (cumulative counters / rolling windows reported by DCSServerBot)
+_LAST_VALUE_FIELDS = (
+    "unique_players_24h",
+    "unique_players_7d",
+    "unique_players_30d",
+    "total_sorties",
+    "total_kills",
+    "total_deaths",
+)
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite (tests) returns naive datetimes
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt
+
+
+def bucket_start(dt: datetime, resolution: int) -> datetime:
+    """Floor `dt` to the start of its `resolution`-second bucket (UTC)."""
+    ts = int(_as_utc(dt).timestamp())
+    return datetime.fromtimestamp(ts - ts % resolution, tz=UTC)
+
+
+def _merge(target: DcsServerSample, source: DcsServerSample) -> None:
+    """Fold `source` into `target` (weighted average, max, latest values)."""
+    total = target.samples + source.samples
+    target.players_avg = (target.players_avg * target.samples + source.players_avg * source.samples) / total
+    target.players_max = max(target.players_max, source.players_max)
+    target.samples = total
+    for field in _LAST_VALUE_FIELDS:
+        value = getattr(source, field)
+        if value is not None:
+            setattr(target, field, value)
+
+
+async def record_samples(db: AsyncSession, snapshot: dict, now: datetime | None = None) -> int:
+    """Record the current minute sample of every server in a DCSServerBot snapshot.
+
+    Several polls within the same minute are merged into one row. Returns the number of
+    servers sampled. The caller commits.
+    """
+    bucket = bucket_start(now or datetime.now(UTC), DcsServerSample.RESOLUTION_MINUTE)
+    count = 0
+    for name, entry in snapshot.get("by_name", {}).items():
+        server = entry.get("server") or {}
+        attendance = entry.get("attendance") or {}
+        players = len(server.get("players") or [])
+        sample = DcsServerSample(
+            server_name=name[:64],
+            resolution=DcsServerSample.RESOLUTION_MINUTE,
+            bucket_at=bucket,
+            samples=1,
+            players_avg=float(players),
+            players_max=players,
+            **{field: attendance.get(field) for field in _LAST_VALUE_FIELDS},
+        )
+        existing = await db.get(DcsServerSample, (sample.server_name, sample.resolution, bucket))
+        if existing is None:
+            db.add(sample)
+        else:
+            _merge(existing, sample)
+        count += 1
+    return count
+
+
+def _delete_older(resolution: int, cutoff: datetime):
+    # Bulk delete: the loaded rows are not modified afterwards, no need to sync the session
+    return (
+        delete(DcsServerSample)
+        .where(DcsServerSample.resolution == resolution, DcsServerSample.bucket_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rollup_samples(db: AsyncSession, now: datetime | None = None) -> int:
+    """Merge aged rows into the next resolution and delete them, then prune day rows
+    older than DAY_RETENTION. Returns rows rolled up.
+
+    The cutoff is aligned on the target bucket, so a target bucket is always built from
+    all of its source rows at once. The caller commits.
+    """
+    now = now or datetime.now(UTC)
+    rolled = 0
+    for source_res, target_res, retention in _ROLLUPS:
+        cutoff = bucket_start(now - retention, target_res)
+        result = await db.execute(
+            select(DcsServerSample)
+            .where(DcsServerSample.resolution == source_res, DcsServerSample.bucket_at < cutoff)
+            .order_by(DcsServerSample.bucket_at)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            continue
+
+        targets: dict[tuple[str, datetime], DcsServerSample] = {}
+        for row in rows:
+            bucket = bucket_start(row.bucket_at, target_res)
+            key = (row.server_name, bucket)
+            target = targets.get(key)
+            if target is None:
+                target = await db.get(DcsServerSample, (row.server_name, target_res, bucket))
+                if target is None:
+                    target = DcsServerSample(
+                        server_name=row.server_name,
+                        resolution=target_res,
+                        bucket_at=bucket,
+                        samples=0,
+                        players_avg=0.0,
+                        players_max=0,
+                    )
+                    db.add(target)
+                targets[key] = target
+            _merge(target, row)
+
+        await db.execute(_delete_older(source_res, cutoff))
+        logger.info("DCS samples: rolled up %d row(s) from %ds to %ds buckets", len(rows), source_res, target_res)
+        rolled += len(rows)
+
+    pruned = await db.execute(_delete_older(DcsServerSample.RESOLUTION_DAY, now - DAY_RETENTION))
+    if pruned.rowcount:
+        logger.info("DCS samples: pruned %d day row(s) older than %s", pruned.rowcount, DAY_RETENTION)
+    return rolled
+
+
+def pick_resolution(start: datetime, now: datetime | None = None) -> int:
+    """Finest resolution still retained at `start`."""
+    age = (now or datetime.now(UTC)) - _as_utc(start)
+    if age <= MINUTE_RETENTION:
+        return DcsServerSample.RESOLUTION_MINUTE
+    if age <= HOUR_RETENTION:
+        return DcsServerSample.RESOLUTION_HOUR
+    return DcsServerSample.RESOLUTION_DAY
+
+
+async def get_history(
+    db: AsyncSession, server_name: str, start: datetime, end: datetime, resolution: int
+) -> list[DcsServerSample]:
+    """Samples of one server at `resolution` with bucket_at in [start, end), oldest first."""
+    result = await db.execute(
+        select(DcsServerSample)
+        .where(
+            DcsServerSample.server_name == server_name,
+            DcsServerSample.resolution == resolution,
+            DcsServerSample.bucket_at >= start,
+            DcsServerSample.bucket_at < end,
+        )
+        .order_by(DcsServerSample.bucket_at)
+    )
+    return list(result.scalars().all())
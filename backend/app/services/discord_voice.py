@@ -1,15 +1,162 @@
+"""Discord voice presence, from a Gateway bot.
+
+The bot runs in a single worker: the one holding the BOT_LEASE lease (`acquire_lease`).
+Every SYNC_INTERVAL seconds (`sync_discord_voice`), it shares its voice index in
+`discord_voice_cache` if it changed, and the other workers load it into their own
+`voice_index`; their streams then send snapshots instead of diffs.
+"""
+
 import asyncio
 import logging
-from threading import Thread
+import os
+from threading import Lock, Thread
 
 import discord
 
 from app.config import settings
-from app.utils.cache import discord_voice_cache
+from app.utils.broadcast import RESYNC, EventBus
+from app.utils.cache import acquire_lease, discord_voice_cache, release_lease
+from app.utils.metrics import DISCORD_GATEWAY_LATENCY, UPSTREAM_ERRORS, UPSTREAM_EVENTS
 
 logger = logging.getLogger(__name__)
 
+SYNC_INTERVAL = 2  # seconds between lease renewals and index shares (bot worker) or loads (others)
+BOT_LEASE = "discord_voice_bot"
+BOT_LEASE_TTL = 30  # seconds before another worker takes over a stopped bot worker
+
 _monitor: "DiscordVoiceMonitor | None" = None
+# Version of the index last shared, in the bot's worker
+_shared: int | None = None
+# (pid, version) of the shared index last loaded, in the workers without the bot
+_loaded: tuple[int, int] | None = None
+
+# Join/leave/move diffs published by the bot thread on the main event loop
+voice_events = EventBus()
+
+
+class VoiceIndex:
+    """Voice presence of one guild, maintained incrementally.
+
+    The bot thread applies each join/leave/move in O(1); request handlers read
+    `snapshot()`, which is only rebuilt when `version` changed since the last read.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._ready = False
+        self._guild_name = ""
+        self._channels: dict[int, str] = {}  # channel_id -> name, in guild order
+        self._members: dict[int, dict[int, str]] = {}  # channel_id -> {user_id: nickname}
+        self._states: dict[int, dict] = {}  # user_id -> {channel_id, nickname, bot}
+        self._version = 0
+        self._snapshot: dict | None = None
+        self._snapshot_version = -1
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def user_count(self) -> int:
+        return len(self._states)
+
+    def get(self, user_id: int) -> dict | None:
+        return self._states.get(user_id)
+
+    def reset(self, guild_name: str, channels: list[tuple[int, str]], states: dict[int, dict]) -> None:
+        """Replace the whole index (READY / reconnect). Bots are ignored."""
+        with self._lock:
+            self._guild_name = guild_name
+            self._channels = dict(channels)
+            self._members = {}
+            self._states = {}
+            for user_id, state in states.items():
+                self._add(user_id, state)
+            self._ready = True
+            self._version += 1
+
+    def set_channels(self, channels: list[tuple[int, str]]) -> None:
+        """Replace the channel list (channel created, deleted or renamed)."""
+        with self._lock:
+            self._channels = dict(channels)
+            self._version += 1
+
+    def update(self, user_id: int, state: dict | None) -> None:
+        """Apply one voice state change; `state` is None when the user left voice."""
+        with self._lock:
+            self._remove(user_id)
+            if state is not None:
+                self._add(user_id, state)
+            self._version += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ready = False
+            self._guild_name = ""
+            self._channels = {}
+            self._members = {}
+            self._states = {}
+            self._version += 1
+
+    def export(self) -> dict | None:
+        """Arguments of `reset` rebuilding this index (None before READY)."""
+        with self._lock:
+            if not self._ready:
+                return None
+            return {
+                "guild_name": self._guild_name,
+                "channels": list(self._channels.items()),
+                "states": dict(self._states),
+            }
+
+    def snapshot(self) -> dict | None:
+        """Current status (users, channels, user_count, guild_name), None before READY.
+
+        The returned dict is shared between readers and must not be modified.
+        """
+        with self._lock:
+            if not self._ready:
+                return None
+            if self._snapshot_version != self._version:
+                self._snapshot = self._materialise()
+                self._snapshot_version = self._version
+            return self._snapshot
+
+    def _add(self, user_id: int, state: dict) -> None:
+        if state["bot"]:
+            return
+        self._states[user_id] = state
+        self._members.setdefault(state["channel_id"], {})[user_id] = state["nickname"]
+
+    def _remove(self, user_id: int) -> None:
+        state = self._states.pop(user_id, None)
+        if state is not None:
+            self._members.get(state["channel_id"], {}).pop(user_id, None)
+
+    def _materialise(self) -> dict:
+        def users(members: dict[int, str]) -> list[dict]:
+            return [{"user_id": str(user_id), "nickname": nickname} for user_id, nickname in members.items()]
+
+        return {
+            "users": [{"user_id": str(user_id), "nickname": state["nickname"]} for user_id, state in self._states.items()],
+            "channels": [
+                {"channel_id": str(channel_id), "name": name, "users": users(self._members.get(channel_id, {}))}
+                for channel_id, name in self._channels.items()
+            ],
+            "user_count": len(self._states),
+            "guild_name": self._guild_name,
+        }
+
+
+voice_index = VoiceIndex()
+
+
+def _member_state(channel_id: int, member: discord.Member) -> dict:
+    return {
+        "channel_id": channel_id,
+        "nickname": member.nick or member.global_name or member.name or "Inconnu",
+        "bot": member.bot,
+    }
 
 
 class DiscordVoiceMonitor:
@@ -20,19 +167,28 @@ class DiscordVoiceMonitor:
     through the READY payload and on_voice_state_update events.
     """
 
-    def __init__(self, token: str, guild_id: str):
+    def __init__(self, token: str, guild_id: str, main_loop: asyncio.AbstractEventLoop | None = None):
         self._token = token
         self._guild_id = int(guild_id)
         self._thread: Thread | None = None
         self._loop: asyncio.AbstractEventLoop | None = None
+        self._main_loop = main_loop  # Receives voice_events diffs
 
-        # Track voice states manually: {user_id: {channel_id, nickname, bot}}
-        self._voice_states: dict[int, dict] = {}
-
-        intents = discord.Intents.default()
+        # Only guilds (channel list) and voice states: no message, typing or reaction
+        # events to decode in the bot thread, and no message cache.
+        intents = discord.Intents.none()
+        intents.guilds = True
         intents.voice_states = True
-        intents.members = False  # Privileged — not required
-        self._client = discord.Client(intents=intents)
+        self._client = discord.Client(intents=intents, max_messages=None)
+
+        # Dispatched for every gateway event (only the raw payload events need enable_debug_events)
+        @self._client.event
+        async def on_socket_event_type(event_type: str):
+            UPSTREAM_EVENTS.labels("discord", event_type).inc()
+
+        @self._client.event
+        async def on_disconnect():
+            UPSTREAM_ERRORS.labels("discord", "gateway").inc()
 
         @self._client.event
         async def on_ready():
@@ -40,34 +196,44 @@ class DiscordVoiceMonitor:
             # READY payload includes voice states for all guilds the bot is in.
             # discord.py populates guild.voice_channels[].voice_states from this.
             self._build_initial_state()
-            self._update_cache()
+            self._publish(RESYNC)
 
         @self._client.event
         async def on_voice_state_update(member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-            if member.guild.id != self._guild_id:
+            if member.guild.id != self._guild_id or member.bot:
                 return
 
-            if after.channel is None:
-                # User left voice
-                self._voice_states.pop(member.id, None)
-            else:
-                # User joined or moved
-                self._voice_states[member.id] = {
-                    "channel_id": after.channel.id,
-                    "nickname": member.nick or member.global_name or member.name or "Inconnu",
-                    "bot": member.bot,
-                }
+            previous = voice_index.get(member.id)
+            state = _member_state(after.channel.id, member) if after.channel is not None else None
+            diff = build_voice_diff(member.id, previous, state)
+            if diff is None:
+                return  # Mute/deafen/stream change: nothing visible changed
+            voice_index.update(member.id, state)
+            self._publish(diff)
+
+        @self._client.event
+        async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+            self._on_channel_change(channel)
+
+        @self._client.event
+        async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+            self._on_channel_change(channel)
+
+        @self._client.event
+        async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+            self._on_channel_change(after)
 
-            self._update_cache()
+    def _voice_channels(self, guild: discord.Guild) -> list[tuple[int, str]]:
+        return [(vc.id, vc.name) for vc in guild.voice_channels]
 
     def _build_initial_state(self) -> None:
-        """Build voice state map from the guild's current voice channels (READY payload)."""
+        """Build the voice index from the guild's current voice channels (READY payload)."""
         guild = self._client.get_guild(self._guild_id)
         if not guild:
             logger.warning("Discord guild %s not found in bot cache", self._guild_id)
             return
 
-        self._voice_states.clear()
+        states: dict[int, dict] = {}
         for vc in guild.voice_channels:
             for vs in vc.voice_states:
                 # vs is a VoiceState; vs.channel is set, member may be partial
@@ -76,46 +242,26 @@ class DiscordVoiceMonitor:
                     member = vs.member
                 if member is None:
                     continue
-                self._voice_states[member.id] = {
-                    "channel_id": vc.id,
-                    "nickname": member.nick or member.global_name or member.name or "Inconnu",
-                    "bot": member.bot,
-                }
-
-    def _update_cache(self) -> None:
-        """Rebuild the cache dict from tracked voice states."""
-        guild = self._client.get_guild(self._guild_id)
-        guild_name = guild.name if guild else ""
-
-        # Group users by channel
-        channel_users: dict[int, list[dict]] = {}
-        all_users: list[dict] = []
-
-        for user_id, state in list(self._voice_states.items()):
-            if state["bot"]:
-                continue
-            user_dict = {"user_id": str(user_id), "nickname": state["nickname"]}
-            all_users.append(user_dict)
-            channel_users.setdefault(state["channel_id"], []).append(user_dict)
-
-        # Build channel list with names
-        channels: list[dict] = []
-        if guild:
-            for vc in guild.voice_channels:
-                users_in_ch = channel_users.get(vc.id, [])
-                channels.append({
-                    "channel_id": str(vc.id),
-                    "name": vc.name,
-                    "users": users_in_ch,
-                })
-
-        discord_voice_cache["discord_voice_status"] = {
-            "users": all_users,
-            "channels": channels,
-            "user_count": len(all_users),
-            "guild_name": guild_name,
-        }
-        logger.info("🤖 Discord voice cache updated: %d user(s), %d channel(s)", len(all_users), len(channels))
+                states[member.id] = _member_state(vc.id, member)
+        voice_index.reset(guild.name, self._voice_channels(guild), states)
+        logger.info("🤖 Discord voice index built: %d user(s)", voice_index.user_count)
+
+    def _on_channel_change(self, channel: discord.abc.GuildChannel) -> None:
+        if channel.guild.id != self._guild_id or not isinstance(channel, discord.VoiceChannel):
+            return
+        voice_index.set_channels(self._voice_channels(channel.guild))
+        self._publish(RESYNC)  # Clients need the new channel list
+
+    def _publish(self, event: dict | object) -> None:
+        """Hand a diff (or RESYNC) over to the main event loop (called from the bot thread)."""
+        if self._main_loop is None or self._main_loop.is_closed():
+            return
+        if isinstance(event, dict):
+            event["user_count"] = voice_index.user_count
+        try:
+            self._main_loop.call_soon_threadsafe(voice_events.publish, event)
+        except RuntimeError:
+            pass  # Main loop closed during shutdown
 
     def _run(self) -> None:
         """Entry point for the background thread — runs the bot's event loop."""
@@ -132,6 +278,7 @@ class DiscordVoiceMonitor:
         except discord.LoginFailure:
             logger.error("❌ Discord bot failed: invalid DISCORD_BOT_TOKEN")
         except Exception:
+            UPSTREAM_ERRORS.labels("discord", "gateway").inc()
             logger.exception("❌ Discord bot crashed")
         finally:
             self._loop.close()
@@ -155,17 +302,95 @@ class DiscordVoiceMonitor:
         logger.info("Discord voice monitor stopped")
 
 
+def build_voice_diff(user_id: int, previous: dict | None, current: dict | None) -> dict | None:
+    """Describe a voice state change as a join/leave/move diff.
+
+    Returns None when nothing visible changed (same channel and nickname) or for bots.
+    """
+    state = current or previous
+    if state is None or state["bot"]:
+        return None
+    before_channel = previous["channel_id"] if previous else None
+    after_channel = current["channel_id"] if current else None
+    if before_channel == after_channel and (previous or {}).get("nickname") == state["nickname"]:
+        return None
+
+    if before_channel is None:
+        action = "join"
+    elif after_channel is None:
+        action = "leave"
+    elif before_channel == after_channel:
+        action = "update"  # Nickname changed
+    else:
+        action = "move"
+    return {
+        "action": action,
+        "user": {"user_id": str(user_id), "nickname": state["nickname"]},
+        "channel_id": str(after_channel) if after_channel is not None else None,
+        "from_channel_id": str(before_channel) if before_channel is not None else None,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Public API (signatures unchanged for backward compatibility)
 # ---------------------------------------------------------------------------
 
 
+def _share_index() -> None:
+    """Share the bot's index with the other workers, if it changed since the last share."""
+    global _shared
+    if settings.CACHE_BACKEND == "memory":
+        return  # Single worker: nobody to share with
+    version = voice_index.version
+    if version == _shared:
+        return
+    index = voice_index.export()
+    if index is not None:
+        discord_voice_cache["index"] = (os.getpid(), version, index)
+        _shared = version
+
+
+def _load_shared_index() -> None:
+    """Mirror the index shared by the bot's worker, if it changed since the last load."""
+    global _loaded
+    entry = discord_voice_cache.get("index")
+    loaded = entry[:2] if entry is not None else None
+    if loaded == _loaded:
+        return
+    _loaded = loaded
+    if entry is None:
+        voice_index.clear()  # Bot stopped and no other worker took over yet
+    else:
+        voice_index.reset(**entry[2])
+    voice_events.publish(RESYNC)
+
+
+async def sync_discord_voice() -> None:
+    """APScheduler job: run the bot in a single worker, mirror its index in the others.
+
+    The worker holding the lease renews it and shares its index; the others load the
+    shared index, and start the bot themselves once the lease expired (bot worker
+    stopped or dead).
+    """
+    global _loaded, _shared
+    if acquire_lease(BOT_LEASE, BOT_LEASE_TTL):
+        if _monitor is None:
+            _loaded = _shared = None
+            start_monitor()
+        _share_index()
+        return
+    if _monitor is not None:
+        logger.warning("Discord voice lease taken by another worker, stopping the bot")
+        await stop_monitor()
+    _load_shared_index()
+
+
 def start_monitor() -> None:
-    """Create and start the Discord voice monitor bot."""
+    """Create and start the Discord voice monitor bot. Must be called from the main event loop."""
     global _monitor
     if _monitor is not None:
         return
-    _monitor = DiscordVoiceMonitor(settings.DISCORD_BOT_TOKEN, settings.DISCORD_GUILD_ID)
+    _monitor = DiscordVoiceMonitor(settings.DISCORD_BOT_TOKEN, settings.DISCORD_GUILD_ID, asyncio.get_running_loop())
     _monitor.start()
 
 
@@ -175,16 +400,28 @@ async def stop_monitor() -> None:
     if _monitor:
         await _monitor.stop()
         _monitor = None
+        entry = discord_voice_cache.get("index")
+        if entry is not None and entry[0] == os.getpid():
+            discord_voice_cache.pop("index", None)
+        release_lease(BOT_LEASE)  # Let another worker take over now
+    voice_index.clear()
+
+
+def _gateway_latency() -> float:
+    """Heartbeat round trip of the bot's gateway connection (NaN when not running)."""
+    if _monitor is None:
+        return float("nan")
+    return _monitor._client.latency
+
+
+DISCORD_GATEWAY_LATENCY.set_function(_gateway_latency)
 
 
 def get_cached_status() -> dict | None:
-    """Read cached Discord voice status. Returns None if cache is empty."""
-    return discord_voice_cache.get("discord_voice_status")
+    """Read the current Discord voice status. Returns None until the bot is ready."""
+    return voice_index.snapshot()
 
 
 def get_user_count() -> int:
-    """Read cached user count for header badge."""
-    data = discord_voice_cache.get("discord_voice_status")
-    if data:
-        return data.get("user_count", 0)
-    return 0
+    """Read the current user count for header badge."""
+    return voice_index.user_count
@@ -0,0 +1,103 @@
+"""Public menu tree, rendered once per access level.
+
+The menu only changes through the admin endpoints, so the JSON rendered for each
+access level (anonymous, guest, cadet, member/admin) is cached with its ETag and
+dropped by `invalidate_menu` whenever a menu item, or a page or URL it links to, changes.
+"""
+
+from collections import defaultdict
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.auth.permissions import LEVEL_ALL
+from app.models.content import MenuItem
+from app.schemas.content import MenuItemOut
+from app.utils.cache import menu_cache
+from app.utils.etag import make_etag
+
+_menu_adapter = TypeAdapter(list[MenuItemOut])
+
+
+def build_menu_tree(items: list[MenuItem], level: int) -> list[MenuItemOut]:
+    """Enabled items visible at access `level` (see app.auth.permissions.access_level)."""
+    result = []
+    for item in items:
+        if not item.enabled:
+            continue
+        if not LEVEL_ALL <= item.restriction <= level:
+            continue
+
+        children = build_menu_tree(item.items, level) if item.items else []
+        result.append(
+            MenuItemOut(
+                id=item.id,
+                label=item.label,
+                type=item.type,
+                type_as_string=item.type_as_string,
+                icon=item.icon,
+                theme_classes=item.theme_classes,
+                enabled=item.enabled,
+                position=item.position,
+                link=item.link,
+                restriction=item.restriction,
+                url_slug=item.url.slug if item.url else None,
+                page_path=item.page.path if item.page else None,
+                items=children,
+            )
+        )
+    return result
+
+
+async def load_menu_tree(db: AsyncSession) -> list[MenuItem]:
+    """Root menu items, each with its whole subtree in `items`, at any depth.
+
+    One query loads every item (with its URL and page joined) and the tree is assembled
+    by `menu_id`, instead of one selectinload round-trip per level.
+    """
+    result = await db.execute(
+        select(MenuItem)
+        .options(joinedload(MenuItem.url), joinedload(MenuItem.page))
+        .order_by(MenuItem.position, MenuItem.id)
+    )
+    items = result.scalars().all()
+    children: dict[int | None, list[MenuItem]] = defaultdict(list)
+    for item in items:
+        children[item.menu_id].append(item)
+    for item in items:
+        # Mark `items` as loaded so reading it never triggers a lazy load
+        set_committed_value(item, "items", children.get(item.id, []))
+    return children[None]
+
+
+def creates_cycle(parents: dict[int, int | None], item_id: int, menu_id: int | None) -> bool:
+    """Whether placing `item_id` under `menu_id` makes it its own ancestor.
+
+    `parents` maps every menu item id to its parent id.
+    """
+    seen = set()
+    while menu_id is not None and menu_id not in seen:
+        if menu_id == item_id:
+            return True
+        seen.add(menu_id)
+        menu_id = parents.get(menu_id)
+    return False
+
+
+async def render_menu(db: AsyncSession, level: int) -> tuple[bytes, str]:
+    """JSON menu tree for access `level` and its ETag, from the cache when possible."""
+    key = str(level)
+    rendered = menu_cache.get(key)
+    if rendered is None:
+        body = _menu_adapter.dump_json(build_menu_tree(await load_menu_tree(db), level))
+        rendered = (body, make_etag(body))
+        menu_cache[key] = rendered
+    return rendered
+
+
+def invalidate_menu() -> None:
+    """Drop every rendered menu; call after committing a change visible in the menu."""
+    menu_cache.clear()
@@ -0,0 +1,67 @@
+"""CMS pages, rendered once per path.
+
+Pages only change through the admin endpoints, so the JSON of each enabled page is
+cached with its validators and access restriction, and dropped by `invalidate_pages`
+whenever a page or one of its blocks changes. Access is still checked on every view.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.content import Page
+from app.schemas.content import PageBlockOut, PageOut
+from app.utils.cache import page_cache
+from app.utils.etag import make_etag
+
+
+@dataclass
+class RenderedPage:
+    body: bytes
+    etag: str
+    last_modified: datetime | None
+    restriction: int
+
+
+def build_page_out(page: Page) -> PageOut:
+    return PageOut(
+        id=page.id,
+        route=page.route,
+        path=page.path,
+        title=page.title,
+        enabled=page.enabled,
+        restriction=page.restriction,
+        created_at=page.created_at,
+        updated_at=page.updated_at,
+        blocks=[
+            PageBlockOut(id=b.id, type=b.type, content=b.content, number=b.number, enabled=b.enabled)
+            for b in page.blocks
+            if b.enabled
+        ],
+    )
+
+
+async def render_page(db: AsyncSession, path: str) -> RenderedPage | None:
+    """Enabled page at `path`, from the cache when possible. None if there is none."""
+    rendered = page_cache.get(path)
+    if rendered is None:
+        result = await db.execute(
+            select(Page).where(Page.path == path, Page.enabled == True)  # noqa: E712
+            .options(selectinload(Page.blocks))
+        )
+        page = result.scalar_one_or_none()
+        if page is None:
+            return None
+        # The body holds the id, updated_at and every enabled block: its hash is the ETag
+        body = build_page_out(page).model_dump_json().encode()
+        rendered = RenderedPage(body, make_etag(body), page.updated_at or page.created_at, page.restriction)
+        page_cache[path] = rendered
+    return rendered
+
+
+def invalidate_pages() -> None:
+    """Drop every rendered page; call after committing a change to a page or its blocks."""
+    page_cache.clear()
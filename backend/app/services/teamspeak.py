@@ -1,13 +1,25 @@
-import asyncio
 import logging
+import time
+from collections import deque
 from urllib.parse import parse_qs, urlparse
 
 from app.config import settings
-from app.services.ts3_client import TS3Connection, TS3QueryError
+from app.services.ts3_client import TS3Client, TS3QueryError
 from app.utils.cache import teamspeak_cache
+from app.utils.metrics import UPSTREAM_EVENTS, track_upstream
 
 logger = logging.getLogger(__name__)
 
+# Persistent ServerQuery session, opened on first scan and closed by main.lifespan
+_client: TS3Client | None = None
+
+# Push mode: client enter/leave (server events), moves and channel changes (channel events)
+NOTIFY_COMMANDS = ("servernotifyregister event=server", "servernotifyregister event=channel id=0")
+# Notifications kept for replay on top of a full scan (see PresenceIndex.reset)
+REPLAY_LIMIT = 1000
+# Presence version last written to `teamspeak_cache`, for the other workers (push mode)
+_shared_version: int | None = None
+
 
 def _parse_ts_url(url: str) -> dict:
     """Parse serverquery://host:port/?server_port=XXXX into components."""
@@ -20,83 +32,303 @@ def _parse_ts_url(url: str) -> dict:
     }
 
 
-def _fetch_ts_data_sync() -> dict:
-    """Connect to TS3 ServerQuery and fetch clients/channels.
+def _get_client() -> TS3Client:
+    global _client
+    if _client is None:
+        url_parts = _parse_ts_url(settings.API_TEAMSPEAK_URL)
+        push = {}
+        if settings.TEAMSPEAK_PUSH:
+            push = {"notify": NOTIFY_COMMANDS, "on_notify": presence.handle, "on_reconnect": _resync}
+        _client = TS3Client(url_parts["host"], url_parts["port"], url_parts["server_port"], **push)
+    return _client
 
-    Synchronous — must be called via asyncio.to_thread().
-    Returns dict with clients, channels, client_count.
+
+async def close_client() -> None:
+    """Close the ServerQuery session. Called at application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+    presence.invalidate()
+
+
+def _client_entry(c: dict) -> dict | None:
+    """Client as cached, or None for clients that are not shown."""
+    nickname = c.get("client_nickname", "")
+    # Filter out ServerQuery clients (client_type=1)
+    if str(c.get("client_type", "0")) == "1":
+        return None
+    # Filter out "Unknown" clients
+    if nickname.startswith("Unknown"):
+        return None
+    return {
+        "clid": int(c.get("clid", 0)),
+        "cid": int(c.get("cid", 0)),
+        "nickname": nickname,
+    }
+
+
+def _channel_entry(ch: dict) -> dict:
+    return {
+        "cid": int(ch.get("cid", 0)),
+        "pid": int(ch.get("pid", 0)),
+        "name": ch.get("channel_name", ""),
+    }
+
+
+def _build_tree(channels: list[dict]) -> list[dict]:
+    """Nest channels (with their clients) by `pid`; returns the root channels.
+
+    Each node gets `children` and `total_clients` (clients in the channel and all
+    its sub-channels). Channels whose parent is unknown are treated as roots.
     """
-    url_parts = _parse_ts_url(settings.API_TEAMSPEAK_URL)
-
-    with TS3Connection(url_parts["host"], url_parts["port"]) as ts3conn:
-        ts3conn.use(port=url_parts["server_port"])
-
-        # Fetch clients
-        try:
-            raw_clients = ts3conn.clientlist()
-        except TS3QueryError:
-            raw_clients = None
-
-        clients = []
-        if raw_clients is not None:
-            for c in raw_clients:
-                nickname = c.get("client_nickname", "")
-                # Filter out ServerQuery clients (client_type=1)
-                if str(c.get("client_type", "0")) == "1":
-                    continue
-                # Filter out "Unknown" clients
-                if nickname.startswith("Unknown"):
-                    continue
-                clients.append({
-                    "clid": int(c.get("clid", 0)),
-                    "cid": int(c.get("cid", 0)),
-                    "nickname": nickname,
-                })
-
-        # Fetch channels
-        try:
-            raw_channels = ts3conn.channellist()
-        except TS3QueryError:
-            raw_channels = None
-
-        channels = []
-        if raw_channels is not None:
-            for ch in raw_channels:
-                cid = int(ch.get("cid", 0))
-                channel_clients = [cl for cl in clients if cl["cid"] == cid]
-                channels.append({
-                    "cid": cid,
-                    "pid": int(ch.get("pid", 0)),
-                    "name": ch.get("channel_name", ""),
-                    "clients": channel_clients,
-                })
+    nodes = {ch["cid"]: {"cid": ch["cid"], "name": ch["name"], "clients": ch["clients"], "children": []} for ch in channels}
+    roots = []
+    for ch in channels:
+        parent = nodes.get(ch["pid"]) if ch["pid"] != ch["cid"] else None
+        (parent["children"] if parent is not None else roots).append(nodes[ch["cid"]])
 
+    # Post-order walk (iterative: no recursion limit on deep trees) to sum clients upwards
+    stack = [(node, False) for node in roots]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            node["total_clients"] = len(node["clients"]) + sum(child["total_clients"] for child in node["children"])
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node["children"])
+    return roots
+
+
+def _assemble(clients: list[dict], channels: list[dict]) -> dict:
+    """Cached status (clients, channels with their clients, channel tree, client_count)."""
+    by_cid: dict[int, list[dict]] = {}
+    for cl in clients:
+        by_cid.setdefault(cl["cid"], []).append(cl)
+    channels = [{**ch, "clients": by_cid.get(ch["cid"], [])} for ch in channels]
     return {
         "clients": clients,
         "channels": channels,
+        "tree": _build_tree(channels),
         "client_count": len(clients),
     }
 
 
+def _build_status(raw_clients: list[dict] | None, raw_channels: list[dict] | None) -> dict:
+    """Build the cached status (clients, channels, client_count) from raw query results."""
+    clients = [entry for c in raw_clients or [] if (entry := _client_entry(c)) is not None]
+    channels = [_channel_entry(ch) for ch in raw_channels or []]
+    return _assemble(clients, channels)
+
+
+class PresenceIndex:
+    """TeamSpeak presence kept up to date from ServerQuery notifications (push mode).
+
+    `reset` loads a full scan (first scan, reconnection, periodic reconciliation);
+    notifications then apply each enter/leave/move and channel change in O(1).
+    `snapshot()` only rebuilds the status when something changed since the last read.
+    """
+
+    def __init__(self):
+        self._ready = False
+        self._synced_at = 0.0
+        self._clients: dict[int, dict] = {}  # clid -> client entry
+        self._channels: dict[int, dict] = {}  # cid -> channel entry, in server order
+        self._version = 0
+        self._snapshot: dict | None = None
+        self._snapshot_version = -1
+        self._sequence = 0  # Notifications received so far
+        self._recent: deque[tuple[int, str, dict]] = deque(maxlen=REPLAY_LIMIT)  # (sequence, event, props)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def sequence(self) -> int:
+        """Notifications received so far: taken before a full scan, passed to `reset`."""
+        return self._sequence
+
+    @property
+    def synced_for(self) -> float:
+        """Seconds since the last full scan was loaded."""
+        return time.monotonic() - self._synced_at
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def reset(self, status: dict, since: int | None = None) -> None:
+        """Load a full scan (a `_build_status` result) requested at `sequence` `since`.
+
+        Notifications received after `since` may be newer than the scan: they are applied
+        again on top of it. Each one sets an absolute state (channel of a client, name of
+        a channel...), so replaying one the scan already reflects changes nothing.
+        """
+        self._clients = {cl["clid"]: cl for cl in status["clients"]}
+        self._channels = {ch["cid"]: {"cid": ch["cid"], "pid": ch["pid"], "name": ch["name"]} for ch in status["channels"]}
+        if since is not None:
+            replay = [(event, props) for sequence, event, props in self._recent if sequence > since]
+            if len(replay) < self._sequence - since:
+                logger.warning(
+                    "TeamSpeak: %d notification(s) during the scan, only the last %d replayed",
+                    self._sequence - since,
+                    len(replay),
+                )
+            for event, props in replay:
+                self._apply(event, props)
+        self._ready = True
+        self._synced_at = time.monotonic()
+        self._version += 1
+
+    def invalidate(self) -> None:
+        """Events may have been missed: stop serving the index until the next full scan."""
+        self._ready = False
+
+    def snapshot(self) -> dict | None:
+        """Current status, None until a full scan was loaded. Must not be modified."""
+        if not self._ready:
+            return None
+        if self._snapshot_version != self._version:
+            self._snapshot = _assemble(list(self._clients.values()), list(self._channels.values()))
+            self._snapshot_version = self._version
+        return self._snapshot
+
+    def handle(self, event: str, props: dict[str, str]) -> None:
+        """Apply one ServerQuery notification (`TS3Client` on_notify callback)."""
+        UPSTREAM_EVENTS.labels("teamspeak", event).inc()
+        self._sequence += 1
+        self._recent.append((self._sequence, event, props))
+        self._apply(event, props)
+
+    def _apply(self, event: str, props: dict[str, str]) -> None:
+        handler = getattr(self, f"_on_{event.removeprefix('notify')}", None)
+        if handler is not None and handler(props) is not False:
+            self._version += 1
+
+    # Handlers return False when nothing changed. Entries are replaced, never mutated:
+    # a snapshot handed out earlier keeps referencing the old ones.
+
+    def _on_cliententerview(self, props: dict) -> bool:
+        entry = _client_entry({**props, "cid": props.get("ctid", 0)})
+        if entry is None:
+            return False
+        self._clients[entry["clid"]] = entry
+        return True
+
+    def _on_clientleftview(self, props: dict) -> bool:
+        return self._clients.pop(int(props.get("clid", 0)), None) is not None
+
+    def _on_clientmoved(self, props: dict) -> bool:
+        clid = int(props.get("clid", 0))
+        if clid not in self._clients:
+            return False
+        self._clients[clid] = {**self._clients[clid], "cid": int(props.get("ctid", 0))}
+        return True
+
+    def _on_clientupdated(self, props: dict) -> bool:
+        clid = int(props.get("clid", 0))
+        if clid not in self._clients or "client_nickname" not in props:
+            return False
+        self._clients[clid] = {**self._clients[clid], "nickname": props["client_nickname"]}
+        return True
+
+    def _on_channelcreated(self, props: dict) -> bool:
+        channel = _channel_entry({**props, "pid": props.get("cpid", 0)})
+        self._channels[channel["cid"]] = channel
+        return True
+
+    def _on_channeldeleted(self, props: dict) -> bool:
+        return self._channels.pop(int(props.get("cid", 0)), None) is not None
+
+    def _on_channeledited(self, props: dict) -> bool:
+        cid = int(props.get("cid", 0))
+        if cid not in self._channels or "channel_name" not in props:
+            return False
+        self._channels[cid] = {**self._channels[cid], "name": props["channel_name"]}
+        return True
+
+    def _on_channelmoved(self, props: dict) -> bool:
+        cid = int(props.get("cid", 0))
+        if cid not in self._channels:
+            return False
+        self._channels[cid] = {**self._channels[cid], "pid": int(props.get("cpid", 0))}
+        return True
+
+
+presence = PresenceIndex()
+
+
+def push_active() -> bool:
+    """True when TeamSpeak presence is currently kept up to date by notifications."""
+    return _client is not None and _client.notifications_active and presence.ready
+
+
+async def fetch_ts_data() -> dict:
+    """Fetch clients/channels over the persistent ServerQuery session.
+
+    Both lists are requested in one pipelined round trip.
+    Returns dict with clients, channels, client_count.
+    """
+    with track_upstream("teamspeak", "scan"):
+        raw_clients, raw_channels = await _get_client().pipeline("clientlist", "channellist")
+    return _build_status(
+        None if isinstance(raw_clients, TS3QueryError) else raw_clients,
+        None if isinstance(raw_channels, TS3QueryError) else raw_channels,
+    )
+
+
 async def scan_and_cache() -> None:
-    """Fetch TS data in a thread and store in cache. Called by scheduler."""
+    """Fetch TS data and store in cache. Called by scheduler.
+
+    In push mode the presence index is live between scans, so a full scan only runs
+    every TEAMSPEAK_RECONCILE_INTERVAL seconds to correct any drift; in between, the
+    presence is copied to the cache for the other workers when it changed.
+    """
+    global _shared_version
     if not settings.API_TEAMSPEAK_URL:
         return
+    if push_active() and presence.synced_for < settings.TEAMSPEAK_RECONCILE_INTERVAL:
+        if settings.CACHE_BACKEND != "memory" and presence.version != _shared_version:
+            teamspeak_cache["ts_status"] = presence.snapshot()
+            _shared_version = presence.version
+        return
     try:
-        data = await asyncio.to_thread(_fetch_ts_data_sync)
+        since = presence.sequence
+        data = await fetch_ts_data()
+        if settings.TEAMSPEAK_PUSH:
+            presence.reset(data, since)  # Replays the notifications received meanwhile
+            data = presence.snapshot()
+            _shared_version = presence.version
         teamspeak_cache["ts_status"] = data
-        logger.info("TeamSpeak scan: %d clients, %d channels", data["client_count"], len(data["channels"]))
+        logger.debug("TeamSpeak scan: %d clients, %d channels", data["client_count"], len(data["channels"]))
+    except (OSError, TS3QueryError) as e:
+        logger.warning("Failed to scan TeamSpeak server: %s", e)
     except Exception:
         logger.exception("Failed to scan TeamSpeak server")
 
 
+async def _resync() -> None:
+    """Push session reopened: notifications were missed, reload a full scan."""
+    presence.invalidate()
+    await scan_and_cache()
+
+
 def get_cached_status() -> dict | None:
-    """Read cached TS status. Returns None if cache is empty."""
+    """Read TS status (live presence in push mode, else cache). Returns None if unknown."""
+    if push_active():
+        return presence.snapshot()
     return teamspeak_cache.get("ts_status")
 
 
 def get_client_count() -> int:
-    """Read cached client count for header badge."""
+    """Read client count for header badge."""
+    if push_active():
+        return presence.client_count
     data = teamspeak_cache.get("ts_status")
     if data:
         return data.get("client_count", 0)
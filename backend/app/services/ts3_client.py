@@ -1,16 +1,27 @@
-"""Minimal TeamSpeak 3 ServerQuery client using raw TCP sockets.
+"""Minimal asyncio TeamSpeak 3 ServerQuery client.
 
 Replaces the deprecated `ts3` library which depended on `telnetlib`
 (removed in Python 3.13). Only implements the commands we need:
-`use`, `clientlist`, `channellist`.
+`use`, `clientlist`, `channellist` (and `version` as keepalive).
+
+- `TS3Connection`: one ServerQuery connection. A reader task routes each
+  response to the command that is waiting for it, so several commands can be
+  pipelined (sent in one write), and `notify*` event lines (see
+  `servernotifyregister`) are handed to a callback as they arrive.
+- `TS3Client`: persistent session on top of it: opened on first use, kept
+  alive while idle, reopened after failures with exponential backoff.
 
 Protocol reference: TS3 ServerQuery uses plain text over TCP with
 `\\n\\r` line endings. Responses contain key=value pairs with TS3
 escaping, items separated by `|`.
 """
 
+import asyncio
+import logging
 import re
-import socket
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
 
 # Single-pass unescape via regex to avoid issues with overlapping patterns
 # (e.g. `\\b` must become `\b` literal, not backspace)
@@ -29,6 +40,19 @@ _UNESCAPE_TABLE = {
 }
 _UNESCAPE_RE = re.compile(r"\\([\\\/spabfnrtv])")
 
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL = 180  # seconds; the server drops query clients idle for 10 minutes
+BACKOFF_BASE = 5  # seconds before the first reconnection attempt
+BACKOFF_MAX = 300  # seconds; cap of the exponential backoff
+
+READ_CHUNK = 65536  # bytes per read from the socket
+
+
+# Receives (event name, properties) for each item of a `notify*` line, e.g.
+# ("notifyclientmoved", {"ctid": "2", "clid": "5", ...})
+NotifyHandler = Callable[[str, dict[str, str]], None]
+
 
 class TS3QueryError(Exception):
     """Raised when the TS3 ServerQuery returns a non-zero error code."""
@@ -41,124 +65,400 @@ class TS3QueryError(Exception):
 
 def ts3_unescape(value: str) -> str:
     """Unescape a TS3 ServerQuery value string."""
+    if "\\" not in value:
+        return value  # Most values have nothing to unescape
     return _UNESCAPE_RE.sub(lambda m: _UNESCAPE_TABLE[m.group(1)], value)
 
 
-def parse_ts3_response(line: str) -> list[dict[str, str]]:
-    """Parse a TS3 ServerQuery response data line into a list of dicts.
+def iter_ts3_records(line: str) -> Iterator[dict[str, str]]:
+    """Yield the items of a TS3 ServerQuery response data line one by one.
 
-    Items separated by `|`, properties by spaces, key=value by `=`.
+    Items are split lazily as they are consumed, so a large `clientlist` line is
+    never held as a list of item strings next to the parsed records.
     """
     line = line.strip()
     if not line:
-        return []
-    items = line.split("|")
-    result = []
-    for item in items:
+        return
+    pos = 0
+    while pos <= len(line):
+        end = line.find("|", pos)
+        if end < 0:
+            end = len(line)
         props = {}
-        for pair in item.split():
+        for pair in line[pos:end].split():
             parts = pair.split("=", 1)
             key = ts3_unescape(parts[0])
             val = ts3_unescape(parts[1]) if len(parts) > 1 else ""
             props[key] = val
-        result.append(props)
-    return result
+        yield props
+        pos = end + 1
+
+
+def parse_ts3_response(line: str) -> list[dict[str, str]]:
+    """Parse a TS3 ServerQuery response data line into a list of dicts.
+
+    Items separated by `|`, properties by spaces, key=value by `=`.
+    """
+    return list(iter_ts3_records(line))
 
 
 class TS3Connection:
-    """Minimal TeamSpeak 3 ServerQuery client using raw TCP sockets.
+    """Minimal asyncio TeamSpeak 3 ServerQuery connection.
 
     Usage::
 
-        with TS3Connection("ts.example.org", 10011) as conn:
-            conn.use(port=9987)
-            clients = conn.clientlist()
-            channels = conn.channellist()
+        async with TS3Connection("ts.example.org", 10011) as conn:
+            await conn.use(port=9987)
+            clients, channels = await conn.pipeline("clientlist", "channellist")
     """
 
-    def __init__(self, host: str, port: int = 10011, timeout: float = 10.0):
+    def __init__(self, host: str, port: int = 10011, timeout: float = 10.0, on_notify: NotifyHandler | None = None):
         self._host = host
         self._port = port
         self._timeout = timeout
-        self._sock: socket.socket | None = None
-        self._buffer = b""
+        self._on_notify = on_notify
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        # Received bytes; lines before `_start` are consumed, and `_scan_from` is where the
+        # search for the next line marker resumes (bytes before it were already searched)
+        self._buffer = bytearray()
+        self._start = 0
+        self._scan_from = 0
+        self._read_task: asyncio.Task | None = None
+        self._pending: deque[asyncio.Future] = deque()  # Commands sent, oldest first
+        self._last_activity = time.monotonic()
+        self.closed = asyncio.Event()
 
-    def __enter__(self):
-        self._connect()
+    async def __aenter__(self):
+        await self.connect()
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self._close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
         return False
 
-    def _connect(self):
-        self._sock = socket.create_connection((self._host, self._port), timeout=self._timeout)
-        self._sock.settimeout(self._timeout)
-        # Read and discard the two welcome banner lines
-        self._read_line()  # "TS3"
-        self._read_line()  # "Welcome to the TeamSpeak 3 ServerQuery interface..."
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def idle_for(self) -> float:
+        """Seconds since the last command was answered."""
+        return time.monotonic() - self._last_activity
 
-    def _close(self):
-        if self._sock:
+    async def connect(self) -> None:
+        async with asyncio.timeout(self._timeout):
+            self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+            # Read and discard the two welcome banner lines
+            await self._read_line()  # "TS3"
+            await self._read_line()  # "Welcome to the TeamSpeak 3 ServerQuery interface..."
+        self._last_activity = time.monotonic()
+        self._start_reading()
+
+    async def close(self) -> None:
+        if self._writer:
             try:
-                self._sock.sendall(b"quit\n\r")
+                self._writer.write(b"quit\n\r")
+                await self._writer.drain()
             except OSError:
                 pass
             finally:
-                self._sock.close()
-                self._sock = None
+                self._abort(ConnectionError("TS3 connection closed"))
+
+    def _start_reading(self) -> None:
+        self.closed.clear()
+        self._read_task = asyncio.create_task(self._read_loop())
 
-    def _read_line(self) -> bytes:
-        """Read from socket until \\n\\r marker. Returns raw bytes."""
+    def _abort(self, exc: BaseException) -> None:
+        """Drop the connection without waiting; commands still waiting fail with `exc`."""
+        if self._writer:
+            self._writer.close()
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        self._read_task = None
+        self._reader = None
+        self._writer = None
+        self._buffer = bytearray()
+        self._start = self._scan_from = 0
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(exc)
+        self.closed.set()
+
+    async def _read_line(self) -> bytes:
+        """Read from the stream until \\n\\r marker. Returns raw bytes.
+
+        Chunks are appended to a bytearray in place and lines are consumed by moving an
+        offset, so each received byte is searched and copied once: reading a large
+        response stays linear instead of re-copying the remaining buffer per line.
+        """
         marker = b"\n\r"
-        while marker not in self._buffer:
-            chunk = self._sock.recv(4096)
+        buffer = self._buffer
+        while (idx := buffer.find(marker, self._scan_from)) < 0:
+            # The marker may straddle two chunks: resume one byte before the end
+            self._scan_from = max(self._start, len(buffer) - 1)
+            chunk = await self._reader.read(READ_CHUNK)
             if not chunk:
                 raise ConnectionError("TS3 connection closed unexpectedly")
-            self._buffer += chunk
-        idx = self._buffer.index(marker) + len(marker)
-        line = self._buffer[:idx]
-        self._buffer = self._buffer[idx:]
+            buffer += chunk
+        end = idx + len(marker)
+        with memoryview(buffer) as view:
+            line = bytes(view[self._start : end])
+        self._start = self._scan_from = end
+        # Drop consumed bytes once they make up most of the buffer (amortized O(1) per byte)
+        if self._start * 2 >= len(buffer):
+            del buffer[: self._start]
+            self._start = self._scan_from = 0
         return line
 
-    def _send_command(self, command: str) -> list[dict[str, str]]:
-        """Send a command and return parsed response data."""
-        self._sock.sendall(f"{command}\n\r".encode("utf-8"))
+    async def _read_loop(self) -> None:
+        """Route incoming lines: notifications to the callback, responses to waiting commands."""
+        data_lines: list[str] = []
+        try:
+            while True:
+                raw_line = await self._read_line()
+                line_str = raw_line.decode("utf-8", errors="ignore").strip("\n\r")
+                if line_str.startswith("notify"):
+                    self._dispatch_notification(line_str)
+                elif line_str.startswith("error "):
+                    result = self._parse_result(line_str, data_lines)
+                    data_lines = []
+                    if self._pending:
+                        future = self._pending.popleft()
+                        if not future.done():
+                            future.set_result(result)
+                    self._last_activity = time.monotonic()
+                else:
+                    data_lines.append(line_str)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._abort(e if isinstance(e, OSError) else ConnectionError(f"TS3 read failed: {e}"))
 
-        data_lines = []
-        while True:
-            raw_line = self._read_line()
-            line_str = raw_line.decode("utf-8", errors="ignore").strip("\n\r")
-            if line_str.startswith("error "):
-                # Parse: "error id=N msg=..."
-                error_props = {}
-                for pair in line_str[6:].split():
-                    parts = pair.split("=", 1)
-                    key = parts[0]
-                    val = ts3_unescape(parts[1]) if len(parts) > 1 else ""
-                    error_props[key] = val
-                if error_props.get("id", "0") != "0":
-                    raise TS3QueryError(
-                        error_id=error_props.get("id", "?"),
-                        error_msg=error_props.get("msg", "unknown"),
-                    )
-                break
-            else:
-                data_lines.append(line_str)
+    @staticmethod
+    def _parse_result(error_line: str, data_lines: list[str]) -> list[dict[str, str]] | TS3QueryError:
+        # Parse: "error id=N msg=..."
+        error_props = {}
+        for pair in error_line[6:].split():
+            parts = pair.split("=", 1)
+            key = parts[0]
+            val = ts3_unescape(parts[1]) if len(parts) > 1 else ""
+            error_props[key] = val
+        if error_props.get("id", "0") != "0":
+            return TS3QueryError(
+                error_id=error_props.get("id", "?"),
+                error_msg=error_props.get("msg", "unknown"),
+            )
 
         result = []
         for dl in data_lines:
-            result.extend(parse_ts3_response(dl))
+            result.extend(iter_ts3_records(dl))
         return result
 
-    def use(self, *, port: int) -> None:
+    def _dispatch_notification(self, line: str) -> None:
+        if self._on_notify is None:
+            return
+        event, _, rest = line.partition(" ")
+        # Properties shared by a batch (e.g. ctid of a multi-client move) are only on the first item
+        common = None
+        for item in iter_ts3_records(rest):
+            if common is None:
+                common = item
+            try:
+                self._on_notify(event, {**common, **item})
+            except Exception:
+                logger.exception("TS3 notification handler failed for %s", event)
+
+    async def pipeline(self, *commands: str) -> list[list[dict[str, str]] | TS3QueryError]:
+        """Send several commands at once and return their results in order.
+
+        A command rejected by the server yields its `TS3QueryError` in place of data,
+        so one failing command does not hide the others. Connection errors and
+        timeouts close the connection and are raised.
+        """
+        if not self.connected:
+            raise ConnectionError("TS3 connection is not open")
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        # Queued and written without awaiting in between: responses come back in this order
+        self._pending.extend(futures)
+        self._writer.write("".join(f"{command}\n\r" for command in commands).encode("utf-8"))
+        try:
+            async with asyncio.timeout(self._timeout):
+                await self._writer.drain()
+                return list(await asyncio.gather(*futures))
+        except (TimeoutError, asyncio.CancelledError) as e:
+            # Responses may still arrive for these commands: the stream cannot be trusted anymore
+            self._abort(ConnectionError("TS3 command timed out") if isinstance(e, TimeoutError) else e)
+            raise
+
+    async def _send_command(self, command: str) -> list[dict[str, str]]:
+        """Send a command and return parsed response data."""
+        (result,) = await self.pipeline(command)
+        if isinstance(result, TS3QueryError):
+            raise result
+        return result
+
+    async def use(self, *, port: int) -> None:
         """Select a virtual server by port."""
-        self._send_command(f"use port={port}")
+        await self._send_command(f"use port={port}")
 
-    def clientlist(self) -> list[dict[str, str]]:
+    async def clientlist(self) -> list[dict[str, str]]:
         """Get list of connected clients."""
-        return self._send_command("clientlist")
+        return await self._send_command("clientlist")
 
-    def channellist(self) -> list[dict[str, str]]:
+    async def channellist(self) -> list[dict[str, str]]:
         """Get list of channels."""
-        return self._send_command("channellist")
+        return await self._send_command("channellist")
+
+
+class TS3Client:
+    """Persistent ServerQuery session on one virtual server.
+
+    The connection (banner + `use port=`) is opened on first use and then reused.
+    While idle a `version` command is sent every `keepalive` seconds so the server
+    does not drop it. After a failure, reconnection attempts are spaced with an
+    exponential backoff (BACKOFF_BASE doubling up to `backoff_max`); calls made in
+    between fail fast with ConnectionError instead of waiting for a timeout.
+
+    Push mode: with `notify` commands (e.g. ``servernotifyregister event=server``),
+    they are sent on every new connection and events go to `on_notify`. The session
+    is then reopened as soon as it drops, and `on_reconnect` is awaited so the caller
+    can resynchronize what it missed.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 10011,
+        server_port: int = 9987,
+        *,
+        timeout: float = 10.0,
+        keepalive: float = KEEPALIVE_INTERVAL,
+        backoff_max: float = BACKOFF_MAX,
+        notify: tuple[str, ...] = (),
+        on_notify: NotifyHandler | None = None,
+        on_reconnect: Callable[[], Awaitable[None]] | None = None,
+    ):
+        self._host = host
+        self._port = port
+        self._server_port = server_port
+        self._timeout = timeout
+        self._keepalive = keepalive
+        self._backoff_max = backoff_max
+        self._notify = notify
+        self._on_notify = on_notify
+        self._on_reconnect = on_reconnect
+        self._conn: TS3Connection | None = None
+        self._connect_lock = asyncio.Lock()
+        self._supervisor: asyncio.Task | None = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and self._conn.connected
+
+    @property
+    def notifications_active(self) -> bool:
+        """True while a session registered for notifications is open."""
+        return bool(self._notify) and self.connected
+
+    async def pipeline(self, *commands: str) -> list[list[dict[str, str]] | TS3QueryError]:
+        """`TS3Connection.pipeline` on the session, reconnecting if needed."""
+        reused = self.connected
+        conn = await self._ensure_connection()
+        try:
+            return await conn.pipeline(*commands)
+        except OSError:
+            await self._drop()
+            if not reused:
+                self._record_failure()
+                raise
+            # The kept-alive session went stale (server restart...): retry once on a new one
+            logger.info("TS3 ServerQuery session lost, reconnecting")
+        conn = await self._ensure_connection()
+        try:
+            return await conn.pipeline(*commands)
+        except OSError:
+            await self._drop()
+            self._record_failure()
+            raise
+
+    async def close(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        await self._drop()
+
+    async def _ensure_connection(self) -> TS3Connection:
+        async with self._connect_lock:
+            if self.connected:
+                return self._conn
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                raise ConnectionError(f"TS3 ServerQuery unavailable, next attempt in {wait:.0f}s")
+            conn = TS3Connection(self._host, self._port, self._timeout, on_notify=self._on_notify)
+            try:
+                await conn.connect()
+                await conn.use(port=self._server_port)
+                for command in self._notify:
+                    await conn._send_command(command)
+            except (OSError, TS3QueryError):
+                await conn.close()
+                self._record_failure()
+                raise
+            self._conn = conn
+            self._failures = 0
+            self._retry_at = 0.0
+            if self._supervisor is None or self._supervisor.done():
+                self._supervisor = asyncio.create_task(self._supervise())
+            return conn
+
+    async def _drop(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.close()
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        delay = min(self._backoff_max, BACKOFF_BASE * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+        logger.warning("TS3 ServerQuery unavailable (%d failure(s)), next attempt in %ds", self._failures, delay)
+
+    async def _supervise(self) -> None:
+        """Keep the session alive; in push mode, also reopen it as soon as it drops."""
+        while True:
+            conn = self._conn
+            if conn is None or not conn.connected:
+                if not self._notify:
+                    return  # Pull mode: reopened on next use
+                await self._reconnect()
+                continue
+            try:
+                async with asyncio.timeout(max(0.0, self._keepalive - conn.idle_for)):
+                    await conn.closed.wait()
+                continue  # Dropped by the server
+            except TimeoutError:
+                pass
+            if conn.idle_for < self._keepalive:
+                continue
+            try:
+                await conn.pipeline("version")
+            except OSError:
+                logger.info("TS3 ServerQuery keepalive failed, reconnecting")
+                await self._drop()
+
+    async def _reconnect(self) -> None:
+        await asyncio.sleep(max(0.0, self._retry_at - time.monotonic()))
+        try:
+            await self._ensure_connection()
+        except (OSError, TS3QueryError):
+            return  # Failure recorded: next attempt after the backoff delay
+        logger.info("TS3 ServerQuery session reopened")
+        if self._on_reconnect is not None:
+            try:
+                await self._on_reconnect()
+            except Exception:
+                logger.exception("TS3 reconnection handler failed")
@@ -0,0 +1,37 @@
+"""APScheduler job polling DCSServerBot into a shared snapshot."""
+
+from datetime import UTC, datetime
+
+from app.database import AsyncSessionLocal
+from app.models.dcs import DcsBotSyncState
+from app.services.dcsbot import poll_snapshot
+from app.services.dcsbot_history import record_samples, rollup_samples
+
+ROLLUP_INTERVAL = 3600  # seconds
+
+
+async def import_dcsbot_stats():
+    """APScheduler job: refresh the DCSServerBot snapshot, record sync state and samples."""
+    snapshot = await poll_snapshot()
+    if snapshot is None:
+        return  # Servers list unavailable (logged and counted by the service)
+
+    now = datetime.now(UTC)
+    async with AsyncSessionLocal() as db:
+        for name, entry in snapshot["by_name"].items():
+            server_id = name[:50]
+            state = await db.get(DcsBotSyncState, server_id)
+            if state is None:
+                state = DcsBotSyncState(server_id=server_id, last_sync_at=now, records_imported=0)
+                db.add(state)
+            state.last_sync_at = now
+            state.records_imported = (state.records_imported or 0) + entry["records"]
+        await record_samples(db, snapshot, now)
+        await db.commit()
+
+
+async def rollup_dcsbot_history():
+    """APScheduler job: downsample aged DCSServerBot samples (minute -> hour -> day)."""
+    async with AsyncSessionLocal() as db:
+        await rollup_samples(db)
+        await db.commit()
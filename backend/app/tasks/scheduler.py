@@ -1,22 +1,73 @@
+from datetime import UTC, datetime
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.config import settings
+from app.utils.cache import acquire_lease
+from app.utils.metrics import timed_job
 
 scheduler = AsyncIOScheduler()
 
 
+def _add_job(func, trigger: str, *, id: str, lease: float | None = None, on_skip=None, **kwargs) -> None:
+    """Schedule `func` under `id`, recording its duration and outcome in the metrics.
+
+    Every worker runs its own scheduler. With `lease` (seconds, longer than the job's
+    interval), the job only runs in the worker holding the `id` lease (see
+    `acquire_lease`); the others record a skipped run, and await `on_skip` if given.
+    """
+    claim = None
+    if lease is not None:
+
+        async def claim() -> bool:
+            if acquire_lease(id, lease):
+                return True
+            if on_skip is not None:
+                await on_skip()
+            return False
+
+    scheduler.add_job(timed_job(id, func, claim=claim), trigger, id=id, **kwargs)
+
+
 def start_scheduler():
     """Start APScheduler with periodic tasks."""
-    from app.tasks.calendar_auto import process_recurring_events
+    from app.services import dcsbot as dcsbot_service
 
-    # from app.tasks.dcsbot_import import import_dcsbot_stats
+    if dcsbot_service.polling_enabled():
+        from app.tasks.dcsbot_import import ROLLUP_INTERVAL, import_dcsbot_stats, rollup_dcsbot_history
 
-    scheduler.add_job(process_recurring_events, "interval", hours=1, id="calendar_auto")
-    # scheduler.add_job(import_dcsbot_stats, "interval", minutes=2, id="dcsbot_import")
+        # First run immediately so the snapshot is available right after startup
+        _add_job(
+            import_dcsbot_stats,
+            "interval",
+            seconds=settings.DCSBOT_POLL_INTERVAL,
+            id="dcsbot_import",
+            lease=2 * settings.DCSBOT_POLL_INTERVAL,
+            next_run_time=datetime.now(UTC),
+        )
+        _add_job(
+            rollup_dcsbot_history, "interval", seconds=ROLLUP_INTERVAL, id="dcsbot_rollup", lease=2 * ROLLUP_INTERVAL
+        )
 
     if settings.API_TEAMSPEAK_URL:
-        from app.tasks.teamspeak_scan import scan_teamspeak
+        from app.services.teamspeak import close_client
+        from app.tasks import teamspeak_scan
+
+        # The lease holder also holds the push session: a worker that lost it closes its own.
+        # First run immediately so the cache is populated right after startup
+        _add_job(
+            teamspeak_scan.scan_teamspeak,
+            "interval",
+            seconds=teamspeak_scan.INTERVAL,
+            id="teamspeak_scan",
+            lease=2 * teamspeak_scan.INTERVAL,
+            on_skip=close_client,
+            next_run_time=datetime.now(UTC),
+        )
+
+    if settings.DISCORD_BOT_TOKEN and settings.DISCORD_GUILD_ID:
+        from app.services import discord_voice
 
-        scheduler.add_job(scan_teamspeak, "interval", minutes=5, id="teamspeak_scan")
+        _add_job(discord_voice.sync_discord_voice, "interval", seconds=discord_voice.SYNC_INTERVAL, id="discord_voice")
 
     scheduler.start()
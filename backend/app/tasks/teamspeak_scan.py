@@ -1,6 +1,13 @@
+from app.config import settings
 from app.services.teamspeak import scan_and_cache
 
+INTERVAL = settings.TEAMSPEAK_SCAN_INTERVAL  # seconds
+
 
 async def scan_teamspeak():
-    """APScheduler job: fetch TeamSpeak data and update cache."""
+    """APScheduler job: fetch TeamSpeak data and update cache.
+
+    Runs in a single worker (lease, see scheduler), which in push mode also holds the
+    ServerQuery notification session.
+    """
     await scan_and_cache()
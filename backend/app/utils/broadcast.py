@@ -0,0 +1,144 @@
+"""Fan-out helpers for streaming endpoints (Server-Sent Events).
+
+- `Broadcaster`: one background task recomputes a value every `interval` seconds
+  while at least one subscriber is connected, and pushes it only when it changed.
+  Hundreds of subscribers therefore cost one computation per interval.
+- `EventBus`: pushes discrete events (diffs) to every subscriber, in order.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Receiving end of a `Broadcaster`; only the latest unread value is kept."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    def push(self, value: Any) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()  # Slow reader: drop the outdated value
+        self._queue.put_nowait(value)
+
+    async def get(self, timeout: float | None = None) -> Any | None:
+        """Wait for the next value. Returns None if `timeout` expires first."""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class Broadcaster:
+    def __init__(self, compute: Callable[[], Awaitable[Any]], interval: float):
+        self._compute = compute
+        self._interval = interval
+        self._subscribers: set[Subscription] = set()
+        self._latest: Any = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, value: Any) -> None:
+        """Push `value` to every subscriber, unless it equals the last published value."""
+        if value is None or value == self._latest:
+            return
+        self._latest = value
+        for subscription in self._subscribers:
+            subscription.push(value)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[Subscription]:
+        """Register a subscriber; the current value (if any) is delivered first."""
+        subscription = Subscription()
+        if self._latest is not None:
+            subscription.push(self._latest)
+        self._subscribers.add(subscription)
+        self._ensure_running()
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._subscribers:
+            try:
+                self.publish(await self._compute())
+            except Exception:
+                logger.exception("Broadcaster: failed to compute value")
+            await asyncio.sleep(self._interval)
+        # Nobody listening: forget the value so the next subscriber gets a fresh one
+        self._latest = None
+
+
+# Event telling subscribers to resynchronize from a full snapshot: delivered instead of
+# the missed events when a subscriber fell behind, or published when the source was reset
+RESYNC = object()
+
+
+class EventSubscription:
+    """Receiving end of an `EventBus`: every event, in order (until it lags)."""
+
+    def __init__(self, maxsize: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, event: Any) -> None:
+        if self._queue.full():
+            # Too slow: drop the backlog, the consumer must resynchronize from a snapshot
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+            return
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None) -> Any | None:
+        """Wait for the next event (or `RESYNC`). Returns None if `timeout` expires first."""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class EventBus:
+    """Fan-out of discrete events (e.g. diffs) to many subscribers.
+
+    `publish` must run on the event loop thread; other threads use
+    ``loop.call_soon_threadsafe(bus.publish, event)``.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._subscribers: set[EventSubscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: Any) -> None:
+        for subscription in self._subscribers:
+            subscription.push(event)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[EventSubscription]:
+        subscription = EventSubscription(self._maxsize)
+        self._subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
@@ -1,52 +1,518 @@
+"""Shared caches with pluggable storage backends.
+
+Every cache is a `Cache` (a dict-like mapping) backed by a store selected by
+`settings.CACHE_BACKEND`:
+
+- ``memory`` (default): entries live in the worker process (cachetools TTLCache).
+  Only correct with a single uvicorn worker.
+- ``sqlite``: entries live in a SQLite file (`settings.CACHE_SQLITE_PATH`) shared by
+  every worker on the host, so OAuth states, voice presence and upstream API
+  responses stay consistent when running with several workers (the Discord bot runs
+  in one of them and shares its voice index through `discord_voice_cache`).
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
 import time
+import weakref
+from collections.abc import Iterator, MutableMapping
 from functools import wraps
+from typing import Any, Protocol
+
+from cachetools import LRUCache, TTLCache
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheStore(Protocol):
+    """Storage backend for a single cache namespace.
+
+    Entries are returned as ``(value, stored_at)`` where ``stored_at`` is a wall-clock
+    timestamp, so entry ages are comparable across worker processes. `evictions`
+    counts the entries this process dropped because of their age or the size limit.
+    """
+
+    evictions: int
+
+    def get(self, key: str) -> tuple[Any, float] | None: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def add(self, key: str, value: Any) -> bool: ...
+
+    def pop(self, key: str) -> tuple[Any, float] | None: ...
+
+    def claim(self, key: str, owner: Any, ttl: float) -> bool: ...
+
+    def release(self, key: str, owner: Any) -> None: ...
+
+    def keys(self) -> list[str]: ...
+
+    def clear(self) -> None: ...
+
+
+class _CountingLRUCache(LRUCache):
+    evictions = 0
+
+    def popitem(self):
+        self.evictions += 1
+        return super().popitem()
+
+
+class _CountingTTLCache(TTLCache):
+    evictions = 0
+
+    def popitem(self):
+        self.evictions += 1
+        return super().popitem()
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.evictions += len(expired)
+        return expired
+
+
+class MemoryStore:
+    """In-process store (single worker only)."""
+
+    def __init__(self, *, maxsize: int | None, ttl: float | None):
+        self._data: MutableMapping[str, tuple[Any, float]]
+        if ttl is not None:
+            self._data = _CountingTTLCache(maxsize=maxsize or 1024, ttl=ttl)
+        elif maxsize is not None:
+            self._data = _CountingLRUCache(maxsize=maxsize)
+        else:
+            self._data = {}
+        self._claim_expiry: dict[str, float] = {}  # key -> expiry of a `claim`
+        self._lock = threading.Lock()
+
+    @property
+    def evictions(self) -> int:
+        return getattr(self._data, "evictions", 0)
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        return self._data.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time())
+
+    def add(self, key: str, value: Any) -> bool:
+        with self._lock:
+            if key in self._data:
+                return False
+            self._data[key] = (value, time.time())
+            return True
+
+    def pop(self, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            self._claim_expiry.pop(key, None)
+            return self._data.pop(key, None)
+
+    def claim(self, key: str, owner: Any, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] != owner and self._claim_expiry.get(key, float("inf")) > now:
+                return False
+            self._data[key] = (owner, now)
+            self._claim_expiry[key] = now + ttl
+            return True
+
+    def release(self, key: str, owner: Any) -> None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == owner:
+                del self._data[key]
+                self._claim_expiry.pop(key, None)
+
+    def keys(self) -> list[str]:
+        return list(self._data.keys())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._claim_expiry.clear()
+
+
+_sqlite_local = threading.local()
+
+# Seconds a write waits for another worker's write lock. Store calls run on the event
+# loop, so every write is a single short transaction (values are pickled beforehand)
+# and a stuck writer surfaces as an error instead of stalling the worker.
+SQLITE_BUSY_TIMEOUT = 0.5
+
+
+class SQLiteStore:
+    """Store backed by a SQLite file shared between worker processes.
+
+    Values are pickled. Each thread (request loop, Discord bot thread) gets its own
+    connection; WAL mode lets readers proceed while another worker writes.
+    """
+
+    def __init__(self, path: str, namespace: str, *, maxsize: int | None, ttl: float | None):
+        self._path = path
+        self._namespace = namespace
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self.evictions = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        connections = getattr(_sqlite_local, "connections", None)
+        if connections is None:
+            connections = _sqlite_local.connections = {}
+        conn = connections.get(self._path)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key)"
+                ") WITHOUT ROWID"
+            )
+            connections[self._path] = conn
+        return conn
+
+    def _expires_at(self, now: float) -> float | None:
+        return now + self._ttl if self._ttl is not None else None
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        row = self._conn().execute(
+            "SELECT value, stored_at FROM cache_entry"
+            " WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self._namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
 
-from cachetools import TTLCache
+    def set(self, key: str, value: Any) -> None:
+        data = pickle.dumps(value)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entry (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (self._namespace, key, data, now, self._expires_at(now)),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
 
-# Shared in-memory caches (single worker uvicorn)
-teamspeak_cache = TTLCache(maxsize=100, ttl=1200)  # 20 min
-dcsbot_cache = TTLCache(maxsize=100, ttl=120)  # 2 min
-discord_oauth_states = TTLCache(maxsize=1000, ttl=300)  # 5 min
-discord_voice_cache: dict = {}  # Real-time updates from Gateway bot, no TTL needed
+    def add(self, key: str, value: Any) -> bool:
+        # An expired entry is replaced, a live one kept: a single statement
+        cursor = self._upsert(key, pickle.dumps(value), "cache_entry.expires_at <= excluded.stored_at", self._ttl)
+        return cursor.rowcount == 1
 
+    def claim(self, key: str, owner: Any, ttl: float) -> bool:
+        # Taken when absent or expired, renewed when `owner` already holds it
+        condition = "cache_entry.expires_at <= excluded.stored_at OR cache_entry.value = excluded.value"
+        return self._upsert(key, pickle.dumps(owner), condition, ttl).rowcount == 1
 
-def cached(cache: TTLCache):
-    """Decorator for async functions with TTL caching."""
+    def release(self, key: str, owner: Any) -> None:
+        self._conn().execute(
+            "DELETE FROM cache_entry WHERE namespace = ? AND key = ? AND value = ?",
+            (self._namespace, key, pickle.dumps(owner)),
+        )
+
+    def _upsert(self, key: str, data: bytes, condition: str, ttl: float | None) -> sqlite3.Cursor:
+        """Insert an entry, or replace the existing one when `condition` holds."""
+        now = time.time()
+        return self._conn().execute(
+            "INSERT INTO cache_entry (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (namespace, key) DO UPDATE SET"
+            " value = excluded.value, stored_at = excluded.stored_at, expires_at = excluded.expires_at"
+            f" WHERE {condition}",
+            (self._namespace, key, data, now, now + ttl if ttl is not None else None),
+        )
+
+    def pop(self, key: str) -> tuple[Any, float] | None:
+        rows = self._conn().execute(
+            "DELETE FROM cache_entry WHERE namespace = ? AND key = ?"
+            " RETURNING value, stored_at, expires_at",
+            (self._namespace, key),
+        ).fetchall()
+        row = rows[0] if rows else None
+        if row is None or (row[2] is not None and row[2] <= time.time()):
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def keys(self) -> list[str]:
+        rows = self._conn().execute(
+            "SELECT key FROM cache_entry WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self._namespace, time.time()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache_entry WHERE namespace = ?", (self._namespace,))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the oldest ones beyond maxsize."""
+        cursor = conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND expires_at <= ?", (self._namespace, now))
+        self.evictions += cursor.rowcount
+        if self._maxsize is not None:
+            cursor = conn.execute(
+                "DELETE FROM cache_entry WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entry WHERE namespace = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self._namespace, self._namespace, self._maxsize),
+            )
+            self.evictions += cursor.rowcount
+
+
+def create_store(name: str, *, maxsize: int | None, ttl: float | None) -> CacheStore:
+    """Build the store for cache `name` according to `settings.CACHE_BACKEND`."""
+    backend = settings.CACHE_BACKEND
+    if backend == "memory":
+        return MemoryStore(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteStore(settings.CACHE_SQLITE_PATH, name, maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend!r} (expected 'memory' or 'sqlite')")
+
+
+# Every live cache and `cached` function, for the metrics collector (app.utils.metrics)
+# (caches are mappings, hence unhashable: keyed by id)
+_caches: "weakref.WeakValueDictionary[int, Cache]" = weakref.WeakValueDictionary()
+_cached_functions: weakref.WeakSet = weakref.WeakSet()
+
+
+def registered_caches() -> list["Cache"]:
+    return list(_caches.values())
+
+
+def registered_cached_functions() -> list:
+    return list(_cached_functions)
+
+
+class Cache(MutableMapping):
+    """Dict-like cache delegating storage to a `CacheStore`.
+
+    Besides the mapping interface, exposes `add` (atomic set-if-absent, usable as a
+    cross-worker lock) and `age` (seconds since an entry was stored). Lookups are
+    counted in `stats` (hits, misses, evictions).
+    """
+
+    def __init__(self, name: str, *, maxsize: int | None = None, ttl: float | None = None, store: CacheStore | None = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store or create_store(name, maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        _caches[id(self)] = self
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.store.evictions}
+
+    def _lookup(self, key: str) -> tuple[Any, float] | None:
+        entry = self.store.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def __getitem__(self, key: str) -> Any:
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.store.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if self.store.pop(key) is None:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.keys())
+
+    def __len__(self) -> int:
+        return len(self.store.keys())
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        entry = self.store.pop(key)
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return entry[0]
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def add(self, key: str, value: Any) -> bool:
+        """Store `value` only if `key` is absent. Returns True if it was stored."""
+        return self.store.add(key, value)
+
+    def claim(self, key: str, owner: Any, ttl: float) -> bool:
+        """Hold `key` for `owner` during `ttl` seconds (a lease).
+
+        Succeeds when `key` is free, expired or already held by `owner` (renewal).
+        """
+        return self.store.claim(key, owner, ttl)
+
+    def release(self, key: str, owner: Any) -> None:
+        """Free `key` if `owner` holds it."""
+        self.store.release(key, owner)
+
+    def get_with_age(self, key: str) -> tuple[Any, float] | None:
+        """Return ``(value, seconds since stored)``, or None if absent."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return entry[0], time.time() - entry[1]
+
+    def age(self, key: str) -> float | None:
+        """Seconds since `key` was stored, or None if absent (not counted in `stats`)."""
+        entry = self.store.get(key)
+        return time.time() - entry[1] if entry is not None else None
+
+
+# Shared caches (see module docstring for the storage backend)
+# Upstream caches keep entries for CACHE_MAX_STALE seconds: the last good value is served
+# while a refresh is running or the upstream is down.
+teamspeak_cache = Cache("teamspeak", maxsize=100, ttl=settings.CACHE_MAX_STALE)
+dcsbot_cache = Cache("dcsbot", maxsize=100, ttl=settings.CACHE_MAX_STALE)
+discord_oauth_states = Cache("discord_oauth_states", maxsize=1000, ttl=300)  # 5 min
+job_leases = Cache("job_leases", maxsize=1000)  # Each lease carries its own expiry
+# Voice index shared by the Discord bot's worker, rewritten when it changes (no TTL:
+# an idle guild leaves it unchanged) and removed when the bot stops
+discord_voice_cache = Cache("discord_voice", maxsize=10)
+# Rendered public menu per access level, cleared by admin edits (TTL as a safety net)
+menu_cache = Cache("menu", maxsize=16, ttl=3600)
+# Rendered CMS pages by path, cleared by admin edits (TTL as a safety net)
+page_cache = Cache("pages", maxsize=256, ttl=3600)
+# Calendar view entries per month, cleared by event and vote writes (TTL as a safety net)
+calendar_cache = Cache("calendar", maxsize=64, ttl=600)
+
+
+def acquire_lease(name: str, ttl: float) -> bool:
+    """Take or renew lease `name` for this worker, for `ttl` seconds.
+
+    Every worker runs its own scheduler: the worker holding a job's lease does the work
+    and renews the lease on each run, the others skip their runs until it expires
+    (holder stopped or dead). `ttl` must exceed the renewal interval, or a late run
+    lets another worker take over.
+    """
+    return job_leases.claim(name, os.getpid(), ttl)
+
+
+def release_lease(name: str) -> None:
+    """Give up lease `name` if this worker holds it, so another worker takes over now."""
+    job_leases.release(name, os.getpid())
+
+
+def cached(cache: Cache, *, fresh_ttl: float | None = None):
+    """Decorator for async functions with TTL caching.
+
+    Concurrent misses for the same key are coalesced (single-flight): the first caller
+    starts the load, the others await the same task instead of hitting the upstream.
+
+    With `fresh_ttl`, entries older than `fresh_ttl` seconds are stale: they are still
+    returned immediately while a background refresh runs (stale-while-revalidate), until
+    the cache TTL drops them. A `None` result (failed upstream call) never replaces a
+    previous value, so the last good value keeps being served during an outage.
+
+    Counters are exposed as ``wrapper.stats`` (hits, misses, coalesced, stale).
+    """
 
     def decorator(func):
-        timestamps: dict[str, float] = {}
+        prefix = f"{func.__name__}:"
+        inflight: dict[str, asyncio.Task] = {}
+        stats = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0}
+
+        async def load(key: str, args: tuple, kwargs: dict):
+            try:
+                result = await func(*args, **kwargs)
+                if result is None and fresh_ttl is not None:
+                    previous = cache.get(key)  # Read once: each lookup counts in the cache stats
+                    if previous is not None:
+                        logger.warning("%s: refresh failed, keeping last good value", func.__name__)
+                        return previous
+                cache[key] = result
+                return result
+            finally:
+                inflight.pop(key, None)
+
+        def running(key: str) -> asyncio.Task | None:
+            task = inflight.get(key)
+            if task is not None and task.get_loop() is asyncio.get_running_loop():
+                return task
+            return None
+
+        def start_load(key: str, args: tuple, kwargs: dict) -> asyncio.Task:
+            inflight[key] = asyncio.ensure_future(load(key, args, kwargs))
+            return inflight[key]
+
+        def log_refresh_error(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("%s: background refresh failed", func.__name__, exc_info=task.exception())
 
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            key = f"{func.__name__}:{args}:{kwargs}"
-            if key in cache:
-                return cache[key]
-            # Prune timestamps for entries evicted by TTLCache
-            stale = [k for k in timestamps if k not in cache]
-            for k in stale:
-                del timestamps[k]
-            result = await func(*args, **kwargs)
-            cache[key] = result
-            timestamps[key] = time.monotonic()
-            return result
+            key = f"{prefix}{args}:{kwargs}"
+            entry = cache.get_with_age(key)
+            if entry is not None:
+                value, age = entry
+                if fresh_ttl is None or age < fresh_ttl:
+                    stats["hits"] += 1
+                    return value
+                stats["stale"] += 1
+                if running(key) is None:
+                    start_load(key, args, kwargs).add_done_callback(log_refresh_error)
+                return value
+            task = running(key)
+            if task is None:
+                stats["misses"] += 1
+                task = start_load(key, args, kwargs)
+            else:
+                stats["coalesced"] += 1
+                logger.debug("%s: coalesced with in-flight load (%d so far)", func.__name__, stats["coalesced"])
+            # shield: a cancelled caller (client disconnect) must not cancel the shared load
+            return await asyncio.shield(task)
 
         def invalidate_if_older(min_age: float):
             """Remove all cached entries older than min_age seconds."""
-            now = time.monotonic()
-            keys_to_remove = [k for k, ts in timestamps.items() if now - ts >= min_age]
-            for k in keys_to_remove:
-                cache.pop(k, None)
-                timestamps.pop(k, None)
+            for k in list(cache):
+                if not k.startswith(prefix):
+                    continue
+                age = cache.age(k)
+                if age is not None and age >= min_age:
+                    cache.pop(k, None)
 
         def clear():
-            """Remove all entries for this function from cache and timestamps."""
-            for k in list(timestamps):
-                cache.pop(k, None)
-            timestamps.clear()
+            """Remove all entries for this function from cache."""
+            for k in list(cache):
+                if k.startswith(prefix):
+                    cache.pop(k, None)
 
         wrapper.cache = cache
         wrapper.invalidate_if_older = invalidate_if_older
         wrapper.clear = clear
+        wrapper.stats = stats
+        _cached_functions.add(wrapper)
         return wrapper
 
     return decorator
@@ -0,0 +1,75 @@
+"""Conditional GET (ETag / If-None-Match) for responses rendered ahead of time.
+
+The ETag is a hash of the rendered body, so it changes exactly when the content does;
+clients revalidate on every use (`no-cache`) and get an empty 304 while it matches.
+"""
+
+import hashlib
+from collections.abc import AsyncIterable
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+from fastapi.responses import StreamingResponse
+
+
+def make_etag(content: bytes) -> str:
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for DateTime(timezone=True) columns
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """Whether the client's copy is current.
+
+    If-None-Match is compared weakly (proxies weaken ETags when compressing); as in
+    RFC 9110, If-Modified-Since is only considered when If-None-Match is absent.
+    """
+    header = request.headers.get("if-none-match")
+    if header:
+        if header.strip() == "*":
+            return True
+        return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    since = request.headers.get("if-modified-since")
+    if since and last_modified is not None:
+        try:
+            since_date = parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+        if since_date.tzinfo is None:
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= since_date
+    return False
+
+
+def etag_response(
+    request: Request,
+    content: bytes | AsyncIterable[bytes],
+    etag: str,
+    *,
+    last_modified: datetime | None = None,
+    media_type: str = "application/json",
+    cache_control: str = "private, no-cache",
+    vary: str | None = "Authorization",
+) -> Response:
+    """`content` with its validators, or 304 Not Modified if the client already has it.
+
+    The defaults suit content depending on the logged-in user: only the browser may
+    keep it, and shared caches must key it on the Authorization header.
+
+    `content` may be an async iterable (streamed body): the ETag must then be derived
+    from a cheaper version of the content, and the iterable is not consumed on a 304.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    if vary:
+        headers["Vary"] = vary
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if isinstance(content, bytes):
+        return Response(content, media_type=media_type, headers=headers)
+    return StreamingResponse(content, media_type=media_type, headers=headers)
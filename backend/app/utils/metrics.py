@@ -0,0 +1,346 @@
+"""Prometheus instrumentation, served by `GET /api/metrics`.
+
+- HTTP: requests and latency per route template (`MetricsMiddleware`)
+- Database: statement durations, plus statements and DB time per request (`instrument_engine`)
+- Caches: hits/misses/evictions of every `Cache` and `cached` function (`CacheCollector`)
+- Upstreams: latency and errors of DCSServerBot, TeamSpeak and the Discord gateway
+  (`track_upstream`, `UPSTREAM_EVENTS`, `DISCORD_GATEWAY_LATENCY`)
+- Scheduler: job durations and outcomes (`timed_job`)
+
+Values are kept per process: with several uvicorn workers, each worker exposes its own.
+
+The middleware also profiles each request: statement count and DB time are sent in a
+`Server-Timing` header (with settings.SERVER_TIMING, off by default), and a warning is logged when a request runs more statements
+than its budget (`query_budget`, else settings.DB_QUERY_BUDGET) or repeats the same
+statement (N+1 lazy loads). tests/query_budget.py turns declared budgets into test failures.
+"""
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.utils.cache import registered_cached_functions, registered_caches
+from app.version import APP_VERSION
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+# Same SQL run this many times in one request: most likely a lazy load in a loop (N+1)
+REPEATED_STATEMENT_THRESHOLD = 5
+
+APP_INFO = Gauge("veaf_app_info", "Application info", ["version"])
+APP_INFO.labels(APP_VERSION).set(1)
+
+HTTP_REQUESTS = Counter("veaf_http_requests", "HTTP requests", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram(
+    "veaf_http_request_duration_seconds", "Time until the response headers are sent", ["method", "route"]
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "veaf_http_request_db_queries",
+    "SQL statements executed per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "veaf_http_request_db_seconds", "Time spent in SQL statements per request", ["method", "route"]
+)
+DB_QUERY_DURATION = Histogram(
+    "veaf_db_query_duration_seconds",
+    "SQL statement duration",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "veaf_upstream_request_duration_seconds", "Upstream call duration", ["service", "operation"]
+)
+UPSTREAM_ERRORS = Counter("veaf_upstream_errors", "Failed upstream calls", ["service", "operation"])
+UPSTREAM_EVENTS = Counter("veaf_upstream_events", "Events pushed by an upstream", ["service", "event"])
+DISCORD_GATEWAY_LATENCY = Gauge("veaf_discord_gateway_latency_seconds", "Discord gateway heartbeat latency")
+
+JOB_DURATION = Histogram(
+    "veaf_job_duration_seconds",
+    "Scheduled job duration",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+JOB_RUNS = Counter("veaf_job_runs", "Scheduled job runs", ["job", "status"])
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class DbUsage:
+    """SQL statements executed on behalf of the current request."""
+
+    queries: int = 0
+    seconds: float = 0.0
+    statements: StatementCounter = field(default_factory=StatementCounter)
+
+    def most_repeated(self) -> tuple[str | None, int]:
+        """The statement executed the most times, and how many times."""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+# Set by MetricsMiddleware for the duration of a request
+_db_usage: ContextVar[DbUsage | None] = ContextVar("db_usage", default=None)
+
+
+def current_db_usage() -> DbUsage | None:
+    return _db_usage.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    DB_QUERY_DURATION.observe(elapsed)
+    usage = _db_usage.get()
+    if usage is not None:
+        usage.queries += 1
+        usage.seconds += elapsed
+        usage.statements[statement] += 1
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time every statement run by `engine` and charge it to the current request."""
+    target = engine.sync_engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request (keeps label cardinality bounded).
+
+    Depending on the FastAPI version, the matched route of an included router carries
+    either its full path or only its own part; the prefix is then recovered from the path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    regex = getattr(route, "path_regex", None)
+    if template is None or regex is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    start = 0
+    while start != -1:
+        if regex.match(path[start:]):
+            return path[:start] + template
+        start = path.find("/", start + 1)
+    return template
+
+
+def query_budget(max_queries: int):
+    """Declare how many SQL statements an endpoint may run per request.
+
+    Apply below the route decorator. Going over logs a warning and fails the tests.
+    """
+
+    def decorator(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+
+    return decorator
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    route: str
+    queries: int
+    db_seconds: float
+    budget: int | None  # Declared with `query_budget`
+
+
+# Called with the profile of every finished request (tests/query_budget.py)
+profile_listeners: list[Callable[[RequestProfile], None]] = []
+
+
+def _server_timing(usage: DbUsage, elapsed: float) -> bytes:
+    return f'db;dur={usage.seconds * 1000:.1f};desc="{usage.queries} SQL", app;dur={elapsed * 1000:.1f}'.encode()
+
+
+def _check_budget(profile: RequestProfile, usage: DbUsage) -> None:
+    budget = profile.budget if profile.budget is not None else settings.DB_QUERY_BUDGET or None
+    if budget is not None and profile.queries > budget:
+        logger.warning(
+            "%s %s ran %d SQL statements (budget %d, %.1f ms in DB)",
+            profile.method,
+            profile.route,
+            profile.queries,
+            budget,
+            profile.db_seconds * 1000,
+        )
+    statement, count = usage.most_repeated()
+    if count >= REPEATED_STATEMENT_THRESHOLD:
+        logger.warning(
+            "%s %s ran the same statement %d times (N+1 lazy load?): %s",
+            profile.method,
+            profile.route,
+            count,
+            " ".join(statement.split())[:200],
+        )
+    for listener in profile_listeners:
+        listener(profile)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording and profiling every HTTP request under its route template.
+
+    Latency is measured until the response headers are sent, so long-lived streams
+    (SSE) do not skew it; their DB usage is recorded when they end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        elapsed: float | None = None
+        usage = DbUsage()
+
+        async def send_wrapper(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                if settings.SERVER_TIMING:
+                    headers = [*message.get("headers", ()), (b"server-timing", _server_timing(usage, elapsed))]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = _db_usage.set(usage)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _db_usage.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(
+                elapsed if elapsed is not None else time.perf_counter() - start
+            )
+            HTTP_REQUEST_DB_QUERIES.labels(method, route).observe(usage.queries)
+            HTTP_REQUEST_DB_DURATION.labels(method, route).observe(usage.seconds)
+            budget = getattr(scope.get("endpoint"), "query_budget", None)
+            _check_budget(RequestProfile(method, route, usage.queries, usage.seconds, budget), usage)
+
+
+# ---------------------------------------------------------------------------
+# Upstreams and jobs
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def track_upstream(service: str, operation: str) -> Iterator[None]:
+    """Time an upstream call; an exception escaping the block counts as an error."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.labels(service, operation).observe(time.perf_counter() - start)
+
+
+def timed_job(job_id: str, func, *, claim: Callable[[], Awaitable[bool]] | None = None):
+    """Wrap an async scheduler job to record its duration and outcome.
+
+    When `claim` returns False (e.g. another worker holds the job's lease), the run is
+    skipped: counted as "skipped", not timed. Otherwise the outcome is "error" when the
+    job raised (the exception is logged here), else "ok".
+    """
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if claim is not None and not await claim():
+            JOB_RUNS.labels(job_id, "skipped").inc()
+            return None
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await func(*args, **kwargs)
+            status = "ok"
+            return result
+        except Exception:
+            logger.exception("Scheduled job %s failed", job_id)
+        finally:
+            JOB_DURATION.labels(job_id).observe(time.perf_counter() - start)
+            JOB_RUNS.labels(job_id, status).inc()
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Caches
+# ---------------------------------------------------------------------------
+
+
+# `cached` stats keys -> result label
+_CALL_RESULTS = {"hits": "hit", "misses": "miss", "coalesced": "coalesced", "stale": "stale"}
+
+
+class CacheCollector:
+    """Reads the counters kept by app.utils.cache at scrape time.
+
+    Caches sharing a name (e.g. re-created in tests) are summed.
+    """
+
+    def collect(self):
+        lookups = CounterMetricFamily("veaf_cache_lookups", "Cache lookups", labels=["cache", "result"])
+        evictions = CounterMetricFamily("veaf_cache_evictions", "Entries dropped by age or size", labels=["cache"])
+        calls = CounterMetricFamily("veaf_cached_calls", "Calls to cached functions", labels=["function", "result"])
+
+        by_cache: dict[str, dict[str, int]] = {}
+        for cache in registered_caches():
+            totals = by_cache.setdefault(cache.name, {"hits": 0, "misses": 0, "evictions": 0})
+            for key, value in cache.stats.items():
+                totals[key] += value
+        for name, totals in sorted(by_cache.items()):
+            lookups.add_metric([name, "hit"], totals["hits"])
+            lookups.add_metric([name, "miss"], totals["misses"])
+            evictions.add_metric([name], totals["evictions"])
+
+        by_function: dict[tuple[str, str], int] = {}
+        for func in registered_cached_functions():
+            name = f"{func.__module__}.{func.__qualname__}"
+            for key, value in func.stats.items():
+                labels = (name, _CALL_RESULTS[key])
+                by_function[labels] = by_function.get(labels, 0) + value
+        for labels, value in sorted(by_function.items()):
+            calls.add_metric(list(labels), value)
+
+        yield lookups
+        yield evictions
+        yield calls
+
+
+REGISTRY.register(CacheCollector())
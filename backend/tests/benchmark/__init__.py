@@ -0,0 +1 @@
+"""Performance benchmark of the hot public endpoints (see tests.benchmark.runner)."""
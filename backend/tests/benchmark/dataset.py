@@ -0,0 +1,187 @@
+"""Realistic benchmark dataset, built with the test factories.
+
+The defaults approximate a busy community a few years in: thousands of users with
+their modules, a calendar with votes, choices and flights on every event, a two-level
+menu and uploaded images. Generation is seeded, so every run gets the same data.
+"""
+
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.calendar import CalendarEvent, Choice, Flight, Slot, Vote
+from app.models.content import MenuItem
+from app.models.module import Module
+from app.models.user import User, UserModule
+from tests.factories import EventFactory, FileFactory, MenuItemFactory, ModuleFactory, UserFactory
+
+BATCH_SIZE = 1000
+
+# Same 1x1 PNG for every seeded file
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+@dataclass
+class DatasetSize:
+    users: int = 3000
+    aircraft: int = 60
+    helicopters: int = 12
+    maps: int = 10
+    modules_per_user: int = 8
+    events: int = 2000
+    votes_per_event: int = 12
+    choices_per_event: int = 6
+    flights_per_event: int = 2
+    slots_per_flight: int = 4
+    menu_roots: int = 8
+    menu_children: int = 6
+    files: int = 200
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class Dataset:
+    """Ids the benchmark requests are built from."""
+
+    size: DatasetSize
+    module_ids: list[int] = field(default_factory=list)
+    event_ids: list[int] = field(default_factory=list)
+    file_uuids: list[str] = field(default_factory=list)
+    # Window of the calendar month view (ISO dates)
+    month_start: str = ""
+    month_end: str = ""
+
+
+async def _add_all(db: AsyncSession, objects: list) -> None:
+    for start in range(0, len(objects), BATCH_SIZE):
+        db.add_all(objects[start : start + BATCH_SIZE])
+        await db.flush()
+
+
+async def seed(db: AsyncSession, size: DatasetSize, upload_dir: str, *, seed: int = 42) -> Dataset:
+    """Insert the dataset (and write the uploaded files) and commit."""
+    rng = random.Random(seed)
+    now = datetime.now(UTC).replace(minute=0, second=0, microsecond=0)
+    dataset = Dataset(size=size)
+
+    # Modules
+    aircraft = [
+        ModuleFactory.build(type=Module.TYPE_AIRCRAFT, period=rng.choice([1, 2, 3])) for _ in range(size.aircraft)
+    ]
+    helicopters = [ModuleFactory.build(type=Module.TYPE_HELICOPTER, period=3) for _ in range(size.helicopters)]
+    maps = [ModuleFactory.build(type=Module.TYPE_MAP) for _ in range(size.maps)]
+    await _add_all(db, aircraft + helicopters + maps)
+    flyable = aircraft + helicopters
+    dataset.module_ids = [m.id for m in flyable]
+
+    # Users: mostly members and cadets, a few guests and disabled accounts, a full office
+    statuses = [User.STATUS_MEMBER] * 6 + [User.STATUS_CADET] * 3 + [User.STATUS_GUEST]
+    users = [
+        UserFactory.build(
+            status=rng.choice(statuses),
+            sim_bms=rng.random() < 0.15,
+            disabled=rng.random() < 0.05,
+            cadet_flights=rng.randint(0, 6),
+            need_presentation=rng.random() < 0.3,
+        )
+        for _ in range(size.users)
+    ]
+    for user, status in zip(users, User.STATUSES_OFFICE):
+        user.status, user.disabled = status, False
+    await _add_all(db, users)
+
+    user_modules = []
+    for user in users:
+        for module in rng.sample(flyable, min(size.modules_per_user, len(flyable))):
+            user_modules.append(
+                UserModule(
+                    user_id=user.id,
+                    module_id=module.id,
+                    active=rng.random() < 0.8,
+                    level=rng.randint(UserModule.LEVEL_UNKNOWN, UserModule.LEVEL_INSTRUCTOR),
+                )
+            )
+    await _add_all(db, user_modules)
+
+    # Events over the past and coming year, one every few hours
+    events = []
+    for i in range(size.events):
+        start = now + timedelta(hours=(i - size.events // 2) * 6)
+        events.append(
+            EventFactory.build(
+                owner_id=rng.choice(users).id,
+                type=rng.randint(CalendarEvent.EVENT_TYPE_TRAINING, CalendarEvent.EVENT_TYPE_ATC),
+                start_date=start,
+                end_date=start + timedelta(hours=3),
+                map_id=rng.choice(maps).id,
+                description="Briefing à 20h45 sur le TeamSpeak. " * 20,
+            )
+        )
+    await _add_all(db, events)
+    dataset.event_ids = [e.id for e in events]
+
+    votes, choices, flights = [], [], []
+    for event in events:
+        for user in rng.sample(users, min(size.votes_per_event, len(users))):
+            votes.append(Vote(event_id=event.id, user_id=user.id, vote=rng.choice([True, False, None])))
+        for user in rng.sample(users, min(size.choices_per_event, len(users))):
+            choices.append(
+                Choice(
+                    event_id=event.id,
+                    user_id=user.id,
+                    module_id=rng.choice(flyable).id,
+                    task=rng.randint(Choice.TASK_UNDEFINED, Choice.TASK_TRANSPORT),
+                    priority=rng.randint(1, 3),
+                )
+            )
+        for n in range(size.flights_per_event):
+            flights.append(
+                Flight(
+                    event_id=event.id,
+                    name=f"Flight {n + 1}",
+                    nb_slots=size.slots_per_flight,
+                    aircraft_id=rng.choice(flyable).id,
+                )
+            )
+    await _add_all(db, votes + choices + flights)
+    slots = [
+        Slot(flight_id=flight.id, user_id=rng.choice(users).id)
+        for flight in flights
+        for _ in range(size.slots_per_flight)
+    ]
+    await _add_all(db, slots)
+
+    # Two-level menu
+    roots = [MenuItemFactory.build(type=MenuItem.TYPE_MENU, link=None) for _ in range(size.menu_roots)]
+    await _add_all(db, roots)
+    children = [
+        MenuItemFactory.build(menu_id=root.id, restriction=rng.choice([MenuItem.LEVEL_ALL, MenuItem.LEVEL_MEMBER]))
+        for root in roots
+        for _ in range(size.menu_children)
+    ]
+    await _add_all(db, children)
+
+    # Uploaded images (stored as UPLOAD_DIR/<u[0]>/<u[1]>/<uuid>.<ext>)
+    files = [FileFactory.build() for _ in range(size.files)]
+    await _add_all(db, files)
+    for f in files:
+        directory = os.path.join(upload_dir, f.uuid[0], f.uuid[1])
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{f.uuid}.{f.extension}"), "wb") as out:
+            out.write(_PNG)
+    dataset.file_uuids = [f.uuid for f in files]
+
+    await db.commit()
+
+    month = now.replace(day=1)
+    dataset.month_start = (month - timedelta(days=7)).date().isoformat()
+    dataset.month_end = (month + timedelta(days=38)).date().isoformat()
+    return dataset
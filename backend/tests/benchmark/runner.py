@@ -0,0 +1,357 @@
+"""Benchmark of the hot public endpoints.
+
+    cd backend
+    uv run python -m tests.benchmark --output bench/base.json
+    uv run python -m tests.benchmark --output bench/new.json --compare bench/base.json
+
+A fresh database is seeded (tests.benchmark.dataset), DCSServerBot and TeamSpeak are
+replaced by local stand-ins (tests.benchmark.upstreams), then every endpoint receives
+`--requests` requests from `--concurrency` concurrent clients. Requests go through the
+ASGI app in-process (no network, no uvicorn), so the figures are the application's
+own cost: throughput, latency percentiles and SQL statements per request.
+
+The results are written as JSON with the commit they were measured on; `--compare`
+prints the change against an earlier file and exits with status 1 when a p95 latency
+grew by more than `--threshold`. With `--explain`, the query plan of every SELECT run
+by each endpoint is recorded too, e.g. to check that a new index is used.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from datetime import UTC, datetime
+
+import httpx
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base, get_db
+from app.main import app
+from app.models.module import Module
+from app.services import dcsbot as dcsbot_service
+from app.services import teamspeak as ts_service
+from app.utils.cache import calendar_cache, dcsbot_cache, menu_cache, page_cache, teamspeak_cache
+from app.utils.metrics import RequestProfile, instrument_engine, profile_listeners
+from tests.benchmark.dataset import Dataset, DatasetSize, seed
+from tests.benchmark.upstreams import DcsBotStandIn, TeamSpeakStandIn
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Endpoint:
+    name: str
+    url: Callable[[Dataset, int], str]  # i-th request URL
+
+
+ENDPOINTS = [
+    Endpoint("/api/header", lambda d, i: "/api/header"),
+    Endpoint("/api/menu", lambda d, i: "/api/menu"),
+    Endpoint(
+        "/api/calendar/events",
+        lambda d, i: f"/api/calendar/events?from_date={d.month_start}&to_date={d.month_end}",
+    ),
+    Endpoint("/api/calendar/events/{id}", lambda d, i: f"/api/calendar/events/{d.event_ids[i % len(d.event_ids)]}"),
+    Endpoint("/api/calendar/feed.ics", lambda d, i: "/api/calendar/feed.ics"),
+    Endpoint("/api/roster/stats", lambda d, i: "/api/roster/stats"),
+    Endpoint("/api/roster/office", lambda d, i: "/api/roster/office"),
+    Endpoint("/api/roster/pilots", lambda d, i: "/api/roster/pilots?group=members"),
+    Endpoint("/api/roster/bms", lambda d, i: "/api/roster/bms"),
+    Endpoint("/api/roster/modules", lambda d, i: f"/api/roster/modules?type={Module.TYPE_AIRCRAFT}"),
+    Endpoint("/api/roster/modules/{id}", lambda d, i: f"/api/roster/modules/{d.module_ids[i % len(d.module_ids)]}"),
+    Endpoint("/api/mission-maker/matrix", lambda d, i: "/api/mission-maker/matrix?group=members"),
+    Endpoint("/api/files/{uuid}", lambda d, i: f"/api/files/{d.file_uuids[i % len(d.file_uuids)]}"),
+]
+
+
+@dataclass
+class Options:
+    requests: int = 200
+    concurrency: int = 8
+    warmup: int = 10
+    scale: float = 1.0  # Multiplies the DatasetSize counts
+    seed: int = 42
+    database_url: str | None = None  # Must point to an empty database; default: temporary SQLite file
+    endpoints: str | None = None  # Only endpoints whose name contains this
+    upstream_latency: float = 0.005
+    explain: bool = False  # Record the query plans of each endpoint
+
+
+def _dataset_size(scale: float) -> DatasetSize:
+    size = DatasetSize()
+    # Per-user/per-event fan-outs stay realistic, only the counts of entities scale
+    for name in ("users", "events", "files"):
+        setattr(size, name, max(1, round(getattr(size, name) * scale)))
+    return size
+
+
+@asynccontextmanager
+async def environment(options: Options) -> AsyncIterator[tuple[Dataset, AsyncEngine]]:
+    """Seeded database, upstream stand-ins and settings pointing at them."""
+    workdir = tempfile.mkdtemp(prefix="veaf-bench-")
+    saved = {
+        name: getattr(settings, name)
+        for name in ("UPLOAD_DIR", "API_TEAMSPEAK_URL", "TEAMSPEAK_PUSH", "API_DCSSERVERBOT_URL", "SERVER_TIMING")
+    }
+    saved_dcsbot_client, saved_ts_client = dcsbot_service._client, ts_service._client
+    engine = create_async_engine(options.database_url or f"sqlite+aiosqlite:///{workdir}/bench.sqlite3")
+    instrument_engine(engine)
+    teamspeak = TeamSpeakStandIn(latency=options.upstream_latency)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+        started = time.perf_counter()
+        async with sessions() as db:
+            dataset = await seed(db, _dataset_size(options.scale), settings.UPLOAD_DIR, seed=options.seed)
+        # Planner statistics, as autovacuum would have gathered them on a live database
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+        logger.info("Dataset seeded in %.1fs", time.perf_counter() - started)
+
+        async def get_bench_db():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_bench_db
+        settings.SERVER_TIMING = True  # As profiled in development
+        for cache in (menu_cache, page_cache, calendar_cache):
+            cache.clear()
+
+        # DCSServerBot: shared client routed to the stand-in
+        dcsbot_cache.clear()
+        settings.API_DCSSERVERBOT_URL = "http://dcsbot.bench"
+        dcsbot_service._client = httpx.AsyncClient(
+            base_url=settings.API_DCSSERVERBOT_URL,
+            transport=httpx.ASGITransport(app=DcsBotStandIn(latency=options.upstream_latency)),
+        )
+        if dcsbot_service.polling_enabled():
+            await dcsbot_service.poll_snapshot()
+
+        # TeamSpeak: real ServerQuery client against the stand-in, as the startup scan does
+        teamspeak_cache.clear()
+        port = await teamspeak.start()
+        settings.API_TEAMSPEAK_URL = f"serverquery://127.0.0.1:{port}/?server_port=9987"
+        settings.TEAMSPEAK_PUSH = False
+        ts_service._client = None
+        await ts_service.scan_and_cache()
+
+        yield dataset, engine
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        await ts_service.close_client()
+        await dcsbot_service.close_client()
+        await teamspeak.stop()
+        await engine.dispose()
+        dcsbot_service._client, ts_service._client = saved_dcsbot_client, saved_ts_client
+        for name, value in saved.items():
+            setattr(settings, name, value)
+        dcsbot_cache.clear()
+        teamspeak_cache.clear()
+        for cache in (menu_cache, page_cache, calendar_cache):
+            cache.clear()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    """p50/p95/p99 (and mean/max) in milliseconds."""
+    ms = sorted(v * 1000 for v in values)
+    if len(ms) == 1:
+        cuts = ms * 99
+    else:
+        cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "mean": round(statistics.fmean(ms), 3),
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+        "max": round(ms[-1], 3),
+    }
+
+
+async def measure(client: httpx.AsyncClient, endpoint: Endpoint, dataset: Dataset, options: Options) -> dict:
+    for i in range(options.warmup):
+        await client.get(endpoint.url(dataset, i))
+
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    counter = itertools.count()
+
+    def record(profile: RequestProfile) -> None:
+        statements.append(profile.queries)
+
+    async def worker() -> None:
+        nonlocal errors
+        while (i := next(counter)) < options.requests:
+            url = endpoint.url(dataset, i)
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    profile_listeners.append(record)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options.concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        profile_listeners.remove(record)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": _percentiles(latencies),
+        "sql_statements": round(statistics.fmean(statements), 1) if statements else 0,
+    }
+
+
+async def explain(
+    client: httpx.AsyncClient, engine: AsyncEngine, endpoint: Endpoint, dataset: Dataset
+) -> list[dict]:
+    """Query plans of the SELECT statements run by one request to `endpoint`.
+
+    Run before the endpoint is warmed up, so cached responses do not hide their queries.
+    """
+    captured: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await client.get(endpoint.url(dataset, 0))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            rows = await conn.exec_driver_sql(prefix + statement, parameters)
+            plans.append(
+                {
+                    "statement": " ".join(statement.split())[:200],
+                    "plan": [str(row[-1]) for row in rows],  # SQLite: (id, parent, notused, detail)
+                }
+            )
+    return plans
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(options: Options) -> dict:
+    endpoints = [e for e in ENDPOINTS if options.endpoints is None or options.endpoints in e.name]
+    results = {}
+    async with environment(options) as (dataset, engine):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint in endpoints:
+                plans = await explain(client, engine, endpoint, dataset) if options.explain else None
+                results[endpoint.name] = await measure(client, endpoint, dataset, options)
+                logger.info("%s: %s", endpoint.name, results[endpoint.name])
+                if plans is not None:
+                    results[endpoint.name]["plans"] = plans
+                    for plan in plans:
+                        logger.info("  %s\n    %s", plan["statement"], "\n    ".join(plan["plan"]))
+        dialect = "sqlite" if options.database_url is None else options.database_url.split(":", 1)[0]
+    return {
+        "meta": {
+            "commit": _commit(),
+            "measured_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": dialect,
+            "dataset": dataset.size.as_dict(),
+            "options": {f.name: getattr(options, f.name) for f in fields(options) if f.name != "database_url"},
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print p95 changes against `baseline`; return the endpoints that regressed."""
+    regressions = []
+    print(f"{'endpoint':<32} {'p95 base':>10} {'p95 now':>10} {'change':>8} {'rps now':>9}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        old, new = before["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        change = (new - old) / old if old else 0.0
+        flag = " !" if change > threshold else ""
+        print(f"{name:<32} {old:>10.2f} {new:>10.2f} {change:>+8.0%} {result['throughput_rps']:>9.1f}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    defaults = Options()
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmark", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmark.json", help="JSON results file (default: %(default)s)")
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Tolerated p95 growth (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=defaults.requests, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=defaults.warmup, help="Unmeasured requests per endpoint")
+    parser.add_argument("--scale", type=float, default=defaults.scale, help="Dataset size factor")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Dataset random seed")
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--endpoints", help="Only endpoints whose name contains this")
+    parser.add_argument("--explain", action="store_true", help="Record the query plans of each endpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # One line per request otherwise
+
+    options = Options(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        scale=args.scale,
+        seed=args.seed,
+        database_url=args.database_url,
+        endpoints=args.endpoints,
+        explain=args.explain,
+    )
+    report = asyncio.run(run_benchmark(options))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info("Results written to %s", args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
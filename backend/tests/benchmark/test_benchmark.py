@@ -0,0 +1,40 @@
+"""Smoke test of the benchmark suite: a tiny run must complete without errors."""
+
+from tests.benchmark.runner import ENDPOINTS, Options, compare, run_benchmark
+
+
+def _report(p95_by_endpoint: dict[str, float]) -> dict:
+    return {
+        "results": {
+            name: {"latency_ms": {"p95": p95}, "throughput_rps": 100.0} for name, p95 in p95_by_endpoint.items()
+        }
+    }
+
+
+class TestBenchmark:
+    async def test_tiny_run_covers_every_endpoint(self):
+        # GIVEN
+        options = Options(requests=3, concurrency=2, warmup=1, scale=0.01, upstream_latency=0)
+
+        # WHEN
+        report = await run_benchmark(options)
+
+        # THEN
+        assert list(report["results"]) == [e.name for e in ENDPOINTS]
+        for name, result in report["results"].items():
+            assert result["errors"] == 0, name
+            assert result["requests"] == 3
+            assert set(result["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+        assert report["meta"]["dataset"]["users"] == 30
+
+    def test_compare_reports_p95_regressions(self, capsys):
+        # GIVEN
+        baseline = _report({"/api/menu": 10.0, "/api/header": 10.0, "/api/removed": 5.0})
+        current = _report({"/api/menu": 12.0, "/api/header": 10.5, "/api/new": 50.0})
+
+        # WHEN
+        regressions = compare(current, baseline, threshold=0.15)
+
+        # THEN
+        assert regressions == ["/api/menu"]
+        assert "/api/new" not in capsys.readouterr().out
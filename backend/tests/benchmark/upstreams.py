@@ -0,0 +1,102 @@
+"""Stand-ins for the upstream services, so benchmarks never depend on the real ones.
+
+- `DcsBotStandIn`: ASGI app answering the DCSServerBot `/serverapi/*` routes used by
+  the site, plugged into the shared httpx client through `httpx.ASGITransport`.
+- `TeamSpeakStandIn`: TCP ServerQuery server answering `use`, `clientlist`,
+  `channellist` and `version`, reached by the real `TS3Client`.
+
+Both answer after `latency` seconds to model a remote service.
+"""
+
+import asyncio
+import json
+
+SERVERS = ["VEAF Training", "VEAF Mission", "VEAF Opex"]
+
+
+class DcsBotStandIn:
+    def __init__(self, players_per_server: int = 12, latency: float = 0.005):
+        self.latency = latency
+        self.requests = 0
+        self._servers = [
+            {
+                "name": name,
+                "status": "Running",
+                "mission": {"name": f"{name} mission"},
+                "players": [{"nick": f"Player{i}", "side": "blue"} for i in range(players_per_server)],
+            }
+            for name in SERVERS
+        ]
+
+    def _body(self, path: str, query: str) -> object | None:
+        if path == "/serverapi/servers":
+            if query.startswith("server_name="):
+                return self._servers[:1]
+            return self._servers
+        if path == "/serverapi/serverstats":
+            return {"totalPlayers": 1200, "totalSorties": 45000, "totalKills": 98000}
+        if path == "/serverapi/server_attendance":
+            return {"unique_players_24h": 40, "unique_players_7d": 160, "unique_players_30d": 410}
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        body = self._body(scope["path"], scope["query_string"].decode())
+        status = 200 if body is not None else 404
+        payload = json.dumps(body).encode()
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+
+class TeamSpeakStandIn:
+    def __init__(self, clients: int = 40, channels: int = 25, latency: float = 0.005):
+        self.latency = latency
+        self.commands = 0
+        self._server: asyncio.Server | None = None
+        self._sessions: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        channel_items = [
+            f"cid={cid} pid={0 if cid <= 5 else 1 + cid % 5} channel_name=Channel\\s{cid}"
+            for cid in range(1, channels + 1)
+        ]
+        client_items = [
+            f"clid={clid} cid={1 + clid % channels} client_nickname=Pilot{clid} client_type=0"
+            for clid in range(1, clients + 1)
+        ]
+        self._responses = {
+            "clientlist": ("|".join(client_items) + "\n\r").encode(),
+            "channellist": ("|".join(channel_items) + "\n\r").encode(),
+        }
+
+    async def start(self) -> int:
+        """Listen on a free local port and return it."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Let open sessions see the disconnection and end (cancelling them logs errors)
+        for writer in self._sessions.values():
+            writer.close()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._sessions[task] = writer
+        writer.write(b"TS3\n\rWelcome to the TeamSpeak 3 ServerQuery interface.\n\r")
+        try:
+            while line := await reader.readuntil(b"\n\r"):
+                self.commands += 1
+                await asyncio.sleep(self.latency)
+                command = line.decode().strip()
+                writer.write(self._responses.get(command, b"") + b"error id=0 msg=ok\n\r")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._sessions.pop(task, None)
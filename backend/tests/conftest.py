@@ -9,9 +9,12 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from app.config import settings
 from app.database import Base, get_db
 from app.main import app
+from app.utils.cache import calendar_cache, menu_cache, page_cache
+from app.utils.metrics import instrument_engine
 
 # In-memory SQLite — schema created once per session for speed
 _engine = create_async_engine("sqlite+aiosqlite://", echo=False)
+instrument_engine(_engine)
 
 
 @pytest.fixture(scope="session")
@@ -60,6 +63,17 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def clear_read_caches():
+    """Read models are cached until the app writes to them; tests write to the DB directly."""
+    caches = (menu_cache, page_cache, calendar_cache)
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def tmp_upload_dir(tmp_path):
     original = settings.UPLOAD_DIR
@@ -561,3 +561,62 @@ async def test_reorder_moves_to_different_parent(client: AsyncClient, db_session
     assert data[0]["label"] == "Parent"
     assert len(data[0]["items"]) == 1
     assert data[0]["items"][0]["label"] == "Child"
+
+
+@pytest.mark.asyncio
+async def test_tree_any_depth(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    _, headers = await _create_admin(db_session)
+    root = await _create_menu_item(db_session, label="Root", type=MenuItem.TYPE_MENU, link=None)
+    middle = await _create_menu_item(db_session, label="Middle", type=MenuItem.TYPE_MENU, link=None, menu_id=root.id)
+    deep = await _create_menu_item(db_session, label="Deep", type=MenuItem.TYPE_MENU, link=None, menu_id=middle.id)
+    await _create_menu_item(db_session, label="Leaf", menu_id=deep.id)
+    db_session.expunge_all()
+
+    # WHEN
+    response = await client.get("/api/admin/menu/tree", headers=headers)
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data[0]["items"][0]["items"][0]["items"][0]["label"] == "Leaf"
+
+
+@pytest.mark.asyncio
+async def test_update_prevents_moving_under_descendant(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    _, headers = await _create_admin(db_session)
+    root = await _create_menu_item(db_session, type=MenuItem.TYPE_MENU, link=None)
+    child = await _create_menu_item(db_session, type=MenuItem.TYPE_MENU, link=None, menu_id=root.id)
+    grandchild = await _create_menu_item(db_session, type=MenuItem.TYPE_MENU, link=None, menu_id=child.id)
+
+    # WHEN
+    response = await client.put(
+        f"/api/admin/menu/{root.id}",
+        json={"label": "Root", "type": MenuItem.TYPE_MENU, "enabled": True, "position": 1, "restriction": 0, "menu_id": grandchild.id},
+        headers=headers,
+    )
+
+    # THEN
+    assert response.status_code == 400
+    assert "sous-menus" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_reorder_prevents_cycle(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    _, headers = await _create_admin(db_session)
+    first = await _create_menu_item(db_session, type=MenuItem.TYPE_MENU, link=None)
+    second = await _create_menu_item(db_session, type=MenuItem.TYPE_MENU, link=None, menu_id=first.id)
+
+    # WHEN
+    response = await client.put(
+        "/api/admin/menu/reorder",
+        json={"items": [{"id": first.id, "menu_id": second.id, "position": 1}]},
+        headers=headers,
+    )
+
+    # THEN
+    assert response.status_code == 400
+    await db_session.refresh(first)
+    assert first.menu_id is None
@@ -3,12 +3,14 @@
 from datetime import UTC, datetime, timedelta
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import false, select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.calendar import CalendarEvent
-from app.services.calendar import check_recurring_events, create_next_event
-from tests.factories import EventFactory, UserFactory
+from app.models.module import Module
+from app.services.calendar import check_recurring_events
+from tests.factories import EventFactory, ModuleFactory, UserFactory
 
 
 async def _create_user(db: AsyncSession):
@@ -27,8 +29,17 @@ async def _create_event(db: AsyncSession, owner_id: int, **kwargs) -> CalendarEv
     return event
 
 
+async def _occurrences(db: AsyncSession, title: str, original_id: int) -> list[CalendarEvent]:
+    result = await db.execute(
+        select(CalendarEvent)
+        .where(CalendarEvent.title == title, CalendarEvent.id != original_id)
+        .order_by(CalendarEvent.start_date)
+    )
+    return list(result.scalars().all())
+
+
 @pytest.mark.asyncio
-async def test_check_recurring_creates_weekly_event(db_session: AsyncSession):
+async def test_check_recurring_creates_weekly_events_up_to_horizon(db_session: AsyncSession):
     # GIVEN a weekly repeating event starting in 3 days
     user = await _create_user(db_session)
     now = datetime.now(UTC)
@@ -45,24 +56,108 @@ async def test_check_recurring_creates_weekly_event(db_session: AsyncSession):
     # WHEN
     count = await check_recurring_events(db_session)
 
-    # THEN one new event was created
-    assert count == 1
+    # THEN every occurrence within 32 days was stored in one pass (in 10, 17, 24 and 31 days)
+    assert count == 4
 
-    # AND the original event no longer repeats
+    # AND the original event still carries the series
     await db_session.refresh(event)
-    assert event.repeat_event == CalendarEvent.REPEAT_NONE
+    assert event.repeat_event == CalendarEvent.REPEAT_DAY_OF_WEEK
+
+    # AND the occurrences are single events keyed by their series and computed start
+    occurrences = await _occurrences(db_session, "Weekly Training", original_id)
+    assert [o.start_date.replace(tzinfo=UTC) - event.start_date.replace(tzinfo=UTC) for o in occurrences] == [
+        timedelta(weeks=1),
+        timedelta(weeks=2),
+        timedelta(weeks=3),
+        timedelta(weeks=4),
+    ]
+    assert all(o.repeat_event == CalendarEvent.REPEAT_NONE for o in occurrences)
+    assert all(o.series_id == original_id and o.occurrence_start == o.start_date for o in occurrences)
+    assert all(o.debrief is None and o.owner_id == user.id for o in occurrences)
+
+
+@pytest.mark.asyncio
+async def test_check_recurring_skips_past_occurrences(db_session: AsyncSession):
+    # GIVEN a weekly repeating event whose series started a year ago
+    user = await _create_user(db_session)
+    now = datetime.now(UTC)
+    event = await _create_event(
+        db_session,
+        owner_id=user.id,
+        title="Old Series",
+        start_date=now - timedelta(weeks=52, days=2),
+        end_date=now - timedelta(weeks=52, days=2) + timedelta(hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+
+    # WHEN
+    count = await check_recurring_events(db_session)
+
+    # THEN only the occurrences in 5, 12, 19 and 26 days were stored, not the past year
+    assert count == 4
+    occurrences = await _occurrences(db_session, "Old Series", event.id)
+    assert all(o.start_date.replace(tzinfo=UTC) > now for o in occurrences)
+    assert all(o.series_id == event.id for o in occurrences)
+
+
+@pytest.mark.asyncio
+async def test_check_recurring_keeps_cancelled_occurrences(db_session: AsyncSession):
+    # GIVEN a weekly repeating event whose first occurrence was stored, then deleted
+    user = await _create_user(db_session)
+    now = datetime.now(UTC)
+    event = await _create_event(
+        db_session,
+        owner_id=user.id,
+        title="Cancelled",
+        start_date=now + timedelta(days=3),
+        end_date=now + timedelta(days=3, hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+    await check_recurring_events(db_session)
+    first = (await _occurrences(db_session, "Cancelled", event.id))[0]
+    first.deleted = True
+    await db_session.commit()
+
+    # WHEN
+    count = await check_recurring_events(db_session)
+
+    # THEN the cancelled occurrence is not stored again
+    assert count == 0
+    occurrences = await _occurrences(db_session, "Cancelled", event.id)
+    assert len(occurrences) == 4
+    assert [o.deleted for o in occurrences] == [True, False, False, False]
+
+
+@pytest.mark.asyncio
+async def test_check_recurring_copies_modules(db_session: AsyncSession):
+    # GIVEN a weekly repeating event with two modules
+    user = await _create_user(db_session)
+    modules = [ModuleFactory.build(type=Module.TYPE_AIRCRAFT) for _ in range(2)]
+    db_session.add_all(modules)
+    now = datetime.now(UTC)
+    event = EventFactory.build(
+        owner_id=user.id,
+        title="With Modules",
+        start_date=now + timedelta(days=20),
+        end_date=now + timedelta(days=20, hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+    event.modules = modules
+    db_session.add(event)
+    await db_session.commit()
 
-    # AND the new event exists with correct data
+    # WHEN
+    count = await check_recurring_events(db_session)
+
+    # THEN
+    assert count == 1
     result = await db_session.execute(
-        select(CalendarEvent).where(
-            CalendarEvent.id != original_id,
-            CalendarEvent.title == "Weekly Training",
-        )
+        select(CalendarEvent)
+        .where(CalendarEvent.title == "With Modules", CalendarEvent.id != event.id)
+        .options(selectinload(CalendarEvent.modules))
     )
-    new_event = result.scalar_one()
-    assert new_event.repeat_event == CalendarEvent.REPEAT_DAY_OF_WEEK
-    assert new_event.debrief is None
-    assert new_event.owner_id == user.id
+    occurrence = result.scalar_one()
+    assert sorted(m.id for m in occurrence.modules) == sorted(m.id for m in modules)
 
 
 @pytest.mark.asyncio
@@ -109,7 +204,7 @@ async def test_check_recurring_skips_deleted_events(db_session: AsyncSession):
 
 
 @pytest.mark.asyncio
-async def test_create_next_event_preserves_duration(db_session: AsyncSession):
+async def test_check_recurring_preserves_duration(db_session: AsyncSession):
     # GIVEN an event with a 3-hour duration
     user = await _create_user(db_session)
     now = datetime.now(UTC)
@@ -123,15 +218,16 @@ async def test_create_next_event_preserves_duration(db_session: AsyncSession):
     )
 
     # WHEN
-    new_event = await create_next_event(db_session, event)
+    await check_recurring_events(db_session)
 
     # THEN
-    duration = new_event.end_date - new_event.start_date
-    assert duration == timedelta(hours=3)
+    occurrences = await _occurrences(db_session, "Duration Test", event.id)
+    assert occurrences
+    assert all(o.end_date - o.start_date == timedelta(hours=3) for o in occurrences)
 
 
 @pytest.mark.asyncio
-async def test_create_next_event_clears_debrief(db_session: AsyncSession):
+async def test_check_recurring_clears_debrief(db_session: AsyncSession):
     # GIVEN an event with a debrief
     user = await _create_user(db_session)
     now = datetime.now(UTC)
@@ -146,10 +242,12 @@ async def test_create_next_event_clears_debrief(db_session: AsyncSession):
     )
 
     # WHEN
-    new_event = await create_next_event(db_session, event)
+    await check_recurring_events(db_session)
 
     # THEN
-    assert new_event.debrief is None
+    occurrences = await _occurrences(db_session, "With Debrief", event.id)
+    assert occurrences
+    assert all(o.debrief is None for o in occurrences)
 
 
 @pytest.mark.asyncio
@@ -170,14 +268,53 @@ async def test_check_recurring_does_not_duplicate(db_session: AsyncSession):
     count1 = await check_recurring_events(db_session)
     count2 = await check_recurring_events(db_session)
 
-    # THEN first run creates 1, second run creates 1 (the new event also repeats,
-    # but the original no longer does — so still 1 total new event per run from the chain)
-    assert count1 == 1
-    assert count2 == 1
+    # THEN the first run reaches the horizon, leaving nothing to the second one
+    assert count1 == 4
+    assert count2 == 0
 
-    # AND total events should be 3 (original + 2 new)
+    # AND total events should be 5 (original + 4 new)
     result = await db_session.execute(
         select(CalendarEvent).where(CalendarEvent.title == "No Duplicate")
     )
     all_events = result.scalars().all()
-    assert len(all_events) == 3
+    assert len(all_events) == 5
+
+
+@pytest.mark.asyncio
+async def test_check_recurring_skips_occurrences_stored_meanwhile(db_session: AsyncSession, monkeypatch):
+    # GIVEN a series already stored, which the lookup misses as if another run stored it meanwhile
+    user = await _create_user(db_session)
+    now = datetime.now(UTC)
+    stored = await _create_event(
+        db_session,
+        owner_id=user.id,
+        title="Stored Meanwhile",
+        start_date=now + timedelta(days=3),
+        end_date=now + timedelta(days=3, hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+    await check_recurring_events(db_session)
+    other = await _create_event(
+        db_session,
+        owner_id=user.id,
+        title="Other Series",
+        start_date=now + timedelta(days=4),
+        end_date=now + timedelta(days=4, hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+    execute = db_session.execute
+
+    async def execute_missing_stored(statement, *args, **kwargs):
+        if getattr(statement, "is_select", False) and len(statement.selected_columns) == 2:
+            statement = statement.where(false())  # The (series_id, occurrence_start) lookup
+        return await execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", execute_missing_stored)
+
+    # WHEN
+    count = await check_recurring_events(db_session)
+
+    # THEN the conflicting occurrences are skipped, the other series still gets its own
+    assert count == 4
+    assert len(await _occurrences(db_session, "Stored Meanwhile", stored.id)) == 4
+    assert len(await _occurrences(db_session, "Other Series", other.id)) == 4
@@ -1,13 +1,17 @@
 """Integration tests for public calendar events endpoint."""
 
-from datetime import datetime
+from datetime import UTC, datetime
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.calendar import CalendarEvent
-from tests.factories import EventFactory, UserFactory
+from app.auth.jwt import create_access_token
+from app.models.calendar import CalendarEvent, Flight, Slot, Vote
+from app.models.module import Module
+from tests.factories import EventFactory, ModuleFactory, UserFactory
 
 
 async def _create_user(db: AsyncSession):
@@ -159,3 +163,162 @@ async def test_list_events_invalid_date_returns_422(client: AsyncClient):
 
     # THEN
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(3)
+async def test_list_events_aggregates(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    owner = await _create_user(db_session)
+    voters = [await _create_user(db_session) for _ in range(4)]
+    aircraft = ModuleFactory.build(type=Module.TYPE_AIRCRAFT)
+    db_session.add(aircraft)
+    event = await _create_event(
+        db_session, owner_id=owner.id, start_date=datetime(2026, 2, 10, 20, 0), end_date=datetime(2026, 2, 10, 23, 0)
+    )
+    await _create_event(
+        db_session, owner_id=owner.id, title="Empty",
+        start_date=datetime(2026, 2, 11, 20, 0), end_date=datetime(2026, 2, 11, 23, 0),
+    )
+    for voter, vote in zip(voters, [True, True, False, None]):
+        db_session.add(Vote(event_id=event.id, user_id=voter.id, vote=vote))
+    flight = Flight(event_id=event.id, name="Viper", nb_slots=4, aircraft_id=aircraft.id)
+    db_session.add(flight)
+    await db_session.flush()
+    db_session.add_all([Slot(flight_id=flight.id, user_id=voters[0].id), Slot(flight_id=flight.id, username="Guest"), Slot(flight_id=flight.id)])
+    await db_session.commit()
+
+    # WHEN
+    response = await client.get("/api/calendar/events?from_date=2026-02-01&to_date=2026-02-28")
+
+    # THEN
+    assert response.status_code == 200
+    first, empty = response.json()
+    assert first["owner_nickname"] == owner.nickname
+    assert (first["votes_yes"], first["votes_no"], first["votes_maybe"]) == (2, 1, 1)
+    assert (first["slots_total"], first["slots_filled"], first["slots_fill_ratio"]) == (4, 2, 0.5)
+    assert (empty["votes_yes"], empty["slots_total"], empty["slots_fill_ratio"]) == (0, 0, None)
+
+
+@pytest.mark.asyncio
+async def test_list_events_spanning_months_listed_once(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    await _create_event(
+        db_session, owner_id=user.id, title="Night Op",
+        start_date=datetime(2026, 1, 31, 22, 0), end_date=datetime(2026, 2, 1, 2, 0),
+    )
+
+    # WHEN
+    response = await client.get("/api/calendar/events?from_date=2026-01-26&to_date=2026-03-09")
+
+    # THEN
+    assert [e["title"] for e in response.json()] == ["Night Op"]
+
+
+@pytest.mark.asyncio
+async def test_list_events_cached_per_month(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN — January is cached by a first request
+    user = await _create_user(db_session)
+    await _create_event(
+        db_session, owner_id=user.id, title="Jan Event",
+        start_date=datetime(2026, 1, 20, 20, 0), end_date=datetime(2026, 1, 20, 23, 0),
+    )
+    await client.get("/api/calendar/events?from_date=2026-01-01&to_date=2026-01-31")
+    await _create_event(
+        db_session, owner_id=user.id, title="Written behind the app's back",
+        start_date=datetime(2026, 1, 21, 20, 0), end_date=datetime(2026, 1, 21, 23, 0),
+    )
+    await _create_event(
+        db_session, owner_id=user.id, title="Feb Event",
+        start_date=datetime(2026, 2, 10, 20, 0), end_date=datetime(2026, 2, 10, 23, 0),
+    )
+
+    # WHEN
+    response = await client.get("/api/calendar/events?from_date=2026-01-15&to_date=2026-02-15")
+
+    # THEN — January from the cache, February queried
+    assert [e["title"] for e in response.json()] == ["Jan Event", "Feb Event"]
+
+
+@pytest.mark.asyncio
+async def test_list_events_invalidated_by_vote(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+    # Not refreshed: SQLite would return naive dates, which the vote permission can't compare
+    event = EventFactory.build(
+        owner_id=user.id, start_date=datetime(2030, 5, 10, 20, 0, tzinfo=UTC), end_date=datetime(2030, 5, 10, 23, 0, tzinfo=UTC)
+    )
+    db_session.add(event)
+    await db_session.commit()
+    before = await client.get("/api/calendar/events?from_date=2030-05-01&to_date=2030-05-31")
+
+    # WHEN
+    await client.post(f"/api/calendar/events/{event.id}/vote", headers=headers, json={"vote": True})
+    after = await client.get("/api/calendar/events?from_date=2030-05-01&to_date=2030-05-31")
+
+    # THEN
+    assert before.json()[0]["votes_yes"] == 0
+    assert after.json()[0]["votes_yes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_list_events_invalidated_by_move(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+    event = await _create_event(
+        db_session, owner_id=user.id, title="Moved",
+        start_date=datetime(2030, 5, 10, 20, 0), end_date=datetime(2030, 5, 10, 23, 0),
+    )
+    await client.get("/api/calendar/events?from_date=2030-05-01&to_date=2030-06-30")
+
+    # WHEN
+    await client.put(
+        f"/api/calendar/events/{event.id}",
+        headers=headers,
+        json={"title": "Moved", "start_date": "2030-06-10T20:00:00Z", "end_date": "2030-06-10T23:00:00Z", "type": 1},
+    )
+    may = await client.get("/api/calendar/events?from_date=2030-05-01&to_date=2030-05-31")
+    june = await client.get("/api/calendar/events?from_date=2030-06-01&to_date=2030-06-30")
+
+    # THEN
+    assert may.json() == []
+    assert [e["title"] for e in june.json()] == ["Moved"]
+
+
+@pytest.mark.asyncio
+async def test_vote_twice_keeps_one_vote(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+    event = EventFactory.build(
+        owner_id=user.id, start_date=datetime(2030, 5, 10, 20, 0, tzinfo=UTC), end_date=datetime(2030, 5, 10, 23, 0, tzinfo=UTC)
+    )
+    db_session.add(event)
+    await db_session.commit()
+
+    # WHEN
+    await client.post(f"/api/calendar/events/{event.id}/vote", headers=headers, json={"vote": True})
+    response = await client.post(f"/api/calendar/events/{event.id}/vote", headers=headers, json={"vote": False})
+
+    # THEN
+    assert response.status_code == 200
+    assert response.json()["vote"] is False
+    count = await db_session.scalar(select(func.count()).select_from(Vote).where(Vote.event_id == event.id))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_vote_unique_per_user_and_event(db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    event = await _create_event(db_session, owner_id=user.id)
+    db_session.add(Vote(event_id=event.id, user_id=user.id, vote=True))
+    await db_session.commit()
+
+    # WHEN / THEN
+    with pytest.raises(IntegrityError):
+        async with db_session.begin_nested():
+            db_session.add(Vote(event_id=event.id, user_id=user.id, vote=False))
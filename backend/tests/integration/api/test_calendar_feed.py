@@ -0,0 +1,239 @@
+"""Integration tests for the iCalendar feeds."""
+
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.jwt import create_access_token, create_calendar_feed_token
+from app.models.calendar import CalendarEvent, Vote
+from tests.factories import EventFactory, UserFactory
+
+
+async def _create_user(db: AsyncSession, **kwargs):
+    user = UserFactory.build(**kwargs)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def _create_event(db: AsyncSession, owner_id: int, **kwargs) -> CalendarEvent:
+    event = EventFactory.build(
+        owner_id=owner_id,
+        start_date=kwargs.pop("start_date", datetime(2026, 3, 14, 20, 0)),
+        end_date=kwargs.pop("end_date", datetime(2026, 3, 14, 23, 0)),
+        updated_at=kwargs.pop("updated_at", datetime(2026, 3, 1, 12, 0)),
+        **kwargs,
+    )
+    db.add(event)
+    await db.commit()
+    await db.refresh(event)
+    return event
+
+
+def _unfold(body: str) -> list[str]:
+    return body.replace("\r\n ", "").split("\r\n")
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(3)
+async def test_feed_lists_events(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    event = await _create_event(db_session, owner_id=user.id, title="Opex Syrie, phase 2", type=CalendarEvent.EVENT_TYPE_OPEX)
+    await _create_event(db_session, owner_id=user.id, title="Supprimé", deleted=True)
+
+    # WHEN
+    response = await client.get("/api/calendar/feed.ics")
+
+    # THEN
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/calendar; charset=utf-8"
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 12:00:00 GMT"
+    lines = _unfold(response.text)
+    assert lines[0] == "BEGIN:VCALENDAR"
+    assert lines[-2:] == ["END:VCALENDAR", ""]
+    assert lines.count("BEGIN:VEVENT") == 1
+    assert f"UID:event-{event.id}@localhost" in lines
+    assert "SUMMARY:Opex Syrie\\, phase 2" in lines
+    assert "DTSTART:20260314T200000Z" in lines
+    assert "DTEND:20260314T230000Z" in lines
+    assert "CATEGORIES:OPEX" in lines
+
+
+@pytest.mark.asyncio
+async def test_feed_folds_long_lines(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    description = "Briefing à 20h45 sur le TeamSpeak.\nDécollage à 21h. " * 10
+    await _create_event(db_session, owner_id=user.id, description=description)
+
+    # WHEN
+    response = await client.get("/api/calendar/feed.ics")
+
+    # THEN
+    raw_lines = response.content.split(b"\r\n")
+    assert max(len(line) for line in raw_lines) <= 75
+    assert "DESCRIPTION:" + description.replace("\n", "\\n") in _unfold(response.text)
+
+
+@pytest.mark.asyncio
+async def test_feed_not_modified(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    await _create_event(db_session, owner_id=user.id)
+    first = await client.get("/api/calendar/feed.ics")
+
+    # WHEN
+    by_etag = await client.get("/api/calendar/feed.ics", headers={"If-None-Match": first.headers["etag"]})
+    by_date = await client.get("/api/calendar/feed.ics", headers={"If-Modified-Since": first.headers["last-modified"]})
+
+    # THEN
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_date.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_feed_changes_when_event_deleted(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+    event = await _create_event(db_session, owner_id=user.id)
+    first = await client.get("/api/calendar/feed.ics")
+
+    # WHEN
+    await client.delete(f"/api/calendar/events/{event.id}", headers=headers)
+    response = await client.get("/api/calendar/feed.ics", headers={"If-None-Match": first.headers["etag"]})
+
+    # THEN
+    assert response.status_code == 200
+    assert "BEGIN:VEVENT" not in response.text
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(4)
+async def test_feed_lists_occurrences(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN a weekly event which started yesterday
+    user = await _create_user(db_session)
+    start = datetime.now(UTC).replace(microsecond=0) - timedelta(days=1)
+    series = await _create_event(
+        db_session,
+        owner_id=user.id,
+        title="Hebdo",
+        start_date=start,
+        end_date=start + timedelta(hours=2),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+    )
+
+    # WHEN
+    response = await client.get("/api/calendar/feed.ics")
+
+    # THEN the series and its computed occurrences (in 6, 13, 20 and 27 days)
+    lines = _unfold(response.text)
+    assert lines.count("SUMMARY:Hebdo") == 5
+    first = (start + timedelta(weeks=1)).strftime("%Y%m%dT%H%M%SZ")
+    assert f"UID:event-{series.id}-{first}@localhost" in lines
+    assert f"DTSTART:{first}" in lines
+    occurrence = f"{start + timedelta(weeks=1):%Y-%m-%dT%H:%M:%SZ}"
+    assert f"URL:http://localhost/calendar/{series.id}?occurrence={occurrence}" in lines
+    # The window of computed occurrences moves daily
+    assert response.headers["last-modified"] == format_datetime(
+        datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0), usegmt=True
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(3)
+async def test_user_feed_lists_attended_events(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    other = await _create_user(db_session)
+    yes = await _create_event(db_session, owner_id=other.id, title="Oui")
+    maybe = await _create_event(db_session, owner_id=other.id, title="Peut-être")
+    no = await _create_event(db_session, owner_id=other.id, title="Non")
+    await _create_event(db_session, owner_id=other.id, title="Sans vote")
+    db_session.add_all(
+        [
+            Vote(event_id=yes.id, user_id=user.id, vote=True),
+            Vote(event_id=maybe.id, user_id=user.id, vote=None),
+            Vote(event_id=no.id, user_id=user.id, vote=False),
+        ]
+    )
+    await db_session.commit()
+
+    # WHEN
+    response = await client.get("/api/calendar/feed.ics", params={"token": create_calendar_feed_token(user.id)})
+
+    # THEN
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, no-cache"
+    body = response.text
+    assert "SUMMARY:Oui" in body
+    assert "SUMMARY:Peut-être" in body
+    assert "SUMMARY:Non" not in body
+    assert "SUMMARY:Sans vote" not in body
+    assert "STATUS:TENTATIVE" in body
+
+
+@pytest.mark.asyncio
+async def test_user_feed_changes_with_vote(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+    event = EventFactory.build(
+        owner_id=user.id, start_date=datetime(2030, 5, 10, 20, 0, tzinfo=UTC), end_date=datetime(2030, 5, 10, 23, 0, tzinfo=UTC)
+    )
+    db_session.add(event)
+    await db_session.commit()
+    params = {"token": create_calendar_feed_token(user.id)}
+    first = await client.get("/api/calendar/feed.ics", params=params)
+
+    # WHEN
+    await client.post(f"/api/calendar/events/{event.id}/vote", headers=headers, json={"vote": True})
+    response = await client.get("/api/calendar/feed.ics", params=params, headers={"If-None-Match": first.headers["etag"]})
+
+    # THEN
+    assert "BEGIN:VEVENT" not in first.text
+    assert response.status_code == 200
+    assert f"UID:event-{event.id}@localhost" in response.text
+
+
+@pytest.mark.asyncio
+async def test_user_feed_invalid_token(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    disabled = await _create_user(db_session, disabled=True)
+
+    # WHEN
+    access_token = await client.get(
+        "/api/calendar/feed.ics", params={"token": create_access_token(user.id, user.get_roles_list())}
+    )
+    garbage = await client.get("/api/calendar/feed.ics", params={"token": "garbage"})
+    disabled_user = await client.get("/api/calendar/feed.ics", params={"token": create_calendar_feed_token(disabled.id)})
+
+    # THEN
+    assert access_token.status_code == 401
+    assert garbage.status_code == 401
+    assert disabled_user.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_feed_token(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    headers = {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+
+    # WHEN
+    response = await client.get("/api/calendar/feed-token", headers=headers)
+    anonymous = await client.get("/api/calendar/feed-token")
+
+    # THEN
+    assert response.status_code == 200
+    assert response.json()["url"] == (
+        f"http://localhost/api/calendar/feed.ics?token={create_calendar_feed_token(user.id)}"
+    )
+    assert anonymous.status_code == 401
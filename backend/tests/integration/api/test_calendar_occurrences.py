@@ -0,0 +1,261 @@
+"""Integration tests for the occurrences of repeating events (computed, stored on demand)."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.jwt import create_access_token
+from app.models.calendar import CalendarEvent
+from tests.factories import EventFactory, UserFactory
+
+MAY_2030 = "/api/calendar/events?from_date=2030-05-01&to_date=2030-05-31"
+
+
+async def _create_user(db: AsyncSession):
+    user = UserFactory.build()
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def _create_series(db: AsyncSession, owner_id: int, **kwargs) -> CalendarEvent:
+    """Weekly event, Mondays of May 2030 from the 6th."""
+    event = EventFactory.build(
+        owner_id=owner_id,
+        title=kwargs.pop("title", "Weekly"),
+        start_date=kwargs.pop("start_date", datetime(2030, 5, 6, 20, 0, tzinfo=UTC)),
+        end_date=kwargs.pop("end_date", datetime(2030, 5, 6, 23, 0, tzinfo=UTC)),
+        repeat_event=CalendarEvent.REPEAT_DAY_OF_WEEK,
+        **kwargs,
+    )
+    db.add(event)
+    await db.commit()
+    await db.refresh(event)
+    return event
+
+
+def _headers(user) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user.id, user.get_roles_list())}"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(4)
+async def test_list_events_computes_occurrences(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+
+    # WHEN
+    response = await client.get(MAY_2030)
+
+    # THEN the series, then its occurrences of the month, none of them stored
+    assert response.status_code == 200
+    data = response.json()
+    assert [e["start_date"][:10] for e in data] == ["2030-05-06", "2030-05-13", "2030-05-20", "2030-05-27"]
+    assert all(e["id"] == series.id for e in data)
+    assert [e["virtual"] for e in data] == [False, True, True, True]
+    assert data[1]["series_id"] == series.id
+    assert data[1]["occurrence_start"] == data[1]["start_date"]
+    assert data[1]["end_date"][:16] == "2030-05-13T23:00"
+    assert data[1]["owner_nickname"] == user.nickname
+    assert (await db_session.scalar(select(CalendarEvent.id).where(CalendarEvent.series_id == series.id))) is None
+
+
+@pytest.mark.asyncio
+async def test_list_events_stored_occurrences_replace_computed(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN one occurrence moved, another cancelled
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+    moved = await client.post(
+        f"/api/calendar/events/{series.id}/occurrences",
+        headers=_headers(user),
+        json={"start_date": "2030-05-13T20:00:00Z"},
+    )
+    cancelled = await client.post(
+        f"/api/calendar/events/{series.id}/occurrences",
+        headers=_headers(user),
+        json={"start_date": "2030-05-20T20:00:00Z"},
+    )
+    await client.put(
+        f"/api/calendar/events/{moved.json()['id']}",
+        headers=_headers(user),
+        json={"title": "Weekly", "start_date": "2030-05-14T20:00:00Z", "end_date": "2030-05-14T23:00:00Z", "type": 1},
+    )
+    await client.delete(f"/api/calendar/events/{cancelled.json()['id']}", headers=_headers(user))
+
+    # WHEN
+    response = await client.get(MAY_2030)
+
+    # THEN
+    data = response.json()
+    assert [(e["start_date"][:10], e["virtual"]) for e in data] == [
+        ("2030-05-06", False),
+        ("2030-05-14", False),
+        ("2030-05-27", True),
+    ]
+    assert data[1]["id"] == moved.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_list_events_invalidated_by_series_edit(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN the month cached
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+    await client.get(MAY_2030)
+
+    # WHEN the series is renamed
+    await client.put(
+        f"/api/calendar/events/{series.id}",
+        headers=_headers(user),
+        json={
+            "title": "Renamed",
+            "start_date": "2030-05-06T20:00:00Z",
+            "end_date": "2030-05-06T23:00:00Z",
+            "type": 1,
+            "repeat_event": CalendarEvent.REPEAT_DAY_OF_WEEK,
+        },
+    )
+    response = await client.get(MAY_2030)
+
+    # THEN its occurrences follow
+    assert [e["title"] for e in response.json()] == ["Renamed"] * 4
+
+
+@pytest.mark.asyncio
+async def test_get_occurrence(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id, debrief="RAS")
+
+    # WHEN
+    response = await client.get(f"/api/calendar/events/{series.id}/occurrences/2030-05-20T20:00:00Z")
+    not_an_occurrence = await client.get(f"/api/calendar/events/{series.id}/occurrences/2030-05-21T20:00:00Z")
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == series.id
+    assert data["virtual"] is True
+    assert data["start_date"][:16] == "2030-05-20T20:00"
+    assert data["end_date"][:16] == "2030-05-20T23:00"
+    assert data["repeat_event"] == CalendarEvent.REPEAT_NONE
+    assert data["debrief"] is None
+    assert data["votes"] == []
+    assert not_an_occurrence.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_store_occurrence(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+    url = f"/api/calendar/events/{series.id}/occurrences"
+
+    # WHEN stored twice, then read back
+    first = await client.post(url, headers=_headers(user), json={"start_date": "2030-05-13T20:00:00Z"})
+    second = await client.post(url, headers=_headers(user), json={"start_date": "2030-05-13T20:00:00Z"})
+    read = await client.get(f"{url}/2030-05-13T20:00:00Z")
+
+    # THEN a single event, which the computed occurrence now resolves to
+    assert first.status_code == 200
+    data = first.json()
+    assert data["id"] != series.id
+    assert data["series_id"] == series.id
+    assert data["virtual"] is False
+    assert data["repeat_event"] == CalendarEvent.REPEAT_NONE
+    assert second.json()["id"] == data["id"]
+    assert read.json()["id"] == data["id"]
+    stored = await db_session.scalars(select(CalendarEvent).where(CalendarEvent.series_id == series.id))
+    assert len(stored.all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_store_occurrence_errors(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+    single = EventFactory.build(owner_id=user.id)
+    db_session.add(single)
+    await db_session.commit()
+
+    # WHEN
+    wrong_date = await client.post(
+        f"/api/calendar/events/{series.id}/occurrences",
+        headers=_headers(user),
+        json={"start_date": "2030-05-14T20:00:00Z"},
+    )
+    not_repeating = await client.post(
+        f"/api/calendar/events/{single.id}/occurrences",
+        headers=_headers(user),
+        json={"start_date": "2030-05-13T20:00:00Z"},
+    )
+    anonymous = await client.post(
+        f"/api/calendar/events/{series.id}/occurrences", json={"start_date": "2030-05-13T20:00:00Z"}
+    )
+
+    # THEN
+    assert wrong_date.status_code == 400
+    assert wrong_date.json()["detail"] == "Cette date ne correspond à aucune occurrence de l'événement"
+    assert not_repeating.status_code == 400
+    assert anonymous.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_header_lists_occurrences(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN a weekly event which started yesterday
+    user = await _create_user(db_session)
+    now = datetime.now(UTC)
+    series = await _create_series(
+        db_session,
+        owner_id=user.id,
+        start_date=now - timedelta(days=1),
+        end_date=now - timedelta(days=1) + timedelta(hours=2),
+    )
+
+    # WHEN
+    response = await client.get("/api/header")
+
+    # THEN its next occurrence counts as upcoming
+    assert response.status_code == 200
+    data = response.json()
+    assert data["next_events_count"] == 1
+    assert [e["id"] for e in data["next_events"]] == [series.id] * 3
+    assert data["next_events"][0]["occurrence_start"] == data["next_events"][0]["start_date"]
+
+
+@pytest.mark.asyncio
+async def test_moving_series_keeps_stored_occurrences(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN two stored occurrences, one of them cancelled
+    user = await _create_user(db_session)
+    series = await _create_series(db_session, owner_id=user.id)
+    url = f"/api/calendar/events/{series.id}/occurrences"
+    stored = await client.post(url, headers=_headers(user), json={"start_date": "2030-05-13T20:00:00Z"})
+    cancelled = await client.post(url, headers=_headers(user), json={"start_date": "2030-05-20T20:00:00Z"})
+    await client.delete(f"/api/calendar/events/{cancelled.json()['id']}", headers=_headers(user))
+
+    # WHEN the series is moved 30 minutes later
+    await client.put(
+        f"/api/calendar/events/{series.id}",
+        headers=_headers(user),
+        json={
+            "title": "Weekly",
+            "start_date": "2030-05-06T20:30:00Z",
+            "end_date": "2030-05-06T23:30:00Z",
+            "type": 1,
+            "repeat_event": CalendarEvent.REPEAT_DAY_OF_WEEK,
+        },
+    )
+    listed = await client.get(MAY_2030)
+    read = await client.get(f"{url}/2030-05-13T20:30:00Z")
+
+    # THEN the stored occurrences still stand for their week, at their own time
+    assert [(e["start_date"][:16], e["virtual"]) for e in listed.json()] == [
+        ("2030-05-06T20:30", False),
+        ("2030-05-13T20:00", False),
+        ("2030-05-27T20:30", True),
+    ]
+    assert read.json()["id"] == stored.json()["id"]
@@ -0,0 +1,193 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.api import dcsbot as dcsbot_api
+from app.config import settings
+from app.services import dcsbot as dcsbot_service
+from app.utils.cache import dcsbot_cache
+
+SERVER = [{"name": "VEAF Training", "status": "Running", "players": [], "password": "secret"}]
+
+
+@pytest.fixture(autouse=True)
+def clear_dcsbot_cache():
+    dcsbot_cache.clear()
+    yield
+    dcsbot_cache.clear()
+
+
+@pytest.fixture
+def on_demand():
+    """Disable the background poller: handlers fetch the upstream during the request."""
+    original = settings.DCSBOT_POLL_INTERVAL
+    settings.DCSBOT_POLL_INTERVAL = 0
+    yield
+    settings.DCSBOT_POLL_INTERVAL = original
+
+
+@pytest.mark.asyncio
+async def test_server_detail_fetches_upstream_concurrently(client: AsyncClient, on_demand):
+    # GIVEN — three upstream calls of 0.2s each
+    async def slow_server(name):
+        await asyncio.sleep(0.2)
+        return SERVER
+
+    async def slow_stats(name):
+        await asyncio.sleep(0.2)
+        return {"totalPlayers": 7}
+
+    async def slow_attendance(name):
+        await asyncio.sleep(0.2)
+        return {"unique_players_24h": 3}
+
+    # WHEN
+    with (
+        patch("app.api.dcsbot.dcsbot_service.get_server", side_effect=slow_server),
+        patch("app.api.dcsbot.dcsbot_service.get_server_stats_by_name", side_effect=slow_stats),
+        patch("app.api.dcsbot.dcsbot_service.get_server_attendance", side_effect=slow_attendance),
+    ):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await client.get("/api/dcsbot/servers/VEAF Training")
+        elapsed = loop.time() - started
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["server"]["name"] == "VEAF Training"
+    assert data["server"]["password"] is None
+    assert data["stats"]["total_players"] == 7
+    assert data["attendance"]["unique_players_24h"] == 3
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_server_detail_returns_partial_results_on_timeout(client: AsyncClient, on_demand):
+    # GIVEN — attendance never answers within the deadline
+    async def hang(name):
+        await asyncio.sleep(10)
+
+    # WHEN
+    with (
+        patch("app.api.dcsbot.UPSTREAM_DEADLINE", 0.1),
+        patch("app.api.dcsbot.dcsbot_service.get_server", AsyncMock(return_value=SERVER)),
+        patch("app.api.dcsbot.dcsbot_service.get_server_stats_by_name", AsyncMock(return_value={"totalPlayers": 7})),
+        patch("app.api.dcsbot.dcsbot_service.get_server_attendance", side_effect=hang),
+    ):
+        response = await client.get("/api/dcsbot/servers/VEAF Training")
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["stats"]["total_players"] == 7
+    assert data["attendance"] is None
+
+
+@pytest.mark.asyncio
+async def test_servers_answer_at_deadline_while_hung_load_fills_cache(client: AsyncClient, on_demand):
+    # GIVEN — the stats endpoint answers well after the deadline, within the client timeout
+    calls = []
+
+    async def upstream(path, params=None):
+        calls.append(path)
+        if path == "/serverapi/serverstats":
+            await asyncio.sleep(0.5)
+            return {"totalPlayers": 7}
+        return SERVER
+
+    with (
+        patch.object(dcsbot_api, "UPSTREAM_DEADLINE", 0.1),
+        patch("app.services.dcsbot._get_json", side_effect=upstream),
+    ):
+        # WHEN
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await client.get("/api/dcsbot/servers")
+        elapsed = loop.time() - started
+
+        # THEN — partial page at the deadline
+        assert response.status_code == 200
+        data = response.json()
+        assert data["servers"][0]["name"] == "VEAF Training"
+        assert data["stats"] is None
+        assert elapsed < 0.3
+
+        # THEN — the abandoned load still completes into the cache
+        await asyncio.sleep(0.6)
+        assert await dcsbot_service.get_server_stats() == {"totalPlayers": 7}
+        assert calls.count("/serverapi/serverstats") == 1
+
+
+@pytest.mark.asyncio
+async def test_server_detail_not_found(client: AsyncClient, on_demand):
+    # GIVEN — upstream knows no such server
+
+    # WHEN
+    with (
+        patch("app.api.dcsbot.dcsbot_service.get_server", AsyncMock(return_value=[])),
+        patch("app.api.dcsbot.dcsbot_service.get_server_stats_by_name", AsyncMock(return_value=None)),
+        patch("app.api.dcsbot.dcsbot_service.get_server_attendance", AsyncMock(return_value=None)),
+    ):
+        response = await client.get("/api/dcsbot/servers/unknown")
+
+    # THEN
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_servers_read_from_snapshot_without_upstream_calls(client: AsyncClient):
+    # GIVEN — snapshot built by the poller
+    dcsbot_cache["snapshot"] = {
+        "servers": [{"name": "VEAF Training", "status": "Running", "players": [{"nick": "Pilot1"}]}],
+        "stats": {"totalPlayers": 42},
+        "by_name": {},
+    }
+
+    # WHEN
+    with patch("app.api.dcsbot.dcsbot_service.get_servers", AsyncMock(side_effect=AssertionError)):
+        response = await client.get("/api/dcsbot/servers")
+        header = await client.get("/api/header")
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["servers"][0]["num_players"] == 1
+    assert data["stats"]["total_players"] == 42
+    assert header.json()["connected_players"] == 1
+
+
+@pytest.mark.asyncio
+async def test_server_detail_reads_from_snapshot(client: AsyncClient):
+    # GIVEN
+    dcsbot_cache["snapshot"] = {
+        "servers": SERVER,
+        "stats": None,
+        "by_name": {
+            "VEAF Training": {"server": SERVER[0], "stats": {"totalPlayers": 7}, "attendance": None},
+        },
+    }
+
+    # WHEN
+    response = await client.get("/api/dcsbot/servers/VEAF Training")
+    missing = await client.get("/api/dcsbot/servers/unknown")
+
+    # THEN
+    assert response.status_code == 200
+    assert response.json()["stats"]["total_players"] == 7
+    assert response.json()["attendance"] is None
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_servers_empty_before_first_poll(client: AsyncClient):
+    # GIVEN — no snapshot yet
+
+    # WHEN
+    response = await client.get("/api/dcsbot/servers")
+
+    # THEN
+    assert response.status_code == 200
+    assert response.json() == {"servers": [], "stats": None}
@@ -0,0 +1,121 @@
+"""Integration tests for the DCSServerBot samples time-series."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dcs import DcsServerSample
+from app.services.dcsbot_history import DAY_RETENTION, record_samples, rollup_samples
+
+NOW = datetime(2026, 10, 17, 12, 0, 30, tzinfo=UTC)
+
+
+def _snapshot(players: int, unique_24h: int = 10) -> dict:
+    return {
+        "by_name": {
+            "VEAF Training": {
+                "server": {"name": "VEAF Training", "players": [{"nick": f"P{i}"} for i in range(players)]},
+                "stats": None,
+                "attendance": {"unique_players_24h": unique_24h, "total_sorties": 100},
+            },
+        },
+    }
+
+
+async def _rows(db: AsyncSession, resolution: int) -> list[DcsServerSample]:
+    result = await db.execute(
+        select(DcsServerSample).where(DcsServerSample.resolution == resolution).order_by(DcsServerSample.bucket_at)
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_record_samples_merges_polls_within_same_minute(db_session: AsyncSession):
+    # GIVEN two polls in the same minute
+    await record_samples(db_session, _snapshot(players=2, unique_24h=10), NOW)
+    await record_samples(db_session, _snapshot(players=4, unique_24h=11), NOW + timedelta(seconds=20))
+    await db_session.commit()
+
+    # WHEN
+    rows = await _rows(db_session, DcsServerSample.RESOLUTION_MINUTE)
+
+    # THEN
+    assert len(rows) == 1
+    assert rows[0].samples == 2
+    assert rows[0].players_avg == 3.0
+    assert rows[0].players_max == 4
+    assert rows[0].unique_players_24h == 11
+
+
+@pytest.mark.asyncio
+async def test_rollup_moves_old_minutes_to_hours_and_days(db_session: AsyncSession):
+    # GIVEN minute samples 3 days ago (two in the same hour) and one recent
+    old = NOW - timedelta(days=3)
+    await record_samples(db_session, _snapshot(players=2), old)
+    await record_samples(db_session, _snapshot(players=6), old + timedelta(minutes=5))
+    await record_samples(db_session, _snapshot(players=1), NOW)
+    await db_session.commit()
+
+    # WHEN
+    rolled = await rollup_samples(db_session, NOW)
+    await db_session.commit()
+
+    # THEN
+    assert rolled == 2
+    minutes = await _rows(db_session, DcsServerSample.RESOLUTION_MINUTE)
+    hours = await _rows(db_session, DcsServerSample.RESOLUTION_HOUR)
+    assert len(minutes) == 1
+    assert len(hours) == 1
+    assert hours[0].samples == 2
+    assert hours[0].players_avg == 4.0
+    assert hours[0].players_max == 6
+
+    # WHEN hours age past their retention
+    rolled = await rollup_samples(db_session, NOW + timedelta(days=120))
+    await db_session.commit()
+
+    # THEN
+    days = await _rows(db_session, DcsServerSample.RESOLUTION_DAY)
+    assert len(days) == 2
+    assert days[0].players_max == 6
+    assert await _rows(db_session, DcsServerSample.RESOLUTION_HOUR) == []
+
+    # WHEN days age past their retention
+    await rollup_samples(db_session, NOW + timedelta(days=120) + DAY_RETENTION)
+    await db_session.commit()
+
+    # THEN
+    assert await _rows(db_session, DcsServerSample.RESOLUTION_DAY) == []
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_returns_range(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    now = datetime.now(UTC)
+    await record_samples(db_session, _snapshot(players=3), now - timedelta(minutes=10))
+    await record_samples(db_session, _snapshot(players=5), now - timedelta(minutes=5))
+    await db_session.commit()
+
+    # WHEN
+    response = await client.get("/api/dcsbot/servers/VEAF Training/history")
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["resolution"] == DcsServerSample.RESOLUTION_MINUTE
+    assert [s["players_max"] for s in data["samples"]] == [3, 5]
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_rejects_inverted_range(client: AsyncClient):
+    # GIVEN
+    params = {"start": "2026-10-17T12:00:00Z", "end": "2026-10-17T10:00:00Z"}
+
+    # WHEN
+    response = await client.get("/api/dcsbot/servers/VEAF Training/history", params=params)
+
+    # THEN
+    assert response.status_code == 400
@@ -1,33 +1,33 @@
+import json
 from unittest.mock import patch
 
 import pytest
 from httpx import AsyncClient
 
-from app.utils.cache import discord_voice_cache
+from app.api import discord_voice as dv_api
+from app.services.discord_voice import voice_events, voice_index
+from app.utils.broadcast import RESYNC
+
+
+def _state(channel_id: int, nickname: str) -> dict:
+    return {"channel_id": channel_id, "nickname": nickname, "bot": False}
 
 
 @pytest.fixture(autouse=True)
-def clear_discord_voice_cache():
-    discord_voice_cache.clear()
+def clear_voice_index():
+    voice_index.clear()
     yield
-    discord_voice_cache.clear()
+    voice_index.clear()
 
 
 @pytest.mark.asyncio
 async def test_discord_voice_status_returns_cached_data(client: AsyncClient):
     # GIVEN
-    discord_voice_cache["discord_voice_status"] = {
-        "users": [
-            {"user_id": "111", "nickname": "Pilot1"},
-            {"user_id": "222", "nickname": "Pilot2"},
-        ],
-        "channels": [
-            {"channel_id": "10", "name": "Lobby", "users": [{"user_id": "111", "nickname": "Pilot1"}]},
-            {"channel_id": "20", "name": "Ops Room", "users": [{"user_id": "222", "nickname": "Pilot2"}]},
-        ],
-        "user_count": 2,
-        "guild_name": "VEAF",
-    }
+    voice_index.reset(
+        "VEAF",
+        [(10, "Lobby"), (20, "Ops Room")],
+        {111: _state(10, "Pilot1"), 222: _state(20, "Pilot2")},
+    )
 
     # WHEN
     with patch("app.api.discord_voice.settings") as mock_settings:
@@ -67,7 +67,7 @@ async def test_discord_voice_status_returns_empty_when_not_configured(client: As
 
 @pytest.mark.asyncio
 async def test_discord_voice_status_returns_empty_when_cache_empty(client: AsyncClient):
-    # GIVEN — configured but cache is empty
+    # GIVEN — configured but the bot is not ready yet
 
     # WHEN
     with patch("app.api.discord_voice.settings") as mock_settings:
@@ -87,12 +87,7 @@ async def test_discord_voice_status_returns_empty_when_cache_empty(client: Async
 @pytest.mark.asyncio
 async def test_header_includes_discord_voice_count(client: AsyncClient):
     # GIVEN
-    discord_voice_cache["discord_voice_status"] = {
-        "users": [{"user_id": "111", "nickname": "Pilot1"}],
-        "channels": [],
-        "user_count": 1,
-        "guild_name": "VEAF",
-    }
+    voice_index.reset("VEAF", [], {111: _state(10, "Pilot1")})
 
     # WHEN
     response = await client.get("/api/header")
@@ -105,7 +100,7 @@ async def test_header_includes_discord_voice_count(client: AsyncClient):
 
 @pytest.mark.asyncio
 async def test_header_discord_voice_count_zero_when_no_cache(client: AsyncClient):
-    # GIVEN — empty cache
+    # GIVEN — bot not ready
 
     # WHEN
     response = await client.get("/api/header")
@@ -114,3 +109,43 @@ async def test_header_discord_voice_count_zero_when_no_cache(client: AsyncClient
     assert response.status_code == 200
     data = response.json()
     assert data["discord_voice_count"] == 0
+
+
+class _FakeRequest:
+    """Starlette Request stand-in: never disconnects."""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+@pytest.mark.asyncio
+async def test_discord_voice_stream_sends_snapshot_then_diffs():
+    # GIVEN
+    voice_index.reset("VEAF", [(10, "Lobby")], {})
+    diff = {
+        "action": "join",
+        "user": {"user_id": "111", "nickname": "Pilot1"},
+        "channel_id": "10",
+        "from_channel_id": None,
+        "user_count": 1,
+    }
+
+    # WHEN
+    with patch("app.api.discord_voice.settings") as mock_settings:
+        mock_settings.DISCORD_BOT_TOKEN = "fake-token"
+        mock_settings.DISCORD_GUILD_ID = "123456"
+        stream = dv_api._voice_events(_FakeRequest())
+        snapshot = await anext(stream)
+        voice_events.publish(diff)
+        diff_event = await anext(stream)
+        voice_events.publish(RESYNC)
+        resync = await anext(stream)
+        await stream.aclose()
+
+    # THEN
+    assert snapshot.startswith("event: snapshot\n")
+    assert json.loads(snapshot.split("data: ", 1)[1])["guild_name"] == "VEAF"
+    assert diff_event.startswith("event: diff\n")
+    assert json.loads(diff_event.split("data: ", 1)[1]) == diff
+    assert resync.startswith("event: snapshot\n")
+    assert voice_events.subscriber_count == 0
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import header as header_api
+from app.utils.broadcast import Broadcaster
+from app.utils.cache import teamspeak_cache
+from tests.factories import EventFactory, UserFactory
+
+
+class _FakeRequest:
+    """Starlette Request stand-in: disconnects after `events` reads."""
+
+    def __init__(self, events: int):
+        self._remaining = events
+
+    async def is_disconnected(self) -> bool:
+        self._remaining -= 1
+        return self._remaining < 0
+
+
+@pytest.fixture(autouse=True)
+def clear_ts_cache():
+    teamspeak_cache.clear()
+    yield
+    teamspeak_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_header_stream_pushes_changes_only(db_session: AsyncSession):
+    # GIVEN an upcoming event and a broadcaster reading the test session
+    user = UserFactory.build()
+    db_session.add(user)
+    await db_session.commit()
+    start = datetime.now(UTC) + timedelta(days=1)
+    db_session.add(EventFactory.build(owner_id=user.id, title="Op Tempête", start_date=start, end_date=start + timedelta(hours=2)))
+    await db_session.commit()
+
+    async def compute():
+        return await header_api.build_header_data(db_session)
+
+    broadcaster = Broadcaster(compute, interval=0.01)
+
+    # WHEN — TS count changes once while the client is connected
+    with (
+        patch.object(header_api, "header_broadcaster", broadcaster),
+        patch.object(header_api, "STREAM_KEEPALIVE", 0.2),
+    ):
+        stream = header_api._header_events(_FakeRequest(events=3))
+        first = await anext(stream)
+        teamspeak_cache["ts_status"] = {"clients": [], "channels": [], "client_count": 4}
+        second = await anext(stream)
+        third = await anext(stream)
+        await stream.aclose()
+    # The refresh task stops once nobody listens; let it finish before the session is torn down
+    await asyncio.wait_for(broadcaster._task, timeout=1)
+
+    # THEN
+    first_data = json.loads(first.removeprefix("data: "))
+    assert first_data["next_events"][0]["title"] == "Op Tempête"
+    assert first_data["ts_client_count"] == 0
+    assert json.loads(second.removeprefix("data: "))["ts_client_count"] == 4
+    assert third == ": keepalive\n\n"
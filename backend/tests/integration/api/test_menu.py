@@ -0,0 +1,131 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.jwt import create_access_token
+from app.models.content import MenuItem
+from app.models.user import User
+from tests.factories import AdminFactory, MenuItemFactory, UserFactory
+
+
+async def _create_user(db: AsyncSession, factory=UserFactory, **overrides):
+    user = factory.build(**overrides)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    token = create_access_token(user.id, user.get_roles_list())
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+async def _create_menu_item(db: AsyncSession, **overrides) -> MenuItem:
+    item = MenuItemFactory.build(**overrides)
+    db.add(item)
+    await db.commit()
+    await db.refresh(item)
+    return item
+
+
+def _labels(items: list[dict]) -> list[str]:
+    return [item["label"] for item in items]
+
+
+@pytest.mark.asyncio
+async def test_menu_filtered_by_access_level(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    root = await _create_menu_item(db_session, label="Escadrille", type=MenuItem.TYPE_MENU, link=None, position=1)
+    await _create_menu_item(db_session, label="Public", menu_id=root.id, position=1)
+    await _create_menu_item(db_session, label="Cadets", menu_id=root.id, position=2, restriction=MenuItem.LEVEL_CADET)
+    await _create_menu_item(db_session, label="Membres", menu_id=root.id, position=3, restriction=MenuItem.LEVEL_MEMBER)
+    await _create_menu_item(db_session, label="Désactivé", menu_id=root.id, position=4, enabled=False)
+    _, cadet_headers = await _create_user(db_session, status=User.STATUS_CADET)
+    _, admin_headers = await _create_user(db_session, AdminFactory)
+
+    # WHEN
+    anonymous = await client.get("/api/menu")
+    cadet = await client.get("/api/menu", headers=cadet_headers)
+    admin = await client.get("/api/menu", headers=admin_headers)
+
+    # THEN
+    assert _labels(anonymous.json()[0]["items"]) == ["Public"]
+    assert _labels(cadet.json()[0]["items"]) == ["Public", "Cadets"]
+    assert _labels(admin.json()[0]["items"]) == ["Public", "Cadets", "Membres"]
+    assert len({anonymous.headers["etag"], cadet.headers["etag"], admin.headers["etag"]}) == 3
+
+
+@pytest.mark.asyncio
+async def test_menu_not_modified(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_menu_item(db_session, label="Forum")
+    first = await client.get("/api/menu")
+
+    # WHEN
+    response = await client.get("/api/menu", headers={"If-None-Match": first.headers["etag"]})
+
+    # THEN
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_menu_served_from_cache(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_menu_item(db_session, label="Forum")
+    await client.get("/api/menu")
+    await _create_menu_item(db_session, label="Inserted behind the admin's back")
+
+    # WHEN
+    response = await client.get("/api/menu")
+
+    # THEN
+    assert _labels(response.json()) == ["Forum"]
+
+
+@pytest.mark.asyncio
+async def test_menu_invalidated_by_admin_edits(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    item = await _create_menu_item(db_session, label="Forum", position=1)
+    _, headers = await _create_user(db_session, AdminFactory)
+    before = await client.get("/api/menu")
+
+    # WHEN
+    payload = {"label": "Wiki", "type": MenuItem.TYPE_LINK, "link": "https://wiki", "enabled": True, "position": 2}
+    await client.post("/api/admin/menu", headers=headers, json=payload)
+    created = await client.get("/api/menu")
+    await client.delete(f"/api/admin/menu/{item.id}", headers=headers)
+    deleted = await client.get("/api/menu", headers={"If-None-Match": created.headers["etag"]})
+
+    # THEN
+    assert _labels(before.json()) == ["Forum"]
+    assert _labels(created.json()) == ["Forum", "Wiki"]
+    assert deleted.status_code == 200
+    assert _labels(deleted.json()) == ["Wiki"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(2)
+async def test_menu_any_depth_in_one_query(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    parent = None
+    for depth in range(5):
+        parent = await _create_menu_item(
+            db_session,
+            label=f"Niveau {depth}",
+            type=MenuItem.TYPE_MENU,
+            link=None,
+            menu_id=parent.id if parent else None,
+        )
+    db_session.expunge_all()  # Nothing already loaded in the session
+
+    # WHEN
+    response = await client.get("/api/menu")
+
+    # THEN
+    assert response.status_code == 200
+    labels, items = [], response.json()
+    while items:
+        labels.append(items[0]["label"])
+        items = items[0]["items"]
+    assert labels == [f"Niveau {depth}" for depth in range(5)]
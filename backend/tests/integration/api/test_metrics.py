@@ -0,0 +1,159 @@
+"""Integration tests for the Prometheus endpoint and the request instrumentation."""
+
+import logging
+
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.calendar import Choice, Flight, Slot, Vote
+from app.utils.metrics import UNMATCHED_ROUTE
+from tests.factories import EventFactory, ModuleFactory, UserFactory
+
+
+def _value(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_prometheus_text(client: AsyncClient):
+    # GIVEN
+    await client.get("/api/health")
+
+    # WHEN
+    response = await client.get("/api/metrics")
+
+    # THEN
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=")
+    assert "veaf_app_info{version=" in response.text
+    assert 'veaf_http_requests_total{method="GET",route="/api/health",status="200"}' in response.text
+    assert 'veaf_cache_lookups_total{cache="teamspeak",result="hit"}' in response.text
+
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_per_route_template(client: AsyncClient):
+    # GIVEN
+    route = "/api/calendar/events/{event_id}"
+    before = _value("veaf_http_requests_total", method="GET", route=route, status="404")
+
+    # WHEN
+    await client.get("/api/calendar/events/123456")
+    await client.get("/api/calendar/events/654321")
+
+    # THEN
+    assert _value("veaf_http_requests_total", method="GET", route=route, status="404") == before + 2
+    assert _value("veaf_http_request_duration_seconds_count", method="GET", route=route) >= 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_paths_share_one_label(client: AsyncClient):
+    # GIVEN
+    before = _value("veaf_http_requests_total", method="GET", route=UNMATCHED_ROUTE, status="404")
+
+    # WHEN
+    await client.get("/api/does-not-exist/1")
+    await client.get("/api/does-not-exist/2")
+
+    # THEN
+    assert _value("veaf_http_requests_total", method="GET", route=UNMATCHED_ROUTE, status="404") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_db_queries_are_charged_to_the_request(client: AsyncClient):
+    # GIVEN
+    labels = {"method": "GET", "route": "/api/calendar/events"}
+    count_before = _value("veaf_http_request_db_queries_count", **labels)
+    queries_before = _value("veaf_http_request_db_queries_sum", **labels)
+    statements_before = _value("veaf_db_query_duration_seconds_count")
+
+    # WHEN
+    response = await client.get("/api/calendar/events")
+
+    # THEN
+    assert response.status_code == 200
+    assert _value("veaf_http_request_db_queries_count", **labels) == count_before + 1
+    queries = _value("veaf_http_request_db_queries_sum", **labels) - queries_before
+    assert queries >= 1
+    assert _value("veaf_db_query_duration_seconds_count") - statements_before >= queries
+
+
+async def _create_full_event(db: AsyncSession) -> int:
+    """An event with every relationship loaded by GET /calendar/events/{id} populated."""
+    user = UserFactory.build()
+    module = ModuleFactory.build()
+    db.add_all([user, module])
+    await db.flush()
+    event = EventFactory.build(owner_id=user.id, map_id=module.id)
+    db.add(event)
+    await db.flush()
+    flight = Flight(event_id=event.id, name="Viper 1", nb_slots=2, aircraft_id=module.id)
+    db.add_all([
+        Vote(event_id=event.id, user_id=user.id, vote=True),
+        Choice(event_id=event.id, user_id=user.id, module_id=module.id),
+        flight,
+    ])
+    await db.flush()
+    db.add(Slot(flight_id=flight.id, user_id=user.id))
+    await db.commit()
+    return event.id
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_reports_db_usage(client: AsyncClient, monkeypatch):
+    # GIVEN
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+
+    # WHEN
+    response = await client.get("/api/calendar/events")
+
+    # THEN
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="' in timing
+    assert ", app;dur=" in timing
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_off_by_default(client: AsyncClient):
+    # WHEN
+    response = await client.get("/api/calendar/events")
+
+    # THEN
+    assert "server-timing" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_event_detail_stays_within_its_budget(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    event_id = await _create_full_event(db_session)
+
+    # WHEN
+    response = await client.get(f"/api/calendar/events/{event_id}")
+
+    # THEN — tests/query_budget.py fails the test if the endpoint went over its budget
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["flights"][0]["slots"]) == 1
+    assert data["choices"][0]["module_name"]
+
+
+@pytest.mark.asyncio
+async def test_warns_above_default_budget(client: AsyncClient, db_session: AsyncSession, caplog, monkeypatch):
+    # GIVEN — the user profile endpoint has no declared budget and loads the profile graph
+    user = UserFactory.build()
+    db_session.add(user)
+    await db_session.commit()
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 1)
+
+    # WHEN
+    with caplog.at_level(logging.WARNING, logger="app.utils.metrics"):
+        await client.get("/api/calendar/tasks")
+        await client.get(f"/api/users/{user.id}")
+
+    # THEN
+    messages = [r.getMessage() for r in caplog.records]
+    assert not any("/api/calendar/tasks" in m for m in messages)
+    assert any(m.startswith("GET /api/users/{user_id} ran") and "budget 1" in m for m in messages)
@@ -0,0 +1,131 @@
+from datetime import UTC, datetime
+from email.utils import format_datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.jwt import create_access_token
+from app.models.content import Page
+from tests.factories import AdminFactory, PageBlockFactory, PageFactory
+
+
+async def _create_admin(db: AsyncSession):
+    user = AdminFactory.build()
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    token = create_access_token(user.id, user.get_roles_list())
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+async def _create_page(db: AsyncSession, blocks: int = 2, **overrides) -> Page:
+    page = PageFactory.build(path="recrutement", **overrides)
+    db.add(page)
+    await db.flush()
+    for _ in range(blocks):
+        db.add(PageBlockFactory.build(page_id=page.id))
+    await db.commit()
+    await db.refresh(page)
+    return page
+
+
+@pytest.mark.asyncio
+async def test_get_page_with_validators(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    page = await _create_page(db_session, updated_at=datetime(2026, 3, 1, 20, 45, 12, 345000, tzinfo=UTC))
+    db_session.add(PageBlockFactory.build(page_id=page.id, content="Brouillon", enabled=False))
+    await db_session.commit()
+
+    # WHEN
+    response = await client.get("/api/pages/recrutement")
+
+    # THEN
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == page.id
+    assert len(data["blocks"]) == 2
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 20:45:12 GMT"
+
+
+@pytest.mark.asyncio
+async def test_get_page_not_modified(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_page(db_session)
+    first = await client.get("/api/pages/recrutement")
+
+    # WHEN
+    by_etag = await client.get("/api/pages/recrutement", headers={"If-None-Match": f"W/{first.headers['etag']}"})
+    by_date = await client.get("/api/pages/recrutement", headers={"If-Modified-Since": first.headers["last-modified"]})
+    other_etag = await client.get(
+        "/api/pages/recrutement",
+        headers={"If-None-Match": '"other"', "If-Modified-Since": first.headers["last-modified"]},
+    )
+
+    # THEN
+    assert by_etag.status_code == 304
+    assert by_date.status_code == 304
+    assert other_etag.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_page_modified_since_older_date(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_page(db_session, updated_at=datetime(2026, 3, 1, 20, 45, tzinfo=UTC))
+    since = format_datetime(datetime(2026, 2, 1, tzinfo=UTC), usegmt=True)
+
+    # WHEN
+    response = await client.get("/api/pages/recrutement", headers={"If-Modified-Since": since})
+
+    # THEN
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_page_restriction_checked_on_cached_page(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_page(db_session, restriction=Page.LEVEL_MEMBER)
+    _, headers = await _create_admin(db_session)
+    allowed = await client.get("/api/pages/recrutement", headers=headers)
+
+    # WHEN
+    response = await client.get("/api/pages/recrutement")
+
+    # THEN
+    assert allowed.status_code == 200
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_get_page_not_found(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    await _create_page(db_session, enabled=False)
+
+    # WHEN
+    response = await client.get("/api/pages/recrutement")
+
+    # THEN
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_page_invalidated_by_block_edit(client: AsyncClient, db_session: AsyncSession):
+    # GIVEN
+    page = await _create_page(db_session, blocks=1)
+    _, headers = await _create_admin(db_session)
+    first = await client.get("/api/pages/recrutement")
+    block_id = first.json()["blocks"][0]["id"]
+
+    # WHEN
+    await client.put(
+        f"/api/admin/pages/{page.id}/blocks/{block_id}",
+        headers=headers,
+        json={"content": "Nouveau contenu", "number": 1, "enabled": True},
+    )
+    response = await client.get("/api/pages/recrutement", headers={"If-None-Match": first.headers["etag"]})
+
+    # THEN
+    assert response.status_code == 200
+    assert response.json()["blocks"][0]["content"] == "Nouveau contenu"
+    assert response.headers["etag"] != first.headers["etag"]
@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient
 
+from app.services.teamspeak import _build_status
 from app.utils.cache import teamspeak_cache
 
 
@@ -34,12 +35,31 @@ async def test_teamspeak_status_returns_cached_data(client: AsyncClient):
     data = response.json()
     assert data["configured"] is True
     assert data["client_count"] == 2
-    assert len(data["channels"]) == 2
-    assert data["channels"][0]["name"] == "Lobby"
-    assert len(data["channels"][0]["clients"]) == 1
+    assert len(data["clients"]) == 2
+    assert "channels" not in data  # Channel client lists are only sent in the tree
     assert data["server_host"] != ""
 
 
+@pytest.mark.asyncio
+async def test_teamspeak_status_returns_channel_tree(client: AsyncClient):
+    # GIVEN
+    teamspeak_cache["ts_status"] = _build_status(
+        [{"clid": "1", "cid": "11", "client_nickname": "Pilot1", "client_type": "0"}],
+        [{"cid": "10", "pid": "0", "channel_name": "Ops"}, {"cid": "11", "pid": "10", "channel_name": "Flight 1"}],
+    )
+
+    # WHEN
+    response = await client.get("/api/teamspeak/status")
+
+    # THEN
+    assert response.status_code == 200
+    tree = response.json()["tree"]
+    assert len(tree) == 1
+    assert tree[0]["total_clients"] == 1
+    assert tree[0]["children"][0]["name"] == "Flight 1"
+    assert tree[0]["children"][0]["clients"][0]["nickname"] == "Pilot1"
+
+
 @pytest.mark.asyncio
 async def test_teamspeak_status_returns_empty_when_cache_empty(client: AsyncClient):
     # GIVEN — cache is empty but TS is configured
@@ -53,7 +73,7 @@ async def test_teamspeak_status_returns_empty_when_cache_empty(client: AsyncClie
     assert data["configured"] is True
     assert data["client_count"] == 0
     assert data["clients"] == []
-    assert data["channels"] == []
+    assert data["tree"] == []
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,44 @@
+"""Pytest plugin enforcing SQL query budgets (registered in pyproject.toml).
+
+A test fails when one of its requests ran more statements than the budget declared on
+the endpoint with `app.utils.metrics.query_budget`, or than the test's own marker::
+
+    @pytest.mark.query_budget(3)
+    async def test_list_is_cheap(client): ...
+"""
+
+import pytest
+
+from app.utils.metrics import RequestProfile, profile_listeners
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): fail if a request made by the test runs more than n SQL statements"
+    )
+
+
+def budget_overrun(profile: RequestProfile, test_budget: int | None = None) -> str | None:
+    """Describe how `profile` went over its endpoint's or the test's budget, if it did."""
+    for budget, source in ((profile.budget, "endpoint"), (test_budget, "test")):
+        if budget is not None and profile.queries > budget:
+            return f"{profile.method} {profile.route}: {profile.queries} SQL statements ({source} budget {budget})"
+    return None
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budget(request):
+    marker = request.node.get_closest_marker("query_budget")
+    test_budget = marker.args[0] if marker else None
+    overruns: list[str] = []
+
+    def check(profile: RequestProfile) -> None:
+        overrun = budget_overrun(profile, test_budget)
+        if overrun is not None:
+            overruns.append(overrun)
+
+    profile_listeners.append(check)
+    yield
+    profile_listeners.remove(check)
+    if overruns:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(overruns), pytrace=False)
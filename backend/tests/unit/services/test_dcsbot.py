@@ -0,0 +1,118 @@
+import httpx
+import pytest
+
+from app.services import dcsbot as dcsbot_service
+from app.utils.cache import dcsbot_cache
+
+
+@pytest.fixture
+def upstream():
+    """Install a shared client backed by a mock transport; yields the list of requests seen."""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/serverapi/servers":
+            return httpx.Response(200, json=[{"name": "VEAF Training", "status": "Running"}])
+        if request.url.path == "/serverapi/serverstats":
+            return httpx.Response(200, json={"totalPlayers": 42})
+        return httpx.Response(500)
+
+    dcsbot_cache.clear()
+    original = dcsbot_service._client
+    dcsbot_service._client = httpx.AsyncClient(base_url="http://dcsbot.test", transport=httpx.MockTransport(handler))
+    yield requests
+    dcsbot_service._client = original
+    dcsbot_cache.clear()
+
+
+class TestSharedClient:
+    async def test_calls_go_through_shared_client(self, upstream):
+        # GIVEN — mocked upstream
+
+        # WHEN
+        servers = await dcsbot_service.get_servers()
+        stats = await dcsbot_service.get_server_stats()
+        server = await dcsbot_service.get_server("VEAF Training")
+
+        # THEN
+        assert servers[0]["name"] == "VEAF Training"
+        assert stats["totalPlayers"] == 42
+        assert server[0]["status"] == "Running"
+        assert [r.url.path for r in upstream] == ["/serverapi/servers", "/serverapi/serverstats", "/serverapi/servers"]
+        assert upstream[2].url.params["server_name"] == "VEAF Training"
+
+    async def test_upstream_error_returns_none(self, upstream):
+        # GIVEN — mocked upstream answers 500 for attendance
+
+        # WHEN
+        result = await dcsbot_service.get_server_attendance("VEAF Training")
+
+        # THEN
+        assert result is None
+
+    async def test_start_and_close_client(self):
+        # GIVEN
+        original = dcsbot_service._client
+        dcsbot_service._client = None
+
+        # WHEN
+        await dcsbot_service.start_client()
+        client = dcsbot_service._client
+        await dcsbot_service.close_client()
+
+        # THEN
+        assert isinstance(client, httpx.AsyncClient)
+        assert client.is_closed
+        assert dcsbot_service._client is None
+        dcsbot_service._client = original
+
+
+class TestPollSnapshot:
+    async def test_builds_snapshot_for_all_servers(self, upstream):
+        # GIVEN — mocked upstream (attendance fails for "VEAF Training")
+
+        # WHEN
+        snapshot = await dcsbot_service.poll_snapshot()
+
+        # THEN
+        assert snapshot == dcsbot_service.get_snapshot()
+        assert snapshot["stats"]["totalPlayers"] == 42
+        entry = snapshot["by_name"]["VEAF Training"]
+        assert entry["server"]["status"] == "Running"
+        assert entry["stats"]["totalPlayers"] == 42
+        assert entry["attendance"] is None
+        assert entry["records"] == 2  # Server and stats; attendance failed
+        assert sorted({r.url.path for r in upstream}) == [
+            "/serverapi/server_attendance",
+            "/serverapi/servers",
+            "/serverapi/serverstats",
+        ]
+
+    async def test_keeps_previous_values_for_failed_parts(self, upstream):
+        # GIVEN
+        previous = {"stats": None, "attendance": {"unique_players_24h": 3}}
+        dcsbot_cache[dcsbot_service.SNAPSHOT_KEY] = {"servers": [], "stats": None, "by_name": {"VEAF Training": previous}}
+
+        # WHEN
+        snapshot = await dcsbot_service.poll_snapshot()
+
+        # THEN
+        assert snapshot["by_name"]["VEAF Training"]["attendance"] == {"unique_players_24h": 3}
+
+    async def test_keeps_previous_snapshot_when_servers_unavailable(self):
+        # GIVEN
+        original = dcsbot_service._client
+        dcsbot_service._client = httpx.AsyncClient(
+            base_url="http://dcsbot.test", transport=httpx.MockTransport(lambda request: httpx.Response(503))
+        )
+        dcsbot_cache[dcsbot_service.SNAPSHOT_KEY] = {"servers": [{"name": "old"}], "stats": None, "by_name": {}}
+
+        # WHEN
+        result = await dcsbot_service.poll_snapshot()
+
+        # THEN
+        assert result is None
+        assert dcsbot_service.get_snapshot()["servers"] == [{"name": "old"}]
+        dcsbot_service._client = original
+        dcsbot_cache.clear()
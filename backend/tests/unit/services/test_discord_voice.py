@@ -0,0 +1,265 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services import discord_voice
+from app.services.discord_voice import DiscordVoiceMonitor, VoiceIndex, build_voice_diff, voice_events, voice_index
+from app.utils.broadcast import RESYNC
+from app.utils.cache import discord_voice_cache, job_leases
+
+
+def _state(channel_id: int, nickname: str = "Pilot1", bot: bool = False) -> dict:
+    return {"channel_id": channel_id, "nickname": nickname, "bot": bot}
+
+
+class TestBuildVoiceDiff:
+    def test_join(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(111, None, _state(10))
+
+        # THEN
+        assert diff == {
+            "action": "join",
+            "user": {"user_id": "111", "nickname": "Pilot1"},
+            "channel_id": "10",
+            "from_channel_id": None,
+        }
+
+    def test_leave(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(111, _state(10), None)
+
+        # THEN
+        assert diff["action"] == "leave"
+        assert diff["channel_id"] is None
+        assert diff["from_channel_id"] == "10"
+
+    def test_move(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(111, _state(10), _state(20))
+
+        # THEN
+        assert diff["action"] == "move"
+        assert (diff["from_channel_id"], diff["channel_id"]) == ("10", "20")
+
+    def test_nickname_change_is_update(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(111, _state(10), _state(10, nickname="Viper"))
+
+        # THEN
+        assert diff["action"] == "update"
+        assert diff["user"]["nickname"] == "Viper"
+
+    def test_mute_in_same_channel_is_ignored(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(111, _state(10), _state(10))
+
+        # THEN
+        assert diff is None
+
+    def test_bots_are_ignored(self):
+        # GIVEN / WHEN
+        diff = build_voice_diff(999, None, _state(10, bot=True))
+
+        # THEN
+        assert diff is None
+
+
+class TestPublish:
+    async def test_bot_thread_publishes_on_main_loop(self):
+        # GIVEN
+        monitor = DiscordVoiceMonitor("token", "123", asyncio.get_running_loop())
+        diff = build_voice_diff(111, None, _state(10))
+
+        # WHEN — published from another thread, as the bot thread does
+        async with voice_events.subscribe() as subscription:
+            await asyncio.to_thread(monitor._publish, diff)
+            event = await subscription.get(timeout=1)
+
+        # THEN
+        assert event["action"] == "join"
+        assert "user_count" in event
+
+
+class TestVoiceIndex:
+    def _index(self) -> VoiceIndex:
+        index = VoiceIndex()
+        index.reset("VEAF", [(10, "Lobby"), (20, "Ops Room")], {111: _state(10), 999: _state(10, "Bot", bot=True)})
+        return index
+
+    def test_not_ready_before_reset(self):
+        # GIVEN
+        index = VoiceIndex()
+
+        # WHEN / THEN
+        assert index.snapshot() is None
+        assert index.user_count == 0
+
+    def test_reset_ignores_bots(self):
+        # GIVEN / WHEN
+        snapshot = self._index().snapshot()
+
+        # THEN
+        assert snapshot == {
+            "users": [{"user_id": "111", "nickname": "Pilot1"}],
+            "channels": [
+                {"channel_id": "10", "name": "Lobby", "users": [{"user_id": "111", "nickname": "Pilot1"}]},
+                {"channel_id": "20", "name": "Ops Room", "users": []},
+            ],
+            "user_count": 1,
+            "guild_name": "VEAF",
+        }
+
+    def test_join_move_leave(self):
+        # GIVEN
+        index = self._index()
+
+        # WHEN
+        index.update(222, _state(10, "Pilot2"))
+        index.update(111, _state(20))
+        joined_and_moved = index.snapshot()
+        index.update(222, None)
+
+        # THEN
+        assert [len(c["users"]) for c in joined_and_moved["channels"]] == [1, 1]
+        assert joined_and_moved["channels"][1]["users"] == [{"user_id": "111", "nickname": "Pilot1"}]
+        assert index.user_count == 1
+        assert index.snapshot()["channels"][0]["users"] == []
+
+    def test_snapshot_is_rebuilt_only_after_a_change(self):
+        # GIVEN
+        index = self._index()
+        first = index.snapshot()
+
+        # WHEN
+        unchanged = index.snapshot()
+        index.update(222, _state(20, "Pilot2"))
+
+        # THEN
+        assert unchanged is first
+        assert index.snapshot() is not first
+        assert index.snapshot()["user_count"] == 2
+
+    def test_set_channels_keeps_users(self):
+        # GIVEN
+        index = self._index()
+
+        # WHEN
+        index.set_channels([(10, "Briefing"), (30, "New")])
+
+        # THEN
+        assert [(c["name"], len(c["users"])) for c in index.snapshot()["channels"]] == [("Briefing", 1), ("New", 0)]
+
+
+class TestSyncDiscordVoice:
+    @pytest.fixture(autouse=True)
+    def worker(self, monkeypatch):
+        """No bot is started: start_monitor only records the call."""
+        started = []
+        monkeypatch.setattr(discord_voice, "start_monitor", lambda: started.append(os.getpid()))
+        monkeypatch.setattr(discord_voice, "_loaded", None)
+        monkeypatch.setattr(discord_voice, "_shared", None)
+        discord_voice_cache.clear()
+        job_leases.clear()
+        voice_index.clear()
+        yield started
+        discord_voice_cache.clear()
+        job_leases.clear()
+        voice_index.clear()
+
+    @pytest.fixture
+    def bot_running(self, monkeypatch):
+        """This worker runs the bot (stand-in monitor recording `stop`)."""
+
+        class Monitor:
+            stopped = False
+
+            async def stop(self):
+                self.stopped = True
+
+        monitor = Monitor()
+        monkeypatch.setattr(discord_voice, "_monitor", monitor)
+        return monitor
+
+    async def test_first_worker_starts_the_bot(self, worker):
+        # WHEN
+        await discord_voice.sync_discord_voice()
+
+        # THEN
+        assert worker == [os.getpid()]
+        assert job_leases[discord_voice.BOT_LEASE] == os.getpid()
+
+    async def test_other_workers_load_the_shared_index(self, worker):
+        # GIVEN — the bot runs in another worker, which shared its index
+        bot_index = VoiceIndex()
+        bot_index.reset("VEAF", [(10, "Lobby")], {111: _state(10)})
+        job_leases.claim(discord_voice.BOT_LEASE, os.getpid() + 1, 60)
+        discord_voice_cache["index"] = (os.getpid() + 1, bot_index.version, bot_index.export())
+
+        # WHEN
+        async with voice_events.subscribe() as subscription:
+            await discord_voice.sync_discord_voice()
+            event = await subscription.get(timeout=1)
+            await discord_voice.sync_discord_voice()
+            unchanged = await subscription.get(timeout=0.1)
+
+        # THEN — no second bot; the index is loaded once, and streams resynchronised
+        assert worker == []
+        assert voice_index.snapshot() == bot_index.snapshot()
+        assert event is RESYNC
+        assert unchanged is None
+
+    async def test_takes_over_when_the_lease_expired(self, worker):
+        # GIVEN — the bot's worker stopped: its lease is gone, its index too
+        voice_index.reset("VEAF", [(10, "Lobby")], {111: _state(10)})
+
+        # WHEN
+        await discord_voice.sync_discord_voice()
+
+        # THEN
+        assert worker == [os.getpid()]
+
+    async def test_bot_stops_when_its_lease_was_taken(self, worker, bot_running):
+        # GIVEN — this worker runs the bot, but stalled long enough for another one to take over
+        voice_index.reset("VEAF", [(10, "Lobby")], {111: _state(10)})
+        discord_voice_cache["index"] = (os.getpid(), voice_index.version, voice_index.export())
+        job_leases.claim(discord_voice.BOT_LEASE, os.getpid() + 1, 60)
+
+        # WHEN
+        await discord_voice.sync_discord_voice()
+
+        # THEN
+        assert bot_running.stopped
+        assert discord_voice._monitor is None
+        assert job_leases[discord_voice.BOT_LEASE] == os.getpid() + 1
+        assert "index" not in discord_voice_cache  # Its stale index is withdrawn
+        assert voice_index.snapshot() is None
+
+    async def test_bot_worker_shares_its_index_once_per_change(self, worker, bot_running, monkeypatch):
+        # GIVEN — several workers share the cache
+        monkeypatch.setattr(discord_voice.settings, "CACHE_BACKEND", "sqlite")
+        voice_index.reset("VEAF", [(10, "Lobby")], {111: _state(10)})
+        await discord_voice.sync_discord_voice()
+        shared = discord_voice_cache.pop("index")
+
+        # WHEN — nothing changed, then a user joins
+        await discord_voice.sync_discord_voice()
+        unchanged = discord_voice_cache.get("index")
+        voice_index.update(222, _state(10, "Pilot2"))
+        await discord_voice.sync_discord_voice()
+
+        # THEN
+        assert shared[:2] == (os.getpid(), voice_index.version - 1)
+        assert unchanged is None
+        assert discord_voice_cache["index"][2]["states"].keys() == {111, 222}
+
+    async def test_single_worker_does_not_share_its_index(self, worker, bot_running):
+        # GIVEN — memory backend: a single worker
+        voice_index.reset("VEAF", [(10, "Lobby")], {111: _state(10)})
+
+        # WHEN
+        await discord_voice.sync_discord_voice()
+
+        # THEN
+        assert "index" not in discord_voice_cache
@@ -1,6 +1,15 @@
-from unittest.mock import MagicMock, patch
-
-from app.services.teamspeak import _fetch_ts_data_sync, _parse_ts_url, get_cached_status, get_client_count
+from unittest.mock import AsyncMock, patch
+
+from app.services import teamspeak as ts_service
+from app.services.teamspeak import (
+    PresenceIndex,
+    _build_status,
+    _parse_ts_url,
+    fetch_ts_data,
+    get_cached_status,
+    get_client_count,
+)
+from app.services.ts3_client import TS3QueryError
 from app.utils.cache import teamspeak_cache
 
 
@@ -92,32 +101,28 @@ class TestGetCachedStatus:
         assert result["client_count"] == 3
 
 
-class TestFetchTsDataSync:
-    @patch("app.services.teamspeak.TS3Connection")
-    @patch("app.services.teamspeak.settings")
-    def test_fetches_and_filters_clients(self, mock_settings, mock_ts3_class):
+class TestFetchTsData:
+    @patch("app.services.teamspeak._get_client")
+    async def test_fetches_and_filters_clients(self, mock_get_client):
         # GIVEN
-        mock_settings.API_TEAMSPEAK_URL = "serverquery://ts.veaf.org:10011/?server_port=9987"
-
-        mock_conn = MagicMock()
-        mock_ts3_class.return_value.__enter__ = MagicMock(return_value=mock_conn)
-        mock_ts3_class.return_value.__exit__ = MagicMock(return_value=False)
-
-        mock_conn.clientlist.return_value = [
-            {"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"},
-            {"clid": "2", "cid": "10", "client_nickname": "Unknown from 1.2.3.4", "client_type": "0"},
-            {"clid": "3", "cid": "20", "client_nickname": "ServerQuery", "client_type": "1"},
-            {"clid": "4", "cid": "20", "client_nickname": "Pilot2", "client_type": "0"},
-        ]
-        mock_conn.channellist.return_value = [
-            {"cid": "10", "pid": "0", "channel_name": "Lobby"},
-            {"cid": "20", "pid": "0", "channel_name": "Ops Room"},
-        ]
+        mock_get_client.return_value.pipeline = AsyncMock(return_value=[
+            [
+                {"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"},
+                {"clid": "2", "cid": "10", "client_nickname": "Unknown from 1.2.3.4", "client_type": "0"},
+                {"clid": "3", "cid": "20", "client_nickname": "ServerQuery", "client_type": "1"},
+                {"clid": "4", "cid": "20", "client_nickname": "Pilot2", "client_type": "0"},
+            ],
+            [
+                {"cid": "10", "pid": "0", "channel_name": "Lobby"},
+                {"cid": "20", "pid": "0", "channel_name": "Ops Room"},
+            ],
+        ])
 
         # WHEN
-        result = _fetch_ts_data_sync()
+        result = await fetch_ts_data()
 
         # THEN
+        mock_get_client.return_value.pipeline.assert_awaited_once_with("clientlist", "channellist")
         assert result["client_count"] == 2
         assert len(result["clients"]) == 2
         assert result["clients"][0]["nickname"] == "Pilot1"
@@ -132,26 +137,201 @@ class TestFetchTsDataSync:
         assert len(ops["clients"]) == 1
         assert ops["clients"][0]["nickname"] == "Pilot2"
 
-    @patch("app.services.teamspeak.TS3Connection")
-    @patch("app.services.teamspeak.settings")
-    def test_empty_server(self, mock_settings, mock_ts3_class):
-        # GIVEN
-        mock_settings.API_TEAMSPEAK_URL = "serverquery://ts.veaf.org:10011/?server_port=9987"
-
-        mock_conn = MagicMock()
-        mock_ts3_class.return_value.__enter__ = MagicMock(return_value=mock_conn)
-        mock_ts3_class.return_value.__exit__ = MagicMock(return_value=False)
-
-        mock_conn.clientlist.return_value = []
-        mock_conn.channellist.return_value = [
-            {"cid": "1", "pid": "0", "channel_name": "Default Channel"},
-        ]
+    @patch("app.services.teamspeak._get_client")
+    async def test_empty_server(self, mock_get_client):
+        # GIVEN — clientlist fails with "empty result set"
+        mock_get_client.return_value.pipeline = AsyncMock(return_value=[
+            TS3QueryError("1281", "database empty result set"),
+            [{"cid": "1", "pid": "0", "channel_name": "Default Channel"}],
+        ])
 
         # WHEN
-        result = _fetch_ts_data_sync()
+        result = await fetch_ts_data()
 
         # THEN
         assert result["client_count"] == 0
         assert len(result["clients"]) == 0
         assert len(result["channels"]) == 1
         assert result["channels"][0]["clients"] == []
+
+
+class TestChannelTree:
+    def test_nests_channels_and_sums_clients(self):
+        # GIVEN — children listed before their parent, and an orphan
+        raw_clients = [
+            {"clid": "1", "cid": "11", "client_nickname": "Pilot1", "client_type": "0"},
+            {"clid": "2", "cid": "12", "client_nickname": "Pilot2", "client_type": "0"},
+            {"clid": "3", "cid": "1", "client_nickname": "Pilot3", "client_type": "0"},
+        ]
+        raw_channels = [
+            {"cid": "11", "pid": "10", "channel_name": "Flight 1"},
+            {"cid": "12", "pid": "11", "channel_name": "Element 1"},
+            {"cid": "10", "pid": "0", "channel_name": "Ops"},
+            {"cid": "1", "pid": "0", "channel_name": "Lobby"},
+            {"cid": "99", "pid": "42", "channel_name": "Orphan"},
+        ]
+
+        # WHEN
+        tree = _build_status(raw_clients, raw_channels)["tree"]
+
+        # THEN
+        assert [(node["name"], node["total_clients"]) for node in tree] == [("Ops", 2), ("Lobby", 1), ("Orphan", 0)]
+        flight = tree[0]["children"][0]
+        assert flight["name"] == "Flight 1"
+        assert [cl["nickname"] for cl in flight["clients"]] == ["Pilot1"]
+        assert flight["total_clients"] == 2
+        assert flight["children"][0]["clients"][0]["nickname"] == "Pilot2"
+
+
+class TestPresenceIndex:
+    def _index(self) -> PresenceIndex:
+        index = PresenceIndex()
+        index.reset(_build_status(
+            [{"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"}],
+            [{"cid": "10", "pid": "0", "channel_name": "Lobby"}, {"cid": "20", "pid": "0", "channel_name": "Ops"}],
+        ))
+        return index
+
+    def _channel_clients(self, index: PresenceIndex) -> dict[str, list[str]]:
+        return {ch["name"]: [cl["nickname"] for cl in ch["clients"]] for ch in index.snapshot()["channels"]}
+
+    def test_not_ready_before_first_scan(self):
+        # GIVEN / WHEN
+        index = PresenceIndex()
+
+        # THEN
+        assert index.snapshot() is None
+
+    def test_enter_move_leave(self):
+        # GIVEN
+        index = self._index()
+
+        # WHEN
+        index.handle("notifycliententerview", {"ctid": "10", "clid": "2", "client_nickname": "Pilot2", "client_type": "0"})
+        index.handle("notifyclientmoved", {"ctid": "20", "clid": "1"})
+        moved = self._channel_clients(index)
+        index.handle("notifyclientleftview", {"cfid": "10", "ctid": "0", "clid": "2"})
+
+        # THEN
+        assert moved == {"Lobby": ["Pilot2"], "Ops": ["Pilot1"]}
+        assert self._channel_clients(index) == {"Lobby": [], "Ops": ["Pilot1"]}
+        assert index.snapshot()["client_count"] == 1
+
+    def test_query_clients_are_ignored(self):
+        # GIVEN
+        index = self._index()
+        before = index.snapshot()
+
+        # WHEN
+        index.handle("notifycliententerview", {"ctid": "10", "clid": "3", "client_nickname": "bot", "client_type": "1"})
+
+        # THEN
+        assert index.snapshot() is before
+
+    def test_channel_events(self):
+        # GIVEN
+        index = self._index()
+
+        # WHEN
+        index.handle("notifychannelcreated", {"cid": "30", "cpid": "20", "channel_name": "Flight 1"})
+        index.handle("notifychanneledited", {"cid": "10", "channel_name": "Accueil"})
+        index.handle("notifychanneldeleted", {"cid": "20"})
+
+        # THEN
+        channels = index.snapshot()["channels"]
+        assert [(ch["name"], ch["pid"]) for ch in channels] == [("Accueil", 0), ("Flight 1", 20)]
+
+    def test_previous_snapshot_is_not_modified(self):
+        # GIVEN
+        index = self._index()
+        before = index.snapshot()
+
+        # WHEN
+        index.handle("notifyclientmoved", {"ctid": "20", "clid": "1"})
+
+        # THEN
+        assert before["clients"][0]["cid"] == 10
+        assert index.snapshot()["clients"][0]["cid"] == 20
+
+
+class TestPushMode:
+    def setup_method(self):
+        teamspeak_cache.clear()
+
+    @patch("app.services.teamspeak.settings")
+    @patch("app.services.teamspeak._get_client")
+    async def test_scan_skipped_while_presence_is_live(self, mock_get_client, mock_settings):
+        # GIVEN — a session registered for notifications and a fresh full scan
+        mock_settings.API_TEAMSPEAK_URL = "serverquery://ts.veaf.org:10011/?server_port=9987"
+        mock_settings.TEAMSPEAK_PUSH = True
+        mock_settings.TEAMSPEAK_RECONCILE_INTERVAL = 300
+        mock_settings.CACHE_BACKEND = "memory"
+        mock_get_client.return_value.pipeline = AsyncMock(return_value=[
+            [{"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"}],
+            [{"cid": "10", "pid": "0", "channel_name": "Lobby"}],
+        ])
+        presence = PresenceIndex()
+        with patch.object(ts_service, "presence", presence), patch.object(ts_service, "_client") as mock_client:
+            mock_client.notifications_active = True
+            await ts_service.scan_and_cache()
+
+            # WHEN
+            presence.handle("notifyclientleftview", {"clid": "1"})
+            await ts_service.scan_and_cache()
+
+            # THEN — second scan skipped, live presence served
+            assert mock_get_client.return_value.pipeline.await_count == 1
+            assert get_client_count() == 0
+            assert get_cached_status()["channels"][0]["clients"] == []
+            assert teamspeak_cache["ts_status"]["client_count"] == 1
+
+    @patch("app.services.teamspeak.settings")
+    @patch("app.services.teamspeak._get_client")
+    async def test_live_presence_is_shared_with_other_workers(self, mock_get_client, mock_settings):
+        # GIVEN — a cache shared between workers and a fresh full scan
+        mock_settings.API_TEAMSPEAK_URL = "serverquery://ts.veaf.org:10011/?server_port=9987"
+        mock_settings.TEAMSPEAK_PUSH = True
+        mock_settings.TEAMSPEAK_RECONCILE_INTERVAL = 300
+        mock_settings.CACHE_BACKEND = "sqlite"
+        mock_get_client.return_value.pipeline = AsyncMock(return_value=[
+            [{"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"}],
+            [{"cid": "10", "pid": "0", "channel_name": "Lobby"}],
+        ])
+        presence = PresenceIndex()
+        with patch.object(ts_service, "presence", presence), patch.object(ts_service, "_client") as mock_client:
+            mock_client.notifications_active = True
+            await ts_service.scan_and_cache()
+
+            # WHEN
+            presence.handle("notifyclientleftview", {"clid": "1"})
+            await ts_service.scan_and_cache()
+
+            # THEN — no new scan, the cache follows the live presence
+            assert mock_get_client.return_value.pipeline.await_count == 1
+            assert teamspeak_cache["ts_status"]["client_count"] == 0
+
+    @patch("app.services.teamspeak.settings")
+    @patch("app.services.teamspeak._get_client")
+    async def test_notifications_during_scan_are_replayed(self, mock_get_client, mock_settings):
+        # GIVEN — a client leaves while the scan that still lists it is in flight
+        mock_settings.API_TEAMSPEAK_URL = "serverquery://ts.veaf.org:10011/?server_port=9987"
+        mock_settings.TEAMSPEAK_PUSH = True
+        presence = PresenceIndex()
+
+        async def scan(*commands):
+            presence.handle("notifyclientleftview", {"clid": "1"})
+            return [
+                [{"clid": "1", "cid": "10", "client_nickname": "Pilot1", "client_type": "0"}],
+                [{"cid": "10", "pid": "0", "channel_name": "Lobby"}],
+            ]
+
+        mock_get_client.return_value.pipeline = scan
+
+        # WHEN
+        with patch.object(ts_service, "presence", presence):
+            await ts_service.scan_and_cache()
+
+        # THEN — the leave is not overwritten by the older scan
+        assert presence.client_count == 0
+        assert teamspeak_cache["ts_status"]["client_count"] == 0
+
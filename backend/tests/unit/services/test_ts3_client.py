@@ -1,8 +1,19 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.services.ts3_client import TS3Connection, TS3QueryError, parse_ts3_response, ts3_unescape
+from app.services import ts3_client
+from app.services.ts3_client import (
+    TS3Client,
+    TS3Connection,
+    TS3QueryError,
+    iter_ts3_records,
+    parse_ts3_response,
+    ts3_unescape,
+)
 
 
 class TestTs3Unescape:
@@ -95,21 +106,49 @@ class TestParseTs3Response:
         assert result[0]["uid"] == "abc123=="
 
 
+class TestIterTs3Records:
+    def test_yields_records_lazily(self):
+        # GIVEN
+        line = "clid=1 cid=10|clid=2 cid=20|clid=3 cid=30"
+
+        # WHEN
+        records = iter_ts3_records(line)
+        first = next(records)
+
+        # THEN
+        assert first == {"clid": "1", "cid": "10"}
+        assert [r["clid"] for r in records] == ["2", "3"]
+
+    def test_empty_items_are_kept(self):
+        assert list(iter_ts3_records("a=1|")) == parse_ts3_response("a=1|") == [{"a": "1"}, {}]
+
+
+def _reader(chunks: list[bytes], eof: bool = True) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+def _writer() -> MagicMock:
+    writer = MagicMock()
+    writer.is_closing.return_value = False
+    writer.drain = AsyncMock()
+    return writer
+
+
 class TestTS3Connection:
     def _make_connection(self, recv_data: list[bytes]) -> TS3Connection:
-        """Create a TS3Connection with a mocked socket."""
-        mock_sock = MagicMock()
-        mock_sock.recv.side_effect = recv_data
-
-        conn = TS3Connection.__new__(TS3Connection)
-        conn._sock = mock_sock
-        conn._buffer = b""
-        conn._host = "localhost"
-        conn._port = 10011
-        conn._timeout = 10.0
+        """Create a TS3Connection on an in-memory stream."""
+        conn = TS3Connection("localhost", 10011)
+        conn._reader = _reader(recv_data)
+        conn._writer = _writer()
+        conn._start_reading()
         return conn
 
-    def test_send_command_parses_data(self):
+    async def test_send_command_parses_data(self):
         # GIVEN
         conn = self._make_connection([
             b"clid=1 cid=10 client_nickname=Pilot1 client_type=0|clid=2 cid=20 client_nickname=Pilot2 client_type=0\n\r",
@@ -117,14 +156,14 @@ class TestTS3Connection:
         ])
 
         # WHEN
-        result = conn.clientlist()
+        result = await conn.clientlist()
 
         # THEN
         assert len(result) == 2
         assert result[0]["client_nickname"] == "Pilot1"
         assert result[1]["client_nickname"] == "Pilot2"
 
-    def test_send_command_handles_error(self):
+    async def test_send_command_handles_error(self):
         # GIVEN
         conn = self._make_connection([
             b"error id=1281 msg=database\\sempty\\sresult\\sset\n\r",
@@ -132,23 +171,24 @@ class TestTS3Connection:
 
         # WHEN / THEN
         with pytest.raises(TS3QueryError) as exc_info:
-            conn.clientlist()
+            await conn.clientlist()
         assert exc_info.value.error_id == "1281"
         assert exc_info.value.error_msg == "database empty result set"
 
-    def test_use_command(self):
+    async def test_use_command(self):
         # GIVEN
         conn = self._make_connection([
             b"error id=0 msg=ok\n\r",
         ])
+        writer = conn._writer
 
         # WHEN — should not raise
-        conn.use(port=9987)
+        await conn.use(port=9987)
 
         # THEN
-        conn._sock.sendall.assert_called_with(b"use port=9987\n\r")
+        writer.write.assert_called_with(b"use port=9987\n\r")
 
-    def test_chunked_response(self):
+    async def test_chunked_response(self):
         # GIVEN — data arrives in small chunks, marker split across chunks
         conn = self._make_connection([
             b"clid=1 cid=10\n",
@@ -157,62 +197,287 @@ class TestTS3Connection:
         ])
 
         # WHEN
-        result = conn.clientlist()
+        result = await conn.clientlist()
 
         # THEN
         assert len(result) == 1
         assert result[0]["clid"] == "1"
 
-    @patch("app.services.ts3_client.socket.create_connection")
-    def test_connect_reads_banner(self, mock_create_conn):
+    async def test_large_response_in_many_chunks(self):
+        # GIVEN — 2000 clients on one line, then a second response, cut into 7-byte chunks
+        items = "|".join(f"clid={i} cid={i % 50} client_nickname=Pilot\\s{i}" for i in range(2000))
+        stream = f"{items}\n\rerror id=0 msg=ok\n\rcid=1\n\rerror id=0 msg=ok\n\r".encode()
+        conn = self._make_connection([stream[i : i + 7] for i in range(0, len(stream), 7)])
+
+        # WHEN
+        clients, channels = await conn.pipeline("clientlist", "channellist")
+
+        # THEN
+        assert len(clients) == 2000
+        assert clients[1999] == {"clid": "1999", "cid": "49", "client_nickname": "Pilot 1999"}
+        assert channels == [{"cid": "1"}]
+
+    async def test_buffer_keeps_unconsumed_bytes_only(self):
+        # GIVEN — one chunk holding a full line and the start of the next
+        conn = TS3Connection("localhost", 10011)
+        conn._reader = _reader([b"TS3\n\rWelcome", b"\n\r"])
+
+        # WHEN
+        first = await conn._read_line()
+        second = await conn._read_line()
+
+        # THEN
+        assert (first, second) == (b"TS3\n\r", b"Welcome\n\r")
+        assert conn._buffer == b""
+
+    async def test_pipeline_sends_commands_at_once(self):
+        # GIVEN — second command fails, third succeeds
+        conn = self._make_connection([
+            b"clid=1 cid=10\n\rerror id=0 msg=ok\n\r",
+            b"error id=1281 msg=database\\sempty\\sresult\\sset\n\r",
+            b"cid=10 channel_name=Lobby\n\rerror id=0 msg=ok\n\r",
+        ])
+        writer = conn._writer
+
+        # WHEN
+        clients, servergroups, channels = await conn.pipeline("clientlist", "servergrouplist", "channellist")
+
+        # THEN
+        writer.write.assert_called_once_with(b"clientlist\n\rservergrouplist\n\rchannellist\n\r")
+        assert clients == [{"clid": "1", "cid": "10"}]
+        assert isinstance(servergroups, TS3QueryError)
+        assert channels == [{"cid": "10", "channel_name": "Lobby"}]
+
+    @patch("app.services.ts3_client.asyncio.open_connection")
+    async def test_connect_reads_banner(self, mock_open_connection):
         # GIVEN
-        mock_sock = MagicMock()
-        mock_sock.recv.side_effect = [
-            b"TS3\n\r",
-            b"Welcome to the TeamSpeak 3 ServerQuery interface.\n\r",
-        ]
-        mock_create_conn.return_value = mock_sock
+        reader = _reader([b"TS3\n\r", b"Welcome to the TeamSpeak 3 ServerQuery interface.\n\r"], eof=False)
+        writer = _writer()
+        mock_open_connection.return_value = (reader, writer)
 
         # WHEN
         conn = TS3Connection("localhost", 10011)
-        conn._connect()
+        await conn.connect()
 
         # THEN
-        assert conn._sock is mock_sock
-        assert mock_sock.recv.call_count == 2
+        assert conn.connected
+        assert conn._buffer == b""
 
-    def test_close_sends_quit(self):
+    async def test_close_sends_quit(self):
         # GIVEN
-        mock_sock = MagicMock()
-        conn = TS3Connection.__new__(TS3Connection)
-        conn._sock = mock_sock
+        conn = self._make_connection([])
+        writer = conn._writer
 
         # WHEN
-        conn._close()
+        await conn.close()
 
         # THEN
-        mock_sock.sendall.assert_called_with(b"quit\n\r")
-        mock_sock.close.assert_called_once()
-        assert conn._sock is None
+        writer.write.assert_called_with(b"quit\n\r")
+        writer.close.assert_called_once()
+        assert conn._writer is None
 
-    def test_close_handles_socket_error(self):
+    async def test_close_handles_socket_error(self):
         # GIVEN
-        mock_sock = MagicMock()
-        mock_sock.sendall.side_effect = OSError("broken pipe")
-        conn = TS3Connection.__new__(TS3Connection)
-        conn._sock = mock_sock
+        conn = self._make_connection([])
+        writer = conn._writer
+        writer.drain.side_effect = OSError("broken pipe")
 
         # WHEN — should not raise
-        conn._close()
+        await conn.close()
 
         # THEN
-        mock_sock.close.assert_called_once()
-        assert conn._sock is None
+        writer.close.assert_called_once()
+        assert conn._writer is None
+
+    async def test_notifications_are_routed_between_responses(self):
+        # GIVEN — an event arrives while the command response is pending
+        events = []
+        conn = TS3Connection("localhost", 10011, on_notify=lambda event, props: events.append((event, props)))
+        conn._reader = _reader([
+            b"notifyclientmoved ctid=2 reasonid=0 clid=5|clid=6\n\r",
+            b"clid=5 cid=2\n\rerror id=0 msg=ok\n\r",
+        ])
+        conn._writer = _writer()
+        conn._start_reading()
 
-    def test_connection_closed_raises(self):
-        # GIVEN — socket returns empty bytes (connection closed)
-        conn = self._make_connection([b""])
+        # WHEN
+        result = await conn.clientlist()
+
+        # THEN
+        assert result == [{"clid": "5", "cid": "2"}]
+        assert events == [
+            ("notifyclientmoved", {"ctid": "2", "reasonid": "0", "clid": "5"}),
+            ("notifyclientmoved", {"ctid": "2", "reasonid": "0", "clid": "6"}),
+        ]
+
+    async def test_connection_closed_raises_and_drops_connection(self):
+        # GIVEN — stream at EOF (connection closed)
+        conn = self._make_connection([])
 
         # WHEN / THEN
         with pytest.raises(ConnectionError, match="closed unexpectedly"):
-            conn.clientlist()
+            await conn.clientlist()
+        assert not conn.connected
+
+
+class _FakeServer:
+    """Local ServerQuery stand-in answering `clientlist`, `channellist`, `use` and `version`."""
+
+    RESPONSES = {
+        "clientlist": b"clid=1 cid=10 client_nickname=Pilot1 client_type=0\n\r",
+        "channellist": b"cid=10 pid=0 channel_name=Lobby\n\r",
+    }
+
+    def __init__(self):
+        self.connections = 0
+        self.commands: list[str] = []
+        self._server: asyncio.Server | None = None
+        self._writers: list[asyncio.StreamWriter] = []
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.drop_clients()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def notify(self, line: bytes) -> None:
+        for writer in self._writers:
+            writer.write(line)
+
+    def drop_clients(self) -> None:
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.append(writer)
+        writer.write(b"TS3\n\rWelcome to the TeamSpeak 3 ServerQuery interface.\n\r")
+        try:
+            while line := await reader.readuntil(b"\n\r"):
+                command = line.decode().strip()
+                self.commands.append(command)
+                writer.write(self.RESPONSES.get(command, b"") + b"error id=0 msg=ok\n\r")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+@asynccontextmanager
+async def _serve() -> AsyncIterator[tuple[_FakeServer, int]]:
+    # Started in the test itself: the server must live on the test's event loop
+    server = _FakeServer()
+    port = await server.start()
+    try:
+        yield server, port
+    finally:
+        await server.stop()
+
+
+class TestTS3Client:
+    async def test_session_is_reused_between_calls(self):
+        async with _serve() as (server, port):
+            # GIVEN
+            client = TS3Client("127.0.0.1", port, 9987)
+
+            # WHEN
+            first = await client.pipeline("clientlist", "channellist")
+            second = await client.pipeline("clientlist", "channellist")
+            await client.close()
+
+        # THEN
+        assert first == second
+        assert first[0][0]["client_nickname"] == "Pilot1"
+        assert first[1][0]["channel_name"] == "Lobby"
+        assert server.connections == 1
+        assert server.commands.count("use port=9987") == 1
+
+    async def test_reconnects_when_session_was_dropped(self):
+        async with _serve() as (server, port):
+            # GIVEN
+            client = TS3Client("127.0.0.1", port, 9987)
+            await client.pipeline("clientlist")
+
+            # WHEN — server restarts / kicks the idle query client
+            server.drop_clients()
+            await asyncio.sleep(0.01)
+            result = await client.pipeline("clientlist")
+            await client.close()
+
+        # THEN
+        assert result[0][0]["clid"] == "1"
+        assert server.connections == 2
+
+    async def test_backoff_after_failed_connection(self):
+        # GIVEN — nothing listens on the port anymore
+        async with _serve() as (_server, port):
+            pass
+        client = TS3Client("127.0.0.1", port, 9987)
+
+        # WHEN
+        with pytest.raises(OSError):
+            await client.pipeline("clientlist")
+        with pytest.raises(ConnectionError, match="next attempt"):
+            await client.pipeline("clientlist")
+
+        # THEN
+        assert client._failures == 1
+
+    async def test_keepalive_when_idle(self):
+        async with _serve() as (server, port):
+            # GIVEN
+            client = TS3Client("127.0.0.1", port, 9987, keepalive=0.05)
+
+            # WHEN
+            await client.pipeline("clientlist")
+            await asyncio.sleep(0.2)
+            await client.close()
+
+        # THEN
+        assert "version" in server.commands
+        assert server.connections == 1
+
+    async def test_backoff_delay_is_capped(self):
+        # GIVEN
+        client = TS3Client("127.0.0.1", 1, backoff_max=30)
+
+        # WHEN
+        for _ in range(10):
+            client._record_failure()
+
+        # THEN
+        assert client._retry_at - ts3_client.time.monotonic() <= 30
+
+    async def test_push_session_registers_and_reconnects(self):
+        async with _serve() as (server, port):
+            # GIVEN
+            events = []
+            reconnected = asyncio.Event()
+
+            async def on_reconnect():
+                reconnected.set()
+
+            client = TS3Client(
+                "127.0.0.1",
+                port,
+                9987,
+                notify=("servernotifyregister event=server",),
+                on_notify=lambda event, props: events.append(event),
+                on_reconnect=on_reconnect,
+            )
+            await client.pipeline("clientlist")
+
+            # WHEN — an event is pushed, then the server drops the session
+            server.notify(b"notifyclientleftview cfid=1 ctid=0 clid=5\n\r")
+            await asyncio.sleep(0.05)
+            server.drop_clients()
+            await asyncio.wait_for(reconnected.wait(), timeout=1)
+            await client.close()
+
+            # THEN
+            assert events == ["notifyclientleftview"]
+            assert server.connections == 2
+            assert server.commands.count("servernotifyregister event=server") == 2
@@ -0,0 +1,102 @@
+from app.utils.broadcast import RESYNC, Broadcaster, EventBus
+
+
+class TestBroadcaster:
+    async def test_computes_once_for_all_subscribers(self):
+        # GIVEN
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"count": 1}
+
+        broadcaster = Broadcaster(compute, interval=60)
+
+        # WHEN
+        async with broadcaster.subscribe() as first, broadcaster.subscribe() as second:
+            values = [await first.get(timeout=1), await second.get(timeout=1)]
+
+        # THEN
+        assert values == [{"count": 1}, {"count": 1}]
+        assert calls == [1]
+
+    async def test_pushes_only_changes(self):
+        # GIVEN
+        values = iter([1, 1, 2])
+
+        async def compute():
+            return next(values, 2)
+
+        broadcaster = Broadcaster(compute, interval=0.01)
+
+        # WHEN
+        async with broadcaster.subscribe() as subscription:
+            received = [await subscription.get(timeout=1), await subscription.get(timeout=1)]
+            nothing = await subscription.get(timeout=0.05)
+
+        # THEN
+        assert received == [1, 2]
+        assert nothing is None
+
+    async def test_new_subscriber_gets_latest_value_first(self):
+        # GIVEN
+        async def compute():
+            return "latest"
+
+        broadcaster = Broadcaster(compute, interval=60)
+
+        async with broadcaster.subscribe() as first:
+            await first.get(timeout=1)
+
+            # WHEN
+            async with broadcaster.subscribe() as second:
+                value = await second.get(timeout=0)
+
+        # THEN
+        assert value == "latest"
+        assert broadcaster.subscriber_count == 0
+
+    async def test_slow_subscriber_keeps_only_latest(self):
+        # GIVEN
+        async def compute():
+            return None
+
+        broadcaster = Broadcaster(compute, interval=60)
+
+        async with broadcaster.subscribe() as subscription:
+            # WHEN
+            broadcaster.publish("a")
+            broadcaster.publish("b")
+
+            # THEN
+            assert await subscription.get(timeout=0) == "b"
+
+
+class TestEventBus:
+    async def test_delivers_every_event_in_order(self):
+        # GIVEN
+        bus = EventBus()
+
+        async with bus.subscribe() as first, bus.subscribe() as second:
+            # WHEN
+            for event in ("join", "move", "leave"):
+                bus.publish(event)
+
+            # THEN
+            for subscription in (first, second):
+                assert [await subscription.get(timeout=0) for _ in range(3)] == ["join", "move", "leave"]
+                assert await subscription.get(timeout=0) is None
+
+    async def test_lagging_subscriber_gets_resync(self):
+        # GIVEN
+        bus = EventBus(maxsize=2)
+
+        async with bus.subscribe() as subscription:
+            # WHEN
+            for event in range(3):
+                bus.publish(event)
+
+            # THEN
+            assert await subscription.get(timeout=0) is RESYNC
+            assert await subscription.get(timeout=0) is None
+        assert bus.subscriber_count == 0
@@ -0,0 +1,360 @@
+import asyncio
+
+import pytest
+
+from app.utils.cache import Cache, MemoryStore, SQLiteStore, cached
+
+
+def _memory_cache(ttl: float | None = 60) -> Cache:
+    return Cache("test", store=MemoryStore(maxsize=10, ttl=ttl))
+
+
+def _sqlite_cache(tmp_path, name: str = "test", ttl: float | None = 60, maxsize: int | None = 10) -> Cache:
+    return Cache(name, store=SQLiteStore(str(tmp_path / "cache.sqlite3"), name, maxsize=maxsize, ttl=ttl))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path) -> Cache:
+    if request.param == "memory":
+        return _memory_cache()
+    return _sqlite_cache(tmp_path)
+
+
+class TestCacheMapping:
+    def test_set_get_delete(self, cache):
+        # GIVEN
+        cache["key"] = {"value": [1, 2]}
+
+        # WHEN / THEN
+        assert "key" in cache
+        assert cache["key"] == {"value": [1, 2]}
+        assert cache.get("missing") is None
+        del cache["key"]
+        assert "key" not in cache
+
+    def test_pop_consumes_entry_once(self, cache):
+        # GIVEN
+        cache["state"] = True
+
+        # WHEN
+        first = cache.pop("state", None)
+        second = cache.pop("state", None)
+
+        # THEN
+        assert first is True
+        assert second is None
+
+    def test_add_only_sets_absent_key(self, cache):
+        # GIVEN
+        assert cache.add("lock", 1) is True
+
+        # WHEN
+        second = cache.add("lock", 2)
+
+        # THEN
+        assert second is False
+        assert cache["lock"] == 1
+
+    def test_claim_is_held_by_one_owner_until_expiry(self, cache):
+        # GIVEN
+        assert cache.claim("lease", "worker-a", 60) is True
+
+        # WHEN
+        renewed = cache.claim("lease", "worker-a", 60)
+        taken = cache.claim("lease", "worker-b", 60)
+        cache.claim("expired", "worker-a", 0)
+        taken_over = cache.claim("expired", "worker-b", 60)
+
+        # THEN
+        assert (renewed, taken, taken_over) == (True, False, True)
+        assert cache["lease"] == "worker-a"
+
+    def test_release_only_by_owner(self, cache):
+        # GIVEN
+        cache.claim("lease", "worker-a", 60)
+
+        # WHEN
+        cache.release("lease", "worker-b")
+        kept = "lease" in cache
+        cache.release("lease", "worker-a")
+
+        # THEN
+        assert kept is True
+        assert cache.claim("lease", "worker-b", 60) is True
+
+    def test_clear_and_len(self, cache):
+        # GIVEN
+        cache["a"] = 1
+        cache["b"] = 2
+
+        # WHEN
+        assert len(cache) == 2
+        cache.clear()
+
+        # THEN
+        assert len(cache) == 0
+
+    def test_age(self, cache):
+        # GIVEN
+        cache["key"] = 1
+
+        # WHEN
+        age = cache.age("key")
+
+        # THEN
+        assert age is not None and 0 <= age < 5
+        assert cache.age("missing") is None
+
+
+class TestCacheStats:
+    def test_counts_hits_and_misses(self, cache):
+        # GIVEN
+        cache["key"] = 1
+
+        # WHEN
+        cache.get("key")
+        cache.get("missing")
+        cache.get_with_age("key")
+
+        # THEN
+        assert cache.stats == {"hits": 2, "misses": 1, "evictions": 0}
+
+    def test_counts_size_evictions(self, tmp_path):
+        # GIVEN
+        caches = [
+            Cache("test", store=MemoryStore(maxsize=2, ttl=60)),
+            _sqlite_cache(tmp_path, ttl=None, maxsize=2),
+        ]
+
+        # WHEN
+        for cache in caches:
+            for key in ("a", "b", "c"):
+                cache[key] = key
+
+        # THEN
+        assert [cache.stats["evictions"] for cache in caches] == [1, 1]
+
+
+class TestSQLiteStore:
+    def test_entries_are_shared_between_instances(self, tmp_path):
+        # GIVEN — two caches on the same file, as two workers would have
+        worker_a = _sqlite_cache(tmp_path)
+        worker_b = _sqlite_cache(tmp_path)
+
+        # WHEN
+        worker_a["ts_status"] = {"client_count": 3}
+
+        # THEN
+        assert worker_b["ts_status"] == {"client_count": 3}
+        assert worker_b.add("ts_status", {}) is False
+
+    def test_namespaces_are_isolated(self, tmp_path):
+        # GIVEN
+        first = _sqlite_cache(tmp_path, name="first")
+        second = _sqlite_cache(tmp_path, name="second")
+
+        # WHEN
+        first["key"] = 1
+
+        # THEN
+        assert "key" not in second
+        second.clear()
+        assert first["key"] == 1
+
+    def test_expired_entries_are_ignored(self, tmp_path):
+        # GIVEN
+        cache = _sqlite_cache(tmp_path, ttl=0)
+
+        # WHEN
+        cache["key"] = 1
+
+        # THEN
+        assert "key" not in cache
+        assert cache.add("key", 2) is True
+
+    def test_evicts_oldest_beyond_maxsize(self, tmp_path):
+        # GIVEN
+        cache = _sqlite_cache(tmp_path, ttl=None, maxsize=2)
+
+        # WHEN
+        for key in ("a", "b", "c"):
+            cache[key] = key
+
+        # THEN
+        assert sorted(cache) == ["b", "c"]
+
+
+class TestCachedDecorator:
+    async def test_caches_result_including_none(self, cache):
+        # GIVEN
+        calls = []
+
+        @cached(cache)
+        async def fetch(name: str):
+            calls.append(name)
+            return None
+
+        # WHEN
+        await fetch("a")
+        await fetch("a")
+
+        # THEN
+        assert calls == ["a"]
+
+    async def test_clear_only_removes_own_entries(self, cache):
+        # GIVEN
+        @cached(cache)
+        async def get_server():
+            return 1
+
+        @cached(cache)
+        async def get_servers():
+            return 2
+
+        await get_server()
+        await get_servers()
+
+        # WHEN
+        get_server.clear()
+
+        # THEN
+        assert len(cache) == 1
+
+    async def test_invalidate_if_older(self, cache):
+        # GIVEN
+        @cached(cache)
+        async def fetch():
+            return 1
+
+        await fetch()
+
+        # WHEN
+        fetch.invalidate_if_older(3600)
+        kept = len(cache)
+        fetch.invalidate_if_older(0)
+
+        # THEN
+        assert kept == 1
+        assert len(cache) == 0
+
+    async def test_concurrent_misses_are_coalesced(self, cache):
+        # GIVEN
+        calls = []
+        release = asyncio.Event()
+
+        @cached(cache)
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "servers"
+
+        # WHEN
+        callers = [asyncio.create_task(fetch()) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        # THEN
+        assert calls == [1]
+        assert results == ["servers"] * 5
+        assert fetch.stats == {"hits": 0, "misses": 1, "coalesced": 4, "stale": 0}
+
+    async def test_cancelled_caller_does_not_cancel_shared_load(self, cache):
+        # GIVEN
+        release = asyncio.Event()
+
+        @cached(cache)
+        async def fetch():
+            await release.wait()
+            return "servers"
+
+        first = asyncio.create_task(fetch())
+        second = asyncio.create_task(fetch())
+        await asyncio.sleep(0)
+
+        # WHEN
+        first.cancel()
+        release.set()
+
+        # THEN
+        assert await second == "servers"
+        assert await fetch() == "servers"
+        assert fetch.stats["hits"] == 1
+
+    async def test_failed_load_is_not_cached(self, cache):
+        # GIVEN
+        attempts = []
+
+        @cached(cache)
+        async def fetch():
+            attempts.append(1)
+            raise RuntimeError("upstream down")
+
+        # WHEN
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await fetch()
+
+        # THEN
+        assert len(attempts) == 2
+
+
+class TestStaleWhileRevalidate:
+    async def test_serves_stale_value_and_refreshes_in_background(self, cache):
+        # GIVEN
+        values = iter(["v1", "v2"])
+
+        @cached(cache, fresh_ttl=0)
+        async def fetch():
+            return next(values)
+
+        assert await fetch() == "v1"
+
+        # WHEN
+        stale = await fetch()
+        await asyncio.sleep(0.01)
+
+        # THEN
+        assert stale == "v1"
+        assert fetch.stats["stale"] == 1
+        assert cache.get(next(iter(cache))) == "v2"
+
+    async def test_failed_refresh_keeps_last_good_value(self, cache):
+        # GIVEN
+        values = iter([["server"], None])
+
+        @cached(cache, fresh_ttl=0)
+        async def fetch():
+            return next(values)
+
+        await fetch()
+        hits_before = cache.hits
+
+        # WHEN
+        await fetch()
+        await asyncio.sleep(0.01)
+
+        # THEN — one lookup for the stale read, one to fall back to the last good value
+        assert cache.hits == hits_before + 2
+        assert cache.get(next(iter(cache))) == ["server"]
+
+    async def test_background_refresh_error_is_not_propagated(self, cache):
+        # GIVEN
+        calls = []
+
+        @cached(cache, fresh_ttl=0)
+        async def fetch():
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("upstream down")
+            return "v1"
+
+        await fetch()
+
+        # WHEN
+        result = await fetch()
+        await asyncio.sleep(0.01)
+
+        # THEN
+        assert result == "v1"
+        assert len(calls) == 2
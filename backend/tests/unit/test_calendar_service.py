@@ -3,11 +3,15 @@
 from datetime import UTC, datetime, timedelta
 
 from app.models.calendar import CalendarEvent
-from app.services.calendar import AUTO_CREATE_EVENT_DAYS, get_next_event_datetime, is_needed_to_create_next_event
+from app.services.calendar import (
+    AUTO_CREATE_EVENT_DAYS,
+    get_next_event_datetime,
+    next_occurrences,
+)
 
 
 def _make_event(start_date: datetime, repeat_event: int) -> CalendarEvent:
-    return CalendarEvent(start_date=start_date, repeat_event=repeat_event)
+    return CalendarEvent(start_date=start_date, end_date=start_date + timedelta(hours=2), repeat_event=repeat_event)
 
 
 # --- get_next_event_datetime ---
@@ -118,45 +122,44 @@ class TestGetNextEventDatetime:
         assert result == datetime(2026, 11, 26, 20, 0, tzinfo=UTC)
 
 
-# --- is_needed_to_create_next_event ---
+# --- next_occurrences ---
 
 
-class TestIsNeededToCreateNextEvent:
-    def test_within_threshold(self):
-        # GIVEN a weekly event starting in 3 days (next = 3+7 = 10 days < 32)
+class TestNextOccurrences:
+    def test_weekly_up_to_horizon(self):
+        # GIVEN a weekly event starting in 3 days
         now = datetime.now(UTC)
-        event = _make_event(now + timedelta(days=3), CalendarEvent.REPEAT_DAY_OF_WEEK)
+        start = now + timedelta(days=3)
+        event = _make_event(start, CalendarEvent.REPEAT_DAY_OF_WEEK)
 
-        # WHEN / THEN
-        assert is_needed_to_create_next_event(event) is True
+        # WHEN
+        result = next_occurrences(event)
 
-    def test_beyond_threshold(self):
-        # GIVEN a weekly event starting in 40 days (next = 40+7 = 47 days > 32)
-        now = datetime.now(UTC)
-        event = _make_event(now + timedelta(days=40), CalendarEvent.REPEAT_DAY_OF_WEEK)
+        # THEN — 10, 17, 24 and 31 days from now; 38 is beyond the horizon
+        assert result == [start + timedelta(weeks=n) for n in range(1, 5)]
 
-        # WHEN / THEN
-        assert is_needed_to_create_next_event(event) is False
+    def test_skips_past_occurrences(self):
+        # GIVEN a weekly event whose series started a year ago (52 weeks and a day)
+        start = datetime.now(UTC) - timedelta(days=365)
+        event = _make_event(start, CalendarEvent.REPEAT_DAY_OF_WEEK)
 
-    def test_at_exact_threshold(self):
-        # GIVEN next occurrence exactly at threshold boundary
-        now = datetime.now(UTC)
-        event = _make_event(now + timedelta(days=AUTO_CREATE_EVENT_DAYS - 7), CalendarEvent.REPEAT_DAY_OF_WEEK)
+        # WHEN
+        result = next_occurrences(event)
 
-        # WHEN — next = (32-7)+7 = 32 days, delta.days = 32 <= 32
-        assert is_needed_to_create_next_event(event) is True
+        # THEN — 6, 13, 20 and 27 days from now, not the year of past occurrences
+        assert result == [start + timedelta(weeks=n) for n in range(53, 57)]
 
-    def test_past_date_still_triggers(self):
-        # GIVEN a weekly event that started 10 days ago (next = -10+7 = -3 days, i.e. past)
+    def test_beyond_horizon_returns_empty(self):
+        # GIVEN a weekly event whose next occurrence is beyond the horizon
         now = datetime.now(UTC)
-        event = _make_event(now - timedelta(days=10), CalendarEvent.REPEAT_DAY_OF_WEEK)
+        event = _make_event(now + timedelta(days=AUTO_CREATE_EVENT_DAYS), CalendarEvent.REPEAT_DAY_OF_WEEK)
 
-        # WHEN / THEN — past dates are < 32, still triggers creation
-        assert is_needed_to_create_next_event(event) is True
+        # WHEN / THEN
+        assert next_occurrences(event) == []
 
-    def test_repeat_none_returns_false(self):
+    def test_repeat_none_returns_empty(self):
         # GIVEN an event with no repeat
         event = _make_event(datetime.now(UTC), CalendarEvent.REPEAT_NONE)
 
         # WHEN / THEN
-        assert is_needed_to_create_next_event(event) is False
+        assert next_occurrences(event) == []
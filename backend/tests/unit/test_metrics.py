@@ -0,0 +1,188 @@
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+from starlette.routing import Route
+
+from app.utils.cache import Cache, MemoryStore, cached
+from app.utils.metrics import (
+    REPEATED_STATEMENT_THRESHOLD,
+    UNMATCHED_ROUTE,
+    CacheCollector,
+    DbUsage,
+    RequestProfile,
+    _check_budget,
+    query_budget,
+    route_template,
+    timed_job,
+    track_upstream,
+)
+from tests.query_budget import budget_overrun
+
+
+def _value(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _endpoint(request):
+    return None
+
+
+class TestRouteTemplate:
+    def test_full_route_path_is_used_as_is(self):
+        # GIVEN
+        scope = {"route": Route("/api/calendar/events/{event_id}", _endpoint), "path": "/api/calendar/events/42"}
+
+        # WHEN / THEN
+        assert route_template(scope) == "/api/calendar/events/{event_id}"
+
+    def test_router_prefix_is_recovered_from_the_path(self):
+        # GIVEN — route of an included router that only carries its own part
+        scope = {"route": Route("/pages/{slug:path}", _endpoint), "path": "/api/pages/wiki/intro"}
+
+        # WHEN / THEN
+        assert route_template(scope) == "/api/pages/{slug:path}"
+
+    def test_unmatched_request(self):
+        # GIVEN
+        scope = {"path": "/api/unknown/42"}
+
+        # WHEN / THEN
+        assert route_template(scope) == UNMATCHED_ROUTE
+
+
+class TestQueryBudget:
+    def test_decorator_declares_budget_on_endpoint(self):
+        # GIVEN
+        @query_budget(4)
+        async def endpoint():
+            return None
+
+        # WHEN / THEN
+        assert endpoint.query_budget == 4
+
+    def test_repeated_statement_is_reported_as_n_plus_one(self, caplog):
+        # GIVEN — a lazy load per row
+        usage = DbUsage(queries=REPEATED_STATEMENT_THRESHOLD + 1)
+        usage.statements["SELECT event.id FROM event"] = 1
+        usage.statements["SELECT user.id\nFROM user WHERE user.id = ?"] = REPEATED_STATEMENT_THRESHOLD
+        profile = RequestProfile("GET", "/api/events", usage.queries, 0.01, budget=None)
+
+        # WHEN
+        with caplog.at_level(logging.WARNING, logger="app.utils.metrics"):
+            _check_budget(profile, usage)
+
+        # THEN
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert f"same statement {REPEATED_STATEMENT_THRESHOLD} times" in message
+        assert message.endswith("SELECT user.id FROM user WHERE user.id = ?")
+
+    def test_plugin_checks_endpoint_then_test_budget(self):
+        # GIVEN
+        declared = RequestProfile("GET", "/api/menu", 10, 0.01, budget=8)
+        undeclared = RequestProfile("GET", "/api/users/me", 5, 0.01, budget=None)
+
+        # WHEN / THEN
+        assert budget_overrun(declared) == "GET /api/menu: 10 SQL statements (endpoint budget 8)"
+        assert budget_overrun(undeclared) is None
+        assert budget_overrun(undeclared, test_budget=4) == "GET /api/users/me: 5 SQL statements (test budget 4)"
+        assert budget_overrun(undeclared, test_budget=5) is None
+
+
+class TestTrackUpstream:
+    def test_records_duration_and_errors(self):
+        # GIVEN
+        labels = {"service": "test", "operation": "fetch"}
+        calls_before = _value("veaf_upstream_request_duration_seconds_count", **labels)
+        errors_before = _value("veaf_upstream_errors_total", **labels)
+
+        # WHEN
+        with track_upstream("test", "fetch"):
+            pass
+        with pytest.raises(OSError), track_upstream("test", "fetch"):
+            raise OSError("connection refused")
+
+        # THEN
+        assert _value("veaf_upstream_request_duration_seconds_count", **labels) == calls_before + 2
+        assert _value("veaf_upstream_errors_total", **labels) == errors_before + 1
+
+
+class TestTimedJob:
+    async def test_records_runs_by_outcome(self):
+        # GIVEN
+        outcomes = iter([None, RuntimeError("boom")])
+
+        async def job():
+            outcome = next(outcomes)
+            if outcome is not None:
+                raise outcome
+
+        wrapped = timed_job("test_job", job)
+        ok_before = _value("veaf_job_runs_total", job="test_job", status="ok")
+        error_before = _value("veaf_job_runs_total", job="test_job", status="error")
+
+        # WHEN — the error is logged, not propagated to the scheduler
+        await wrapped()
+        await wrapped()
+
+        # THEN
+        assert _value("veaf_job_runs_total", job="test_job", status="ok") == ok_before + 1
+        assert _value("veaf_job_runs_total", job="test_job", status="error") == error_before + 1
+        assert wrapped.__name__ == "job"
+
+    async def test_skips_unclaimed_runs(self):
+        # GIVEN — the claim fails once (lease held by another worker), then succeeds
+        claims = iter([False, True])
+        calls = []
+
+        async def claim():
+            return next(claims)
+
+        async def job():
+            calls.append(1)
+
+        wrapped = timed_job("claimed_job", job, claim=claim)
+        labels = {"job": "claimed_job"}
+        skipped_before = _value("veaf_job_runs_total", status="skipped", **labels)
+        ok_before = _value("veaf_job_runs_total", status="ok", **labels)
+        timed_before = _value("veaf_job_duration_seconds_count", **labels)
+
+        # WHEN
+        await wrapped()
+        await wrapped()
+
+        # THEN — the skipped run is counted but not timed
+        assert calls == [1]
+        assert _value("veaf_job_runs_total", status="skipped", **labels) == skipped_before + 1
+        assert _value("veaf_job_runs_total", status="ok", **labels) == ok_before + 1
+        assert _value("veaf_job_duration_seconds_count", **labels) == timed_before + 1
+
+
+class TestCacheCollector:
+    async def test_exposes_cache_and_cached_function_counters(self):
+        # GIVEN
+        cache = Cache("collector_test", store=MemoryStore(maxsize=1, ttl=None))
+
+        @cached(cache)
+        async def fetch(key: str):
+            return key
+
+        await fetch("a")
+        await fetch("a")
+        await fetch("b")  # Evicts "a"
+
+        # WHEN
+        samples = {
+            (sample.name, tuple(sorted(sample.labels.values()))): sample.value
+            for family in CacheCollector().collect()
+            for sample in family.samples
+        }
+
+        # THEN
+        assert samples[("veaf_cache_lookups_total", ("collector_test", "hit"))] == 1
+        assert samples[("veaf_cache_lookups_total", ("collector_test", "miss"))] == 2
+        assert samples[("veaf_cache_evictions_total", ("collector_test",))] == 1
+        name = f"{__name__}.{fetch.__qualname__}"
+        assert samples[("veaf_cached_calls_total", ("hit", name))] == 1
+        assert samples[("veaf_cached_calls_total", ("miss", name))] == 2
@@ -1,6 +1,7 @@
 """Tests for permission checks."""
 
 from app.auth.permissions import (
+    access_level,
     can_add_event,
     can_control_server,
     can_edit_event,
@@ -76,3 +77,16 @@ def test_is_granted_level_member():
 
     guest = UserFactory.build(status=User.STATUS_UNKNOWN)
     assert is_granted_to_level(guest, 3) is False
+
+
+def test_access_level():
+    assert access_level(None) == 0
+    assert access_level(UserFactory.build(status=User.STATUS_UNKNOWN)) == 1
+    assert access_level(UserFactory.build(status=User.STATUS_CADET)) == 2
+    assert access_level(UserFactory.build(status=User.STATUS_MEMBER)) == 3
+
+
+def test_is_granted_unknown_level():
+    user = UserFactory.build(status=User.STATUS_MEMBER)
+    assert is_granted_to_level(user, 4) is False
+    assert is_granted_to_level(user, -1) is False
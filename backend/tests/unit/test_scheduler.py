@@ -0,0 +1,42 @@
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.tasks.scheduler import _add_job, scheduler
+from app.utils.cache import job_leases
+
+
+@pytest.fixture(autouse=True)
+def leases():
+    job_leases.clear()
+    yield
+    job_leases.clear()
+    scheduler.remove_all_jobs()
+
+
+class TestLeasedJobs:
+    async def test_runs_in_the_lease_holder(self):
+        # GIVEN
+        job = AsyncMock()
+        _add_job(job, "interval", seconds=15, id="leased_job", lease=30)
+
+        # WHEN
+        await scheduler.get_job("leased_job").func()
+
+        # THEN
+        job.assert_awaited_once()
+        assert job_leases["leased_job"] == os.getpid()
+
+    async def test_skipped_while_another_worker_holds_the_lease(self):
+        # GIVEN — another worker holds the lease (e.g. the TeamSpeak push session)
+        job, on_skip = AsyncMock(), AsyncMock()
+        _add_job(job, "interval", seconds=15, id="leased_job", lease=30, on_skip=on_skip)
+        job_leases.claim("leased_job", os.getpid() + 1, 60)
+
+        # WHEN
+        await scheduler.get_job("leased_job").func()
+
+        # THEN
+        job.assert_not_awaited()
+        on_skip.assert_awaited_once()
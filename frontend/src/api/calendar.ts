@@ -1,14 +1,19 @@
 import apiClient from './client'
-import type { EventListItem, EventDetail, EventCreate, EventUpdate, VoteCreate, Vote, ChoiceCreate, Choice, TaskType, AdminEvent, AdminEventListResponse } from '@/types/calendar'
+import type { CalendarFeed, EventCalendarItem, EventListItem, EventDetail, EventCreate, EventUpdate, VoteCreate, Vote, ChoiceCreate, Choice, TaskType, AdminEvent, AdminEventListResponse } from '@/types/calendar'
 
-export async function getEvents(fromDate?: string, toDate?: string): Promise<EventListItem[]> {
+export async function getEvents(fromDate?: string, toDate?: string): Promise<EventCalendarItem[]> {
   const params: Record<string, string> = {}
   if (fromDate) params.from_date = fromDate
   if (toDate) params.to_date = toDate
-  const { data } = await apiClient.get<EventListItem[]>('/calendar/events', { params })
+  const { data } = await apiClient.get<EventCalendarItem[]>('/calendar/events', { params })
   return data
 }
 
+export async function getFeedUrl(): Promise<string> {
+  const { data } = await apiClient.get<CalendarFeed>('/calendar/feed-token')
+  return data.url
+}
+
 export async function getMyEvents(): Promise<EventListItem[]> {
   const { data } = await apiClient.get<EventListItem[]>('/calendar/my-events')
   return data
@@ -19,6 +24,17 @@ export async function getEvent(id: number): Promise<EventDetail> {
   return data
 }
 
+// Occurrence of a repeating event: computed while not stored, stored on demand (idempotent)
+export async function getOccurrence(id: number, start: string): Promise<EventDetail> {
+  const { data } = await apiClient.get<EventDetail>(`/calendar/events/${id}/occurrences/${encodeURIComponent(start)}`)
+  return data
+}
+
+export async function storeOccurrence(id: number, start: string): Promise<EventDetail> {
+  const { data } = await apiClient.post<EventDetail>(`/calendar/events/${id}/occurrences`, { start_date: start })
+  return data
+}
+
 export async function createEvent(event: EventCreate): Promise<EventDetail> {
   const { data } = await apiClient.post<EventDetail>('/calendar/events', event)
   return data
@@ -1,7 +1,7 @@
 import { defineStore } from 'pinia'
 import { ref } from 'vue'
 import * as calendarApi from '@/api/calendar'
-import type { EventListItem, TaskType } from '@/types/calendar'
+import type { EventCalendarItem, EventListItem, TaskType } from '@/types/calendar'
 
 interface DateRange {
   from: string
@@ -9,7 +9,7 @@ interface DateRange {
 }
 
 export const useCalendarStore = defineStore('calendar', () => {
-  const events = ref<EventListItem[]>([])
+  const events = ref<EventCalendarItem[]>([])
   const currentRange = ref<DateRange>({ from: '', to: '' })
   const myEvents = ref<EventListItem[]>([])
   const tasks = ref<TaskType[]>([])
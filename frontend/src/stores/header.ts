@@ -3,12 +3,14 @@ import { defineStore } from 'pinia'
 import { getServers, getHeaderData } from '@/api/servers'
 import type { Server, HeaderData } from '@/types/api'
 
-const POLL_INTERVAL = 60_000 // 60 seconds
+const POLL_INTERVAL = 60_000 // 60 seconds (fallback when SSE is unavailable)
+const STREAM_URL = '/api/header/stream'
 
 export const useHeaderStore = defineStore('header', () => {
   const servers = ref<Server[]>([])
   const headerData = ref<HeaderData | null>(null)
   let pollTimer: ReturnType<typeof setInterval> | null = null
+  let eventSource: EventSource | null = null
 
   const connectedPlayers = computed(() => headerData.value?.connected_players ?? 0)
   const nextEventsCount = computed(() => headerData.value?.next_events_count ?? 0)
@@ -27,13 +29,37 @@ export const useHeaderStore = defineStore('header', () => {
     }
   }
 
-  function startPolling() {
+  function startTimer() {
     if (pollTimer !== null) return
     fetchHeaderData()
     pollTimer = setInterval(fetchHeaderData, POLL_INTERVAL)
   }
 
+  function startPolling() {
+    if (pollTimer !== null || eventSource !== null) return
+    if (typeof EventSource === 'undefined') {
+      startTimer()
+      return
+    }
+    // Server pushes new header data only when it changes
+    eventSource = new EventSource(STREAM_URL)
+    eventSource.onmessage = (event) => {
+      headerData.value = JSON.parse(event.data) as HeaderData
+    }
+    eventSource.onerror = () => {
+      // Stream closed for good (e.g. proxy without SSE support): fall back to polling
+      if (eventSource?.readyState === EventSource.CLOSED) {
+        eventSource = null
+        startTimer()
+      }
+    }
+  }
+
   function stopPolling() {
+    if (eventSource !== null) {
+      eventSource.close()
+      eventSource = null
+    }
     if (pollTimer !== null) {
       clearInterval(pollTimer)
       pollTimer = null
@@ -341,5 +341,6 @@ export interface HeaderData {
     start_date: string
     type: number
     type_color: string
+    occurrence_start: string | null
   }[]
 }
@@ -55,6 +55,23 @@ export interface EventListItem {
   sim_bms: boolean
   registration: boolean
   owner_nickname: string | null
+  // Occurrence of a repeating event: `id` is the series' while `virtual` (not stored yet)
+  series_id: number | null
+  occurrence_start: string | null
+  virtual: boolean
+}
+
+export interface EventCalendarItem extends EventListItem {
+  votes_yes: number
+  votes_no: number
+  votes_maybe: number
+  slots_total: number
+  slots_filled: number
+  slots_fill_ratio: number | null
+}
+
+export interface CalendarFeed {
+  url: string
 }
 
 export interface EventDetail extends EventListItem {
@@ -16,3 +16,11 @@ export interface DiscordVoiceStatus {
   guild_name: string
   configured: boolean
 }
+
+export interface DiscordVoiceDiff {
+  action: 'join' | 'leave' | 'move' | 'update'
+  user: DiscordVoiceUser
+  channel_id: string | null
+  from_channel_id: string | null
+  user_count: number
+}
@@ -4,16 +4,17 @@ export interface TSClient {
   nickname: string
 }
 
-export interface TSChannel {
+export interface TSChannelNode {
   cid: number
-  pid: number
   name: string
   clients: TSClient[]
+  children: TSChannelNode[]
+  total_clients: number
 }
 
 export interface TSStatus {
   clients: TSClient[]
-  channels: TSChannel[]
+  tree: TSChannelNode[]
   client_count: number
   server_host: string
   configured: boolean